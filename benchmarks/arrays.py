@@ -0,0 +1,66 @@
+"""
+Compares the transfer of a large vector as scalar attributes and as one array attribute.
+
+One producer (first block) sends a vector of N doubles to one consumer (second
+block), either as N scalar attributes (one message each or one batch) or as one
+NumPy array attribute. Reports the steps and the elements per second.
+"""
+import argparse
+import tempfile
+
+import numpy
+
+from benchmarks.common import write_scenario, run_local
+
+from obnl.client import ClientNode
+
+
+class VectorProducer(ClientNode):
+
+    def __init__(self, host, name, size, as_array, **kwargs):
+        super(VectorProducer, self).__init__(host, name, **kwargs)
+        self._vector = numpy.random.random(size)
+        self._as_array = as_array
+
+    def step(self, current_time, time_step):
+        if self._as_array:
+            self.update_attribute('v', self._vector)
+        else:
+            for i, value in enumerate(self._vector.tolist()):
+                self.update_attribute('v' + str(i), value)
+
+
+class VectorConsumer(ClientNode):
+
+    def step(self, current_time, time_step):
+        self.total = sum(numpy.sum(v) for v in self.input_values.values())
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument("--steps", type=int, default=20)
+
+    args = parser.parse_args()
+
+    print('%8s %-10s %10s %14s' % ('size', 'mode', 'steps/s', 'elements/s'))
+    for size in args.sizes:
+        for mode in ('scalar', 'batch', 'array'):
+            as_array = mode == 'array'
+            outputs = ['v'] if as_array else ['v' + str(i) for i in range(size)]
+            nodes = {'P': {'inputs': [], 'outputs': outputs},
+                     'C': {'inputs': ['in_' + o for o in outputs], 'outputs': []}}
+            links = [('P', o, 'C', 'in_' + o) for o in outputs]
+
+            def factory(name, inputs, outputs, transport):
+                if name == 'P':
+                    return VectorProducer(None, name, size, as_array, output_attributes=outputs,
+                                          transport=transport, batch=mode == 'batch')
+                return VectorConsumer(None, name, inputs, outputs, transport=transport)
+
+            with tempfile.TemporaryDirectory() as directory:
+                config_file, schedule_file = write_scenario(directory, nodes, links, [['P'], ['C']],
+                                                            [1] * args.steps)
+                elapsed, _, _ = run_local(config_file, schedule_file, nodes, factory)
+            print('%8d %-10s %10.1f %14.0f' % (size, mode, args.steps / elapsed, size * args.steps / elapsed))
@@ -0,0 +1,51 @@
+"""
+Compares per-attribute and batched attribute publishing.
+
+P producers with M outputs each (first block) feed one consumer (second block).
+Reports the number of messages per step and the steps per second of both modes.
+"""
+import argparse
+import tempfile
+
+from benchmarks.common import NullNode, write_scenario, run_local
+
+
+def scenario(producers, outputs):
+    nodes = {}
+    links = []
+    consumer_inputs = []
+    for p in range(producers):
+        name = 'P' + str(p)
+        attrs = [name + '_o' + str(o) for o in range(outputs)]
+        nodes[name] = {'inputs': [], 'outputs': attrs}
+        for attr in attrs:
+            links.append((name, attr, 'C', 'in_' + attr))
+            consumer_inputs.append('in_' + attr)
+    nodes['C'] = {'inputs': consumer_inputs, 'outputs': []}
+    blocks = [sorted(n for n in nodes if n != 'C'), ['C']]
+    return nodes, links, blocks
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--producers", type=int, default=10)
+    parser.add_argument("--outputs", type=int, default=50)
+    parser.add_argument("--steps", type=int, default=100)
+
+    args = parser.parse_args()
+
+    nodes, links, blocks = scenario(args.producers, args.outputs)
+    with tempfile.TemporaryDirectory() as directory:
+        config_file, schedule_file = write_scenario(directory, nodes, links, blocks, [1] * args.steps)
+
+        print('producers: %d, outputs/producer: %d, steps: %d' % (args.producers, args.outputs, args.steps))
+        print('%-10s %14s %14s %10s' % ('mode', 'published/step', 'delivered/step', 'steps/s'))
+        for batch in (False, True):
+            elapsed, published, delivered = run_local(
+                config_file, schedule_file, nodes,
+                lambda name, inputs, outputs, transport: NullNode(None, name, inputs, outputs,
+                                                                  transport=transport, batch=batch))
+            print('%-10s %14.1f %14.1f %10.1f' % ('batch' if batch else 'attribute',
+                                                  published / args.steps, delivered / args.steps,
+                                                  args.steps / elapsed))
@@ -0,0 +1,69 @@
+"""
+Helpers shared by the benchmarks: scenario files and in-process runs on a LocalBroker.
+"""
+import os
+import json
+import time
+
+from obnl.client import ClientNode
+from obnl.impl.server import Scheduler
+from obnl.impl.transports import LocalBroker, LocalTransport
+
+
+class NullNode(ClientNode):
+    """
+    A Node sending a constant value for each of its outputs at every step.
+    """
+
+    def step(self, current_time, time_step):
+        for o in self.output_attributes:
+            self.update_attribute(o, current_time)
+
+
+def write_scenario(directory, nodes, links, blocks, steps):
+    """
+    Writes the config and schedule files of a scenario.
+
+    :param directory: the directory to write to
+    :param nodes: a map of node names to {"inputs": [...], "outputs": [...]}
+    :param links: a list of (node_out, attr_out, node_in, attr_in)
+    :param blocks: the list of schedule blocks
+    :param steps: the list of time steps
+    :return: the config file and the schedule file
+    """
+    config_file = os.path.join(directory, 'config.json')
+    schedule_file = os.path.join(directory, 'schedule.json')
+
+    config = {
+        'nodes': nodes,
+        'links': {'l' + str(i): {'out': {'node': no, 'attr': ao}, 'in': {'node': ni, 'attr': ai}}
+                  for i, (no, ao, ni, ai) in enumerate(links)}
+    }
+    with open(config_file, 'w') as f:
+        json.dump(config, f)
+    with open(schedule_file, 'w') as f:
+        json.dump({'schedule': blocks, 'steps': steps}, f)
+    return config_file, schedule_file
+
+
+def run_local(config_file, schedule_file, nodes, node_factory):
+    """
+    Runs a whole simulation in the calling thread on a new LocalBroker.
+
+    :param config_file: the config file of the scenario
+    :param schedule_file: the schedule file of the scenario
+    :param nodes: a map of node names to {"inputs": [...], "outputs": [...]}
+    :param node_factory: a function (name, inputs, outputs, transport) creating a ClientNode
+    :return: the elapsed time (s), the number of published and delivered messages
+    """
+    broker = LocalBroker()
+    Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker))
+    for name, data in nodes.items():
+        node_factory(name, data['inputs'], data['outputs'], LocalTransport(broker))
+
+    start = time.perf_counter()
+    try:
+        broker.run_until_idle()
+    except SystemExit:
+        pass
+    return time.perf_counter() - start, broker.published, broker.delivered
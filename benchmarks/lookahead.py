@@ -0,0 +1,96 @@
+"""
+Compares the barrier and the lookahead modes of the Scheduler on a wide, shallow topology.
+
+W independent chains of D nodes (one block per level) run with one thread per node
+on a LocalBroker. The step of each node sleeps for a random time, different at
+each step, so that the barrier waits for the slowest node of each block while
+the lookahead mode lets each chain advance on its own.
+Both modes must give the same results.
+"""
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+from benchmarks.common import write_scenario
+
+from obnl.client import ClientNode
+from obnl.impl.server import Scheduler
+from obnl.impl.transports import LocalBroker, LocalTransport
+
+
+class SleepingNode(ClientNode):
+
+    def __init__(self, host, name, input_attributes, output_attributes, transport, max_cost):
+        super(SleepingNode, self).__init__(host, name, input_attributes, output_attributes, transport=transport)
+        self._max_cost = max_cost
+        self.results = []
+
+    def step(self, current_time, time_step):
+        inputs = sorted(self.input_values.items())
+        value = hash((self.name, current_time, tuple(inputs))) % 1000
+        time.sleep(random.Random(hash((self.name, current_time))).random() * self._max_cost)
+        self.results.append((current_time, inputs))
+        for o in self.output_attributes:
+            self.update_attribute(o, value)
+
+
+def scenario(width, depth):
+    nodes = {}
+    links = []
+    blocks = [[] for _ in range(depth)]
+    for w in range(width):
+        for d in range(depth):
+            name = 'N%d_%d' % (w, d)
+            nodes[name] = {'inputs': ['in'] if d else [], 'outputs': [name + '_out'] if d < depth - 1 else []}
+            blocks[d].append(name)
+            if d:
+                previous = 'N%d_%d' % (w, d - 1)
+                links.append((previous, previous + '_out', name, 'in'))
+    return nodes, links, blocks
+
+
+def run(config_file, schedule_file, nodes, lookahead, max_cost):
+    broker = LocalBroker()
+    scheduler = Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker), lookahead=lookahead)
+    clients = [SleepingNode(None, name, data['inputs'], data['outputs'], LocalTransport(broker), max_cost)
+               for name, data in nodes.items()]
+
+    start = time.perf_counter()
+    threads = [client.start() for client in clients]
+
+    def run_scheduler():
+        try:
+            scheduler.start()
+        except SystemExit:
+            pass
+    thread = threading.Thread(target=run_scheduler)
+    thread.start()
+    thread.join()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, {client.name: client.results for client in clients}
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--max-cost", type=float, default=0.01, help="maximum step time (s)")
+
+    args = parser.parse_args()
+
+    nodes, links, blocks = scenario(args.width, args.depth)
+    with tempfile.TemporaryDirectory() as directory:
+        config_file, schedule_file = write_scenario(directory, nodes, links, blocks, [1] * args.steps)
+
+        barrier_time, barrier_results = run(config_file, schedule_file, nodes, False, args.max_cost)
+        lookahead_time, lookahead_results = run(config_file, schedule_file, nodes, True, args.max_cost)
+
+    print('width %d, depth %d, steps %d' % (args.width, args.depth, args.steps))
+    print('barrier:   %.2fs (%.1f steps/s)' % (barrier_time, args.steps / barrier_time))
+    print('lookahead: %.2fs (%.1f steps/s)' % (lookahead_time, args.steps / lookahead_time))
+    print('same results: %s' % (barrier_results == lookahead_results))
@@ -0,0 +1,134 @@
+"""
+Compares N buildings simulated by N ClientNodes with one PopulationNode of N entities.
+
+A weather node sends the outdoor temperature to every building, and an aggregator
+reads the indoor temperature of every building (T[k+1] = T[k] + dt * (T_out - T[k]) / TAU):
+- nodes: one ClientNode per building, N links in and N links out,
+- entities: one PopulationNode, the weather linked to the whole population and the
+  aggregator to each entity (T[i], N selections sent in batch),
+- array: one PopulationNode, the aggregator linked to the whole array.
+The simulations run in-process on a LocalBroker and must give the same results.
+"""
+import argparse
+import tempfile
+
+import numpy
+
+from benchmarks.common import write_scenario, run_local
+
+from obnl.client import ClientNode
+from obnl.population import PopulationNode
+
+TAU = 10.
+T0 = 20.
+
+
+class Weather(ClientNode):
+
+    def step(self, current_time, time_step):
+        self.update_attribute('t_out', 5. + current_time % 7)
+
+
+class Building(ClientNode):
+
+    def __init__(self, host, name, input_attributes, output_attributes, transport):
+        super(Building, self).__init__(host, name, input_attributes, output_attributes, transport=transport)
+        self._t = T0
+
+    def step(self, current_time, time_step):
+        self._t += time_step * (self.input_values['t_out'] - self._t) / TAU
+        self.update_attribute(self.output_attributes[0], self._t)
+
+
+class Buildings(PopulationNode):
+
+    def __init__(self, host, name, size, input_attributes, output_attributes, transport):
+        super(Buildings, self).__init__(host, name, size, input_attributes, output_attributes,
+                                        transport=transport, batch=True)
+        self._t = numpy.full(size, T0)
+
+    def step(self, current_time, time_step):
+        self._t += time_step * (self.input_values['t_out'] - self._t) / TAU
+        self.update_attribute('t', self._t)
+
+
+class Aggregator(ClientNode):
+
+    def __init__(self, host, name, input_attributes, output_attributes, transport):
+        super(Aggregator, self).__init__(host, name, input_attributes, output_attributes, transport=transport)
+        self.means = []
+
+    def step(self, current_time, time_step):
+        values = [numpy.mean(v) for _, v in sorted(self.input_values.items())]
+        self.means.append(float(numpy.mean(values)))
+
+
+def scenario(variant, size):
+    """
+    :return: the nodes and the links of a variant
+    """
+    nodes = {'weather': {'inputs': [], 'outputs': ['t_out']}}
+    links = []
+    if variant == 'nodes':
+        # the attributes are routed by name: one output name per building
+        for i in range(size):
+            name = 'b%d' % i
+            nodes[name] = {'inputs': ['t_out'], 'outputs': ['t%d' % i]}
+            links.append(('weather', 't_out', name, 't_out'))
+            links.append((name, 't%d' % i, 'aggregator', 't%d' % i))
+        nodes['aggregator'] = {'inputs': ['t%d' % i for i in range(size)], 'outputs': []}
+    else:
+        nodes['buildings'] = {'inputs': ['t_out'], 'outputs': ['t']}
+        links.append(('weather', 't_out', 'buildings', 't_out'))
+        if variant == 'entities':
+            links.extend(('buildings', 't[%d]' % i, 'aggregator', 't%d' % i) for i in range(size))
+            nodes['aggregator'] = {'inputs': ['t%d' % i for i in range(size)], 'outputs': []}
+        else:
+            links.append(('buildings', 't', 'aggregator', 't'))
+            nodes['aggregator'] = {'inputs': ['t'], 'outputs': []}
+    blocks = [['weather'], [n for n in nodes if n not in ('weather', 'aggregator')], ['aggregator']]
+    return nodes, links, blocks
+
+
+def run(variant, size, steps, directory):
+    nodes, links, blocks = scenario(variant, size)
+    config_file, schedule_file = write_scenario(directory, nodes, links, blocks, [1.] * steps)
+    aggregator = []
+
+    def factory(name, inputs, outputs, transport):
+        if name == 'weather':
+            return Weather(None, name, inputs, outputs, transport=transport)
+        if name == 'aggregator':
+            aggregator.append(Aggregator(None, name, inputs, outputs, transport))
+            return aggregator[0]
+        if name == 'buildings':
+            return Buildings(None, name, size, inputs, outputs, transport)
+        return Building(None, name, inputs, outputs, transport)
+
+    elapsed, published, delivered = run_local(config_file, schedule_file, nodes, factory)
+    return elapsed, published, delivered, aggregator[0].means
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs='+', default=[100, 1000, 5000],
+                        help="numbers of buildings (default: 100 1000 5000)")
+    parser.add_argument("--steps", type=int, default=10, help="number of steps (default: 10)")
+    parser.add_argument("--variants", nargs='+', default=['nodes', 'entities', 'array'],
+                        choices=['nodes', 'entities', 'array'], help="the compared variants (default: all)")
+
+    args = parser.parse_args()
+
+    print('%-9s %7s %12s %14s %14s' % ('variant', 'size', 'ms/step', 'published/step', 'delivered/step'))
+    for size in args.sizes:
+        reference = None
+        for variant in args.variants:
+            with tempfile.TemporaryDirectory() as directory:
+                elapsed, published, delivered, means = run(variant, size, args.steps, directory)
+            print('%-9s %7d %12.2f %14.1f %14.1f' % (variant, size, elapsed / args.steps * 1e3,
+                                                     published / args.steps, delivered / args.steps))
+            if reference is None:
+                reference = means
+            elif not numpy.allclose(means, reference):
+                raise SystemExit('%s gives different results: %s instead of %s' % (variant, means, reference))
@@ -0,0 +1,303 @@
+"""
+End-to-end scale benchmark: whole simulations on synthetic topologies.
+
+Topologies (N nodes, one output per node read by others):
+- chain: N0 -> N1 -> ... (one block per node)
+- star: the leaves send to the hub, the hub sends back to every leaf (blocks: leaves, hub)
+- all-to-all: every node reads every other node (one block, N*(N-1) links)
+- dag: layers of sqrt(N) nodes, each node reads FANIN nodes of the previous layer (one block per layer)
+
+The Nodes step in no time or busy-wait a fixed cost. The simulation runs in-process
+on a LocalBroker (one thread), or on an AMQP broker given by --host (one thread per
+node, the nodes of the process sharing one connection). Each scenario runs in its
+own process so that its peak memory can be measured.
+
+Reports steps/s, the per-step latency percentiles, the messages and bytes per step
+(counted by a MetricsRegistry) and the peak memory, and writes them in a JSON file.
+With --baseline, the steps/s are compared with a previous result file and the run
+fails if one scenario is slower than the tolerance.
+"""
+import sys
+import json
+import math
+import time
+import logging
+import platform
+import argparse
+import resource
+import tempfile
+import multiprocessing
+
+from benchmarks.common import write_scenario
+
+from obnl.client import ClientNode
+from obnl.impl.server import Scheduler
+from obnl.impl.metrics import MetricsRegistry
+from obnl.impl.transports import LocalBroker, LocalTransport, AMQPTransport
+
+TOPOLOGIES = ('chain', 'star', 'all-to-all', 'dag')
+PERCENTILES = (50, 90, 99)
+
+
+class CostNode(ClientNode):
+    """
+    A Node busy-waiting a fixed cost then sending its step time on each of its outputs.
+    """
+
+    def __init__(self, host, name, input_attributes, output_attributes, is_first, transport, batch, cost,
+                 shared_connection=False):
+        super(CostNode, self).__init__(host, name, input_attributes, output_attributes, is_first,
+                                       transport=transport, batch=batch, shared_connection=shared_connection)
+        self._cost = cost
+
+    def step(self, current_time, time_step):
+        if self._cost:
+            end = time.perf_counter() + self._cost
+            while time.perf_counter() < end:
+                pass
+        for o in self.output_attributes:
+            self.update_attribute(o, current_time)
+
+
+class StepRegistry(MetricsRegistry):
+    """
+    A MetricsRegistry keeping the wall time of every simulation step.
+    """
+
+    def __init__(self):
+        super(StepRegistry, self).__init__()
+        self.step_marks = []
+
+    def step_done(self, simulation_time):
+        super(StepRegistry, self).step_done(simulation_time)
+        self.step_marks.append(time.perf_counter())
+
+
+def scenario(topology, n, fanin=2):
+    """
+    :return: the nodes, the links and the blocks of a topology of n nodes
+    """
+    names = ['N' + str(i) for i in range(n)]
+    links = []
+    if topology == 'chain':
+        blocks = [[name] for name in names]
+        links = [(names[i - 1], names[i - 1] + '_out', names[i], 'in') for i in range(1, n)]
+    elif topology == 'star':
+        hub, leaves = names[0], names[1:]
+        blocks = [leaves, [hub]]
+        for leaf in leaves:
+            links.append((leaf, leaf + '_out', hub, 'in_' + leaf))
+            links.append((hub, hub + '_out', leaf, 'in'))
+    elif topology == 'all-to-all':
+        blocks = [names]
+        links = [(a, a + '_out', b, 'in_' + a) for a in names for b in names if a != b]
+    elif topology == 'dag':
+        width = max(1, int(math.ceil(math.sqrt(n))))
+        blocks = [names[i:i + width] for i in range(0, n, width)]
+        for previous, layer in zip(blocks, blocks[1:]):
+            for i, name in enumerate(layer):
+                for k in range(min(fanin, len(previous))):
+                    source = previous[(i + k) % len(previous)]
+                    links.append((source, source + '_out', name, 'in_' + source))
+    else:
+        raise ValueError('Unknown topology ' + topology)
+
+    nodes = {name: {'inputs': [], 'outputs': []} for name in names}
+    for node_out, attr_out, node_in, attr_in in links:
+        nodes[node_in]['inputs'].append(attr_in)
+        if not nodes[node_out]['outputs']:
+            nodes[node_out]['outputs'].append(attr_out)
+    return nodes, links, blocks
+
+
+def first_nodes(links, blocks):
+    """
+    :return: the nodes reading a node of the same or of a later block: they cannot wait
+             for their inputs at the first step
+    """
+    position = {node: i for i, block in enumerate(blocks) for node in block}
+    return {node_in for node_out, _, node_in, _ in links if position[node_out] >= position[node_in]}
+
+
+def percentile(values, p):
+    if not values:
+        return 0.
+    return values[min(len(values) - 1, int(len(values) * p / 100.))]
+
+
+def run_scenario(options, topology, n):
+    """
+    Runs one scenario (in the calling process).
+
+    :return: the result entry of the scenario
+    """
+    nodes, links, blocks = scenario(topology, n, options['fanin'])
+    firsts = first_nodes(links, blocks)
+    host = options['host']
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_file, schedule_file = write_scenario(directory, nodes, links, blocks, [1] * options['steps'])
+
+        registry = StepRegistry()
+        broker = LocalBroker() if host is None else None
+
+        def transport():
+            return LocalTransport(broker) if broker is not None else None
+
+        start = time.perf_counter()
+        scheduler = Scheduler(host, config_file, schedule_file,
+                              transport=transport() if broker is not None else AMQPTransport(host),
+                              lookahead=options['lookahead'], compact=options['compact'])
+        scheduler.metrics = registry
+        clients = []
+        for name, data in nodes.items():
+            client = CostNode(host, name, data['inputs'], data['outputs'], name in firsts, transport(),
+                              options['batch'], options['cost'], shared_connection=broker is None)
+            client.metrics = registry
+            clients.append(client)
+        setup = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if broker is not None:
+            try:
+                broker.run_until_idle()
+            except SystemExit:
+                pass
+        else:
+            threads = [client.start() for client in clients]
+            try:
+                scheduler.start()
+            except SystemExit:
+                pass
+            for thread in threads:
+                thread.join()
+        end = time.perf_counter()
+
+    marks = [start] + registry.step_marks
+    latencies = sorted(t1 - t0 for t0, t1 in zip(marks, marks[1:]))
+    steps = len(registry.step_marks)
+    snapshot = registry.snapshot()
+    messages = sum(node['messages_out'] for node in snapshot['nodes'].values())
+    size = sum(node['bytes_out'] for node in snapshot['nodes'].values())
+
+    return {
+        'topology': topology,
+        'nodes': n,
+        'links': len(links),
+        'blocks': len(blocks),
+        'steps': steps,
+        'setup': setup,
+        'run': end - start,
+        'steps_per_second': steps / (end - start) if end > start else 0.,
+        'latency': dict([('p%d' % p, percentile(latencies, p)) for p in PERCENTILES] +
+                        [('max', latencies[-1] if latencies else 0.)]),
+        'messages_per_step': messages / float(steps) if steps else 0.,
+        'bytes_per_step': size / float(steps) if steps else 0.,
+        # ru_maxrss is in KiB on Linux
+        'peak_memory_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.,
+    }
+
+
+def _child(queue, options, topology, n):
+    # the links inside a block (all-to-all) are reported once per link
+    logging.getLogger('obnl.impl.server').setLevel(logging.ERROR)
+    try:
+        queue.put(run_scenario(options, topology, n))
+    except BaseException as e:
+        queue.put({'topology': topology, 'nodes': n, 'error': repr(e)})
+
+
+def run_isolated(options, topology, n, timeout):
+    """
+    Runs one scenario in a new process.
+
+    :return: the result entry of the scenario
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(queue, options, topology, n))
+    process.start()
+    try:
+        result = queue.get(timeout=timeout)
+    except Exception:
+        process.terminate()
+        result = {'topology': topology, 'nodes': n, 'error': 'timeout after %gs' % timeout}
+    process.join()
+    return result
+
+
+def compare(results, baseline_file, tolerance):
+    """
+    Compares the steps/s of the results with a previous result file.
+
+    :return: the report lines and the number of regressions
+    """
+    with open(baseline_file) as f:
+        baseline = {(r['topology'], r['nodes']): r for r in json.load(f)['results'] if 'error' not in r}
+    lines = []
+    regressions = 0
+    for result in results:
+        previous = baseline.get((result['topology'], result['nodes']))
+        if previous is None or 'error' in result or not previous['steps_per_second']:
+            continue
+        ratio = result['steps_per_second'] / previous['steps_per_second']
+        regressed = ratio < 1. - tolerance
+        regressions += regressed
+        lines.append('%-10s %6d  %10.1f -> %10.1f steps/s (%+.1f%%)%s'
+                     % (result['topology'], result['nodes'], previous['steps_per_second'],
+                        result['steps_per_second'], (ratio - 1.) * 100, '  REGRESSION' if regressed else ''))
+    return lines, regressions
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topologies", nargs='+', choices=TOPOLOGIES, default=list(TOPOLOGIES))
+    parser.add_argument("--nodes", type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--cost", type=float, default=0., help="busy time of each step (in seconds)")
+    parser.add_argument("--fanin", type=int, default=2, help="inputs of each node of the dag")
+    parser.add_argument("--max-links", type=int, default=250000,
+                        help="skips the scenarios with more links (all-to-all grows as N^2)")
+    parser.add_argument("--host", help="AMQP broker (in-process LocalBroker if not given)")
+    parser.add_argument("--lookahead", action="store_true")
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--batch", action="store_true")
+    parser.add_argument("--timeout", type=float, default=600., help="maximum time of a scenario (in seconds)")
+    parser.add_argument("--output", default="scale.json", help="the JSON result file")
+    parser.add_argument("--baseline", help="a previous result file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="slowdown of the steps/s accepted before a regression (fraction)")
+
+    args = parser.parse_args()
+    options = {'steps': args.steps, 'cost': args.cost, 'fanin': args.fanin, 'host': args.host,
+               'lookahead': args.lookahead, 'compact': args.compact, 'batch': args.batch}
+
+    print('%-10s %6s %8s %10s %10s %10s %10s %12s %10s'
+          % ('topology', 'nodes', 'links', 'steps/s', 'p50 (ms)', 'p99 (ms)', 'msgs/step', 'bytes/step', 'peak (MB)'))
+    results = []
+    for topology in args.topologies:
+        for n in args.nodes:
+            links = len(scenario(topology, n, args.fanin)[1]) if topology != 'all-to-all' else n * (n - 1)
+            if links > args.max_links:
+                print('%-10s %6d %8d skipped (--max-links)' % (topology, n, links))
+                continue
+            result = run_isolated(options, topology, n, args.timeout)
+            results.append(result)
+            if 'error' in result:
+                print('%-10s %6d %8d %s' % (topology, n, links, result['error']))
+                continue
+            print('%-10s %6d %8d %10.1f %10.2f %10.2f %10.1f %12.0f %10.1f'
+                  % (topology, n, links, result['steps_per_second'], result['latency']['p50'] * 1e3,
+                     result['latency']['p99'] * 1e3, result['messages_per_step'], result['bytes_per_step'],
+                     result['peak_memory_mb']))
+
+    with open(args.output, 'w') as f:
+        json.dump({'timestamp': time.time(), 'python': platform.python_version(), 'platform': platform.platform(),
+                   'options': options, 'results': results}, f, indent=2)
+
+    if args.baseline:
+        lines, regressions = compare(results, args.baseline, args.tolerance)
+        print('\n'.join(lines))
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,120 @@
+"""
+Drives the Scheduler with fake Nodes to measure its barrier bookkeeping.
+
+The fake Nodes share one LocalTransport and answer every NextStep with a
+pre-serialized message, so most of the measured time is spent in the Scheduler.
+Reports the per-barrier latency (from one NextStep broadcast to the next) and the
+part of it spent in the Scheduler callbacks.
+"""
+import time
+import argparse
+import tempfile
+
+from benchmarks.common import write_scenario
+
+from obnl.impl.node import Node
+from obnl.impl.server import Scheduler
+from obnl.impl.transports import LocalBroker, LocalTransport
+from obnl.impl.message import MetaMessage, SimulatorConnection, NextStep
+
+
+class FakeNodes(object):
+    """
+    Many Nodes answering NextStep messages as soon as they are received.
+    """
+
+    def __init__(self, broker, names):
+        self._transport = LocalTransport(broker)
+        self._answers = {}
+
+        for name in names:
+            queue = self._transport.declare_queue(Node.SIMULATION_NODE_QUEUE + name)
+            self._transport.declare_exchange(Node.SIMULATION_NODE_EXCHANGE + name)
+            self._transport.consume(queue, self.on_simulation_message, consumer_tag=name)
+
+            m = MetaMessage()
+            m.node_name = name
+            m.type = MetaMessage.ANSWER
+            m.details.Pack(NextStep())
+            self._answers[name] = m.SerializeToString()
+
+    def connect(self):
+        for name in self._answers:
+            m = MetaMessage()
+            m.node_name = name
+            m.details.Pack(SimulatorConnection())
+            self._transport.publish(Node.SIMULATION_NODE_EXCHANGE + name,
+                                    Node.SIMULATION_NODE_EXCHANGE + Node.SCHEDULER_NAME,
+                                    m.SerializeToString(),
+                                    reply_to=Node.SIMULATION_NODE_QUEUE + name)
+
+    def on_simulation_message(self, ch, method, props, body):
+        if props.reply_to:
+            self._transport.publish('', props.reply_to, self._answers[method.consumer_tag])
+
+
+class TimedScheduler(Scheduler):
+    """
+    A Scheduler recording the time of each barrier and the time spent in its callbacks.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.barriers = []
+        self.busy = 0.
+        super(TimedScheduler, self).__init__(*args, **kwargs)
+
+    def _update_time(self):
+        self.barriers.append((time.perf_counter(), self.busy))
+        return super(TimedScheduler, self)._update_time()
+
+    def on_simulation_message(self, ch, method, props, body):
+        start = time.perf_counter()
+        try:
+            super(TimedScheduler, self).on_simulation_message(ch, method, props, body)
+        finally:
+            self.busy += time.perf_counter() - start
+
+
+def run(nodes, blocks, steps):
+    names = ['N' + str(i) for i in range(nodes)]
+    schedule = [names[b::blocks] for b in range(blocks)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_file, schedule_file = write_scenario(
+            directory, {n: {'inputs': [], 'outputs': []} for n in names}, [], schedule, [1] * steps)
+
+        broker = LocalBroker()
+        start = time.perf_counter()
+        scheduler = TimedScheduler(None, config_file, schedule_file, transport=LocalTransport(broker))
+        fake_nodes = FakeNodes(broker, names)
+        setup = time.perf_counter() - start
+
+        fake_nodes.connect()
+        try:
+            broker.run_until_idle()
+        except SystemExit:
+            pass
+        end = time.perf_counter()
+
+    marks = scheduler.barriers + [(end, scheduler.busy)]
+    latencies = sorted(t1 - t0 for (t0, _), (t1, _) in zip(marks, marks[1:]))
+    busy = sorted(b1 - b0 for (_, b0), (_, b1) in zip(marks, marks[1:]))
+    return setup, latencies, busy
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument("--blocks", type=int, default=2)
+    parser.add_argument("--steps", type=int, default=5)
+
+    args = parser.parse_args()
+
+    print('%8s %10s %14s %14s %14s' % ('nodes', 'setup (s)', 'barrier p50', 'barrier max', 'scheduler p50'))
+    for n in args.nodes:
+        setup, latencies, busy = run(n, args.blocks, args.steps)
+        print('%8d %10.2f %12.2fms %12.2fms %12.2fms' % (n, setup,
+                                                         latencies[len(latencies) // 2] * 1e3,
+                                                         latencies[-1] * 1e3,
+                                                         busy[len(busy) // 2] * 1e3))
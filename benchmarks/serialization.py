@@ -0,0 +1,92 @@
+"""
+Compares the MetaMessage envelope (sender name, google.protobuf.Any payload) with
+the compact Envelope (interned IDs, type given by the field number).
+
+Reports, for each message kind, the bytes per message and the encode/decode time
+(decode includes finding the message type and resolving the attribute names).
+"""
+import argparse
+import timeit
+
+from obnl.impl.envelope import encode, decode
+from obnl.impl.message import MetaMessage, AttributeMessage, AttributeBatch, NextStep
+
+SENDER = 'building_envelope_model_42'
+SENDER_ID = 42
+SENDER_NAMES = {SENDER_ID: SENDER}
+
+
+def attribute_names(message, names):
+    if isinstance(message, AttributeMessage):
+        return [message.attribute_name or names[message.attribute_id]]
+    if isinstance(message, AttributeBatch):
+        return [am.attribute_name or names[am.attribute_id] for am in message.attributes]
+    return list(message.updates) + [names[i] for i in message.update_ids]
+
+
+def messages(compact, attributes):
+    """
+    :return: the messages (kind, message, MetaMessage type) with names or IDs
+    """
+    names = ['zone_temperature_' + str(i) for i in range(attributes)]
+
+    am = AttributeMessage()
+    am.simulation_time = 900.
+    if compact:
+        am.attribute_id = 1
+    else:
+        am.attribute_name = names[0]
+    am.attribute_value = 21.5
+
+    ab = AttributeBatch()
+    ab.simulation_time = 900.
+    for i, name in enumerate(names):
+        batch_am = ab.attributes.add()
+        if compact:
+            batch_am.attribute_id = i + 1
+        else:
+            batch_am.attribute_name = name
+        batch_am.attribute_value = 20. + i
+
+    ns = NextStep()
+    ns.current_time = 900.
+    ns.time_step = 60.
+    for i, name in enumerate(names):
+        if compact:
+            ns.update_ids[i + 1] = 840.
+        else:
+            ns.updates[name] = 840.
+
+    return [('attribute', am, MetaMessage.ATTRIBUTE),
+            ('batch (%d)' % attributes, ab, MetaMessage.ATTRIBUTE_BATCH),
+            ('next step (%d)' % attributes, ns, MetaMessage.ANSWER)], \
+        {i + 1: name for i, name in enumerate(names)}
+
+
+def measure(message, message_type, sender_id, names, number):
+    body = encode(message, SENDER, sender_id, message_type)
+    encode_time = timeit.timeit(lambda: encode(message, SENDER, sender_id, message_type), number=number)
+
+    def decode_message():
+        sender, decoded = decode(body, SENDER_NAMES)
+        return attribute_names(decoded, names)
+    decode_time = timeit.timeit(decode_message, number=number)
+    return len(body), encode_time / number * 1e9, decode_time / number * 1e9
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--attributes", type=int, default=10, help="number of attributes of the batch/next step")
+    parser.add_argument("--number", type=int, default=20000)
+
+    args = parser.parse_args()
+
+    print('%-16s %-8s %8s %12s %12s' % ('message', 'envelope', 'bytes', 'encode (ns)', 'decode (ns)'))
+    for compact in (False, True):
+        kinds, names = messages(compact, args.attributes)
+        for kind, message, message_type in kinds:
+            size, encode_ns, decode_ns = measure(message, message_type, SENDER_ID if compact else 0,
+                                                 names, args.number)
+            print('%-16s %-8s %8d %12.0f %12.0f' % (kind, 'compact' if compact else 'meta',
+                                                    size, encode_ns, decode_ns))
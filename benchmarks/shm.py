@@ -0,0 +1,239 @@
+"""
+Compares the data links between two processes of the same host: through shared memory
+(SharedMemoryTransport), through a direct Unix socket connection (PeerTransport), through
+the AMQP broker given by --host, and through a bare loopback TCP connection without any
+Transport (the lower bound of a socket hop: a message through the broker makes two).
+
+Each transport runs between a 'ping' and a 'pong' process:
+- latency: ping sends a message, pong sends it back, COUNT times (round trip percentiles),
+- throughput: ping sends COUNT messages at once, pong answers after the last one (messages/s).
+
+The shared memory and peer links are opened as the Scheduler would (see Transport.open_data_links),
+from the started transport, the rest of each process running on its own LocalBroker: only
+the data goes between them.
+"""
+import os
+import time
+import uuid
+import socket
+import tempfile
+import argparse
+import multiprocessing
+
+from obnl.impl.node import Node
+from obnl.impl.shm import SharedMemoryTransport
+from obnl.impl.peer import PeerTransport
+from obnl.impl.message import DataLink
+from obnl.impl.transports import LocalBroker, LocalTransport, AMQPTransport
+
+PERCENTILES = (50, 99)
+ATTRIBUTE = 'x'
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100.))]
+
+
+def peer_endpoint(plane, name):
+    return 'unix://' + os.path.join(tempfile.gettempdir(), 'obnl-bench-%s-%s.sock' % (plane, name))
+
+
+def open_transport(kind, host, plane, name, peer, on_data, on_open):
+    """
+    :return: a transport publishing to the peer and calling on_data with its messages,
+             and on_open once started
+    """
+    if kind == 'shm':
+        transport = SharedMemoryTransport(LocalTransport(LocalBroker()))
+    elif kind == 'peer':
+        transport = PeerTransport(LocalTransport(LocalBroker()), listen=peer_endpoint(plane, name))
+    else:
+        transport = AMQPTransport(host)
+    for node in (name, peer):
+        transport.declare_exchange(Node.DATA_NODE_EXCHANGE + node)
+        transport.declare_queue(Node.DATA_NODE_QUEUE + node)
+    transport.bind(Node.DATA_NODE_EXCHANGE + name, Node.DATA_NODE_QUEUE + peer,
+                   routing_key=Node.DATA_NODE_EXCHANGE + ATTRIBUTE)
+    transport.consume(Node.DATA_NODE_QUEUE + name, on_data)
+    if kind == 'peer':
+        # listening once the data callback is known (as a Node does)
+        transport.data_endpoint(name)
+
+    def open_links():
+        if kind == 'shm':
+            transport.open_data_links(name, plane, [DataLink(node=peer, attributes=[ATTRIBUTE])],
+                                      [DataLink(node=peer)], [])
+        elif kind == 'peer':
+            endpoint = peer_endpoint(plane, peer)
+            while not os.path.exists(endpoint[len('unix://'):]):
+                time.sleep(0.01)
+            transport.open_data_links(name, plane, [DataLink(node=peer, attributes=[ATTRIBUTE], endpoint=endpoint)],
+                                      [], [])
+        on_open()
+    transport.call_threadsafe(open_links)
+    return transport
+
+
+def run_ping(kind, host, plane, mode, count, size, ready, results):
+    body = b'\1' * size
+    state = {'sent': 0., 'received': 0, 'start': 0.}
+    times = []
+
+    def on_data(ch, method, props, message):
+        now = time.perf_counter()
+        if mode == 'latency':
+            times.append(now - state['sent'])
+            if len(times) < count:
+                state['sent'] = time.perf_counter()
+                transport.publish(Node.DATA_NODE_EXCHANGE + 'ping', Node.DATA_NODE_EXCHANGE + ATTRIBUTE, body)
+                return
+            transport.publish(Node.DATA_NODE_EXCHANGE + 'ping', Node.DATA_NODE_EXCHANGE + ATTRIBUTE, b'')
+        else:
+            times.append(now - state['start'])
+        transport.stop()
+
+    def on_open():
+        ready.wait()
+        state['start'] = state['sent'] = time.perf_counter()
+        for _ in range(count if mode == 'throughput' else 1):
+            transport.publish(Node.DATA_NODE_EXCHANGE + 'ping', Node.DATA_NODE_EXCHANGE + ATTRIBUTE, body)
+
+    transport = open_transport(kind, host, plane, 'ping', 'pong', on_data, on_open)
+    transport.start()
+    results.put(times)
+
+
+def run_pong(kind, host, plane, mode, count, size, ready, results):
+    state = {'received': 0}
+
+    def on_data(ch, method, props, message):
+        state['received'] += 1
+        if mode == 'latency':
+            if not message:
+                transport.stop()
+                return
+            transport.publish(Node.DATA_NODE_EXCHANGE + 'pong', Node.DATA_NODE_EXCHANGE + ATTRIBUTE, message)
+        elif state['received'] == count:
+            transport.publish(Node.DATA_NODE_EXCHANGE + 'pong', Node.DATA_NODE_EXCHANGE + ATTRIBUTE, b'')
+            transport.stop()
+
+    transport = open_transport(kind, host, plane, 'pong', 'ping', on_data, ready.set)
+    transport.start()
+    transport.flush()
+
+
+def _recv_exactly(connection, size):
+    data = b''
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise EOFError()
+        data += chunk
+    return data
+
+
+def _recv_frame(connection):
+    return _recv_exactly(connection, int.from_bytes(_recv_exactly(connection, 4), 'little'))
+
+
+def _send_frame(connection, body):
+    connection.sendall(len(body).to_bytes(4, 'little') + body)
+
+
+def run_tcp_pong(port, mode, count, ready):
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', port))
+    listener.listen(1)
+    ready.set()
+    connection, _ = listener.accept()
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    received = 0
+    while True:
+        body = _recv_frame(connection)
+        received += 1
+        if mode == 'latency':
+            if not body:
+                break
+            _send_frame(connection, body)
+        elif received == count:
+            _send_frame(connection, b'')
+            break
+    connection.close()
+    listener.close()
+
+
+def run_tcp_ping(port, mode, count, size, ready, results):
+    ready.wait()
+    connection = socket.create_connection(('127.0.0.1', port))
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    body = b'\1' * size
+    times = []
+    if mode == 'latency':
+        for _ in range(count):
+            start = time.perf_counter()
+            _send_frame(connection, body)
+            _recv_frame(connection)
+            times.append(time.perf_counter() - start)
+        _send_frame(connection, b'')
+    else:
+        start = time.perf_counter()
+        for _ in range(count):
+            _send_frame(connection, body)
+        _recv_frame(connection)
+        times.append(time.perf_counter() - start)
+    connection.close()
+    results.put(times)
+
+
+def measure(kind, host, mode, count, size):
+    """
+    Runs ping and pong in two processes.
+
+    :return: the round trip times (latency) or the total time (throughput)
+    """
+    context = multiprocessing.get_context('spawn')
+    ready = context.Event()
+    results = context.Queue()
+    if kind == 'tcp':
+        probe = socket.socket()
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+        probe.close()
+        pong = context.Process(target=run_tcp_pong, args=(port, mode, count, ready))
+        ping = context.Process(target=run_tcp_ping, args=(port, mode, count, size, ready, results))
+    else:
+        plane = uuid.uuid4().hex
+        pong = context.Process(target=run_pong, args=(kind, host, plane, mode, count, size, ready, results))
+        ping = context.Process(target=run_ping, args=(kind, host, plane, mode, count, size, ready, results))
+    pong.start()
+    ping.start()
+    times = results.get()
+    ping.join()
+    pong.join()
+    return times
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", help="the AMQP host of the broker transport (not measured if not given)")
+    parser.add_argument("--count", type=int, default=20000, help="number of messages (default: 20000)")
+    parser.add_argument("--size", type=int, default=64, help="size of the messages in bytes (default: 64)")
+
+    args = parser.parse_args()
+
+    kinds = ['shm', 'peer', 'tcp'] + (['amqp'] if args.host else [])
+    print('%-6s %14s %14s %14s' % ('link', 'rtt p50 (us)', 'rtt p99 (us)', 'messages/s'))
+    rates = {}
+    for kind in kinds:
+        rtts = measure(kind, args.host, 'latency', args.count, args.size)
+        total = measure(kind, args.host, 'throughput', args.count, args.size)[0]
+        rates[kind] = (percentile(rtts, 50), args.count / total)
+        print('%-6s %14.1f %14.1f %14.0f' % (kind, percentile(rtts, 50) * 1e6, percentile(rtts, 99) * 1e6,
+                                             args.count / total))
+    for kind in kinds[1:]:
+        print('shm vs %-4s: %.1fx lower latency, %.1fx higher throughput'
+              % (kind, rates[kind][0] / rates['shm'][0], rates['shm'][1] / rates[kind][1]))
+    if not args.host:
+        print('(no --host: the broker is not measured, a message through it makes two tcp hops)')
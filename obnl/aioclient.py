@@ -0,0 +1,49 @@
+from obnl.client import ClientNode
+from obnl.impl.aionode import AsyncClientNode as _AsyncClientNodeImpl
+
+
+class AsyncClientNode(ClientNode):
+    """
+    A ClientNode running on an asyncio event loop. All the AsyncClientNodes of a
+    process share the loop and the AMQP connections, and interoperate with the
+    other (blocking) Nodes of the simulation.
+
+    The nodes are created and started from a coroutine, e.g.:
+        await asyncio.gather(*[node.start() for node in nodes])
+    """
+
+    def __init__(self, host, name, input_attributes=None, output_attributes=None, is_first=False, transport=None,
+                 batch=False, local_queue=False, publish_policies=None):
+        """
+
+        :param host: the AMQP host
+        :param name: the node name
+        :param input_attributes: the list of input attributes
+        :param output_attributes: the list of output attributes
+        :param is_first: True if the node does not wait for its inputs
+        :param transport: the AsyncTransport to use (an AsyncAMQPTransport on the shared connection to host if None),
+                          e.g. an AsyncLocalTransport to run the simulation in one process without broker
+        :param batch: if True, the attributes updated during a step are sent in one message when the step returns
+        :param local_queue: if True, the local queue is created so that external triggers can ask the node
+                            to check if it can step
+        :param publish_policies: a map of output attributes to PublishPolicy (see obnl.impl.policies),
+                                 the attributes without policy are always sent
+        """
+        self._node_impl = _AsyncClientNodeImpl(host, name, self, input_attributes, output_attributes, is_first,
+                                               transport, batch, local_queue, publish_policies)
+
+    async def start(self):
+        """
+        Listens until the end of the simulation.
+        """
+        await self._node_impl.start()
+
+    async def step(self, current_time, time_step):
+        """
+        Abstract coroutine to be implemented by children.
+        This function is called once per Node per simulation step.
+
+        :param current_time: the current time of the simulation
+        :param time_step: the time step from the last call of this function
+        """
+        raise NotImplementedError('Abstract function call from '+str(self.__class__))
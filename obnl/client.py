@@ -1,11 +1,36 @@
 from threading import Thread
 from obnl.impl.node import ClientNode as _ClientNodeImpl
+from obnl.impl.transports import AMQPConnectionPool, SharedAMQPTransport
 
 
 class ClientNode(object):
 
-    def __init__(self, host, name, input_attributes=None, output_attributes=None, is_first=False):
-        self._node_impl = _ClientNodeImpl(host, name, self, input_attributes, output_attributes, is_first)
+    def __init__(self, host, name, input_attributes=None, output_attributes=None, is_first=False, transport=None,
+                 batch=False, local_queue=False, publish_policies=None, shared_connection=False):
+        """
+
+        :param host: the AMQP host
+        :param name: the node name
+        :param input_attributes: the list of input attributes
+        :param output_attributes: the list of output attributes
+        :param is_first: True if the node does not wait for its inputs
+        :param transport: the Transport to use (an AMQPTransport to host if None),
+                          e.g. a LocalTransport to run the simulation in one process without broker
+                          or an AMQPTransport(host, pipelined=True) to write the values of a step together
+        :param batch: if True, the attributes updated during a step are sent in one message when the step returns
+        :param local_queue: if True, the local queue is created so that external triggers can ask the node
+                            to check if it can step
+        :param publish_policies: a map of output attributes to PublishPolicy (see obnl.impl.policies),
+                                 the attributes without policy are always sent
+        :param shared_connection: if True (and without transport), the node uses a channel of the connection
+                                  shared by the nodes of the process (see AMQPConnectionPool) instead of its
+                                  own connection: the nodes of the process then run on a single I/O loop,
+                                  in a single thread
+        """
+        if shared_connection and transport is None:
+            transport = SharedAMQPTransport(AMQPConnectionPool.shared(host))
+        self._node_impl = _ClientNodeImpl(host, name, self, input_attributes, output_attributes, is_first,
+                                          transport, batch, local_queue, publish_policies)
 
     @property
     def name(self):
@@ -20,6 +45,7 @@ class ClientNode(object):
         """
         
         :return: a map of input values. The keys are the input attributes 
+                 and the values the last received ones
         """
         return self._node_impl.input_values
 
@@ -39,11 +65,58 @@ class ClientNode(object):
         """
         return self._node_impl.output_attributes
 
+    @property
+    def tracer(self):
+        """
+
+        :return: the Tracer recording the step events of the node (None if not traced),
+                 see obnl.impl.tracing
+        """
+        return self._node_impl.tracer
+
+    @tracer.setter
+    def tracer(self, tracer):
+        self._node_impl.tracer = tracer
+
+    @property
+    def metrics(self):
+        """
+
+        :return: the MetricsRegistry counting the messages and steps of the node (None if not measured),
+                 see obnl.impl.metrics
+        """
+        return self._node_impl.metrics
+
+    @metrics.setter
+    def metrics(self, metrics):
+        self._node_impl.metrics = metrics
+
+    @property
+    def recording(self):
+        """
+
+        :return: the StepRecording recording the steps of the node to replay them (None if not recorded),
+                 see obnl.impl.replay
+        """
+        return self._node_impl.recording
+
+    @recording.setter
+    def recording(self, recording):
+        self._node_impl.recording = recording
+
     def start(self):
         """
         Starts the listening
+
+        :return: the listening thread (with a shared connection, the thread of the I/O loop of the pool,
+                 shared by its nodes and ending when they all have quit)
         """
-        Thread(target=self._node_impl.start).start()
+        transport = self._node_impl.transport
+        if isinstance(transport, SharedAMQPTransport):
+            return transport.start_thread()
+        thread = Thread(target=self._node_impl.start)
+        thread.start()
+        return thread
 
     def step(self, current_time, time_step):
         """
@@ -55,11 +128,30 @@ class ClientNode(object):
         """
         raise NotImplementedError('Abstract function call from '+str(self.__class__))
 
+    def save(self):
+        """
+        Optional hook called at the end of a step when the scheduler writes a checkpoint.
+        The inputs and the last sent values are saved by the node itself.
+
+        :return: the state of the node (any picklable object), None by default
+        """
+        return None
+
+    def restore(self, state):
+        """
+        Optional hook called when a simulation is resumed from a checkpoint, before the first step.
+
+        :param state: the state returned by save at the checkpoint
+        """
+        pass
+
     def update_attribute(self, attr, value):
         """
         Sends the new attribute value to those who want to know.
+        In batch mode, the value is sent with the other updates of the step when step returns.
 
         :param attr: the attribute to communicate 
-        :param value: the new value of the attribute
+        :param value: the new value of the attribute: a float or a NumPy array
+                      (received as a read-only array in input_values)
         """
         self._node_impl.update_attribute(attr, value)
@@ -0,0 +1,98 @@
+import time
+import inspect
+import asyncio
+import logging
+
+from obnl.impl.node import ClientNode
+from obnl.impl.tracing import INPUTS_COMPLETE, STEP
+from obnl.impl.aiotransports import AsyncAMQPConnection, AsyncAMQPTransport
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncNode(object):
+    """
+    Base class of the Nodes running on an asyncio event loop, to be inherited
+    before a Node class. All the Nodes of a process can run on one loop and share
+    their AMQP connections.
+    """
+
+    @staticmethod
+    def _default_transport(host, transport):
+        """
+
+        :return: the transport or an AsyncAMQPTransport on the shared connection to host if None
+        """
+        if transport is not None:
+            return transport
+        return AsyncAMQPTransport(AsyncAMQPConnection.shared(host))
+
+    async def start(self):
+        """
+        Listens until the end of the simulation.
+        """
+        await self._transport.start()
+
+    def _quit(self):
+        self._transport.stop()
+
+
+class AsyncClientNode(AsyncNode, ClientNode):
+    """
+    A ClientNode running on an asyncio event loop. The step function of the api can be a coroutine.
+    """
+
+    def __init__(self, host, name, api, input_attributes=None, output_attributes=None, is_first=False,
+                 transport=None, batch=False, local_queue=False, publish_policies=None):
+        super(AsyncClientNode, self).__init__(host, name, api, input_attributes, output_attributes, is_first,
+                                              self._default_transport(host, transport), batch, local_queue,
+                                              publish_policies)
+
+    def check_ready(self):
+        if self.is_ready():
+            self._next_step = False
+            if self._tracer is not None:
+                self._tracer.instant(INPUTS_COMPLETE, self._name, self._current_time)
+            if self._counters is not None:
+                self._counters.input_wait += time.time() - self._next_step_time
+            step = asyncio.ensure_future(self._step_and_reply(), loop=self._transport.loop)
+            step.add_done_callback(self._on_step_done)
+
+    def _on_step_done(self, step):
+        """
+        Stops the Node if its step has failed: start raises the error.
+        """
+        if step.cancelled() or step.exception() is None:
+            return
+        logger.error('Step of %s at %s failed', self._name, self._current_time, exc_info=step.exception())
+        self._transport.fail(step.exception())
+
+    async def _step_and_reply(self):
+        tracer = self._tracer
+        if tracer is not None:
+            start = tracer.now()
+        if self._counters is not None:
+            step_start = time.time()
+        recording = self._recording
+        if recording is not None:
+            recording.begin_step(self, self._current_time, self._time_step, self._input_values)
+        await self.step(self._current_time, self._time_step)
+        if recording is not None:
+            recording.end_step()
+        if tracer is not None:
+            tracer.span(STEP, self._name, start, tracer.now(), self._current_time)
+        if self._counters is not None:
+            self._count_step(time.time() - step_start)
+        await self._transport.confirmed()
+        self._step_done()
+
+    async def step(self, current_time, time_step):
+        self._stepping = True
+        try:
+            res = self._api_node.step(current_time, time_step)
+            if inspect.isawaitable(res):
+                await res
+        finally:
+            self._stepping = False
+        self.flush_attributes()
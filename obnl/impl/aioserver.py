@@ -0,0 +1,42 @@
+from obnl.impl.server import Scheduler
+from obnl.impl.aionode import AsyncNode
+
+
+class AsyncScheduler(AsyncNode, Scheduler):
+    """
+    A Scheduler running on an asyncio event loop.
+    """
+
+    def __init__(self, host, config_file, schedule_file, transport=None, lookahead=False, cache_dir=None,
+                 compact=False, recorders=None, checkpoint_dir=None, checkpoint_steps=None,
+                 checkpoint_interval=None, resume=False):
+        """
+
+        :param host: the AMQP host
+        :param config_file: a file containing time steps
+        :param schedule_file: a file containing schedule blocks
+        :param transport: the AsyncTransport to use (an AsyncAMQPTransport to host if None)
+        :param lookahead: see Scheduler
+        :param cache_dir: see Scheduler
+        :param compact: see Scheduler
+        :param recorders: see Scheduler
+        :param checkpoint_dir: see Scheduler
+        :param checkpoint_steps: see Scheduler
+        :param checkpoint_interval: see Scheduler
+        :param resume: see Scheduler
+        """
+        super(AsyncScheduler, self).__init__(host, config_file, schedule_file,
+                                             self._default_transport(host, transport),
+                                             lookahead=lookahead, cache_dir=cache_dir, compact=compact,
+                                             recorders=recorders, checkpoint_dir=checkpoint_dir,
+                                             checkpoint_steps=checkpoint_steps,
+                                             checkpoint_interval=checkpoint_interval, resume=resume)
+
+    def _quit(self):
+        if self._checkpoints is not None:
+            self._checkpoints.close()
+        super(AsyncScheduler, self)._quit()
+
+    async def start(self):
+        self._rewind()
+        await super(AsyncScheduler, self).start()
@@ -0,0 +1,313 @@
+import asyncio
+from collections import deque
+
+import pika
+from pika.exceptions import AMQPConnectionError
+from pika.adapters.asyncio_connection import AsyncioConnection
+
+from obnl.impl.transports import Transport, LocalTransport, PublishError
+
+
+class AsyncTransport(Transport):
+    """
+    Base class of the Transports running on an asyncio event loop.
+
+    The topology and publish functions do not block; start is a coroutine
+    that returns when stop is called.
+    """
+
+    def __init__(self, loop=None):
+        """
+
+        :param loop: the asyncio event loop (the current one if None)
+        """
+        self._loop = loop if loop is not None else asyncio.get_event_loop()
+        self._stopped = None
+
+    @property
+    def loop(self):
+        """
+
+        :return: the asyncio event loop of the transport
+        """
+        return self._loop
+
+    def _stop_future(self):
+        if self._stopped is None:
+            self._stopped = self._loop.create_future()
+        return self._stopped
+
+    async def confirmed(self):
+        """
+        Waits until the published messages are confirmed by the broker (at once
+        without publisher confirms).
+        """
+        pass
+
+    async def start(self):
+        await self._stop_future()
+
+    def stop(self):
+        stopped = self._stop_future()
+        if not stopped.done():
+            stopped.set_result(None)
+
+    def fail(self, error):
+        """
+        Stops the transport because of an error: start raises it.
+
+        :param error: the exception
+        """
+        stopped = self._stop_future()
+        if not stopped.done():
+            stopped.set_exception(error)
+
+
+class AsyncLocalTransport(AsyncTransport, LocalTransport):
+    """
+    A LocalTransport calling the callbacks from an asyncio event loop.
+
+    It can share its LocalBroker with threaded LocalTransports.
+    """
+
+    def __init__(self, broker=None, loop=None):
+        """
+
+        :param broker: the LocalBroker to use (the process default one if None)
+        :param loop: the asyncio event loop (the current one if None)
+        """
+        LocalTransport.__init__(self, broker)
+        AsyncTransport.__init__(self, loop)
+
+    def deliver(self, callback, method, props, body):
+        delivery = (callback, method, props, body)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._loop.call_soon(self._dispatch, delivery)
+        else:
+            self._loop.call_soon_threadsafe(self._dispatch, delivery)
+
+
+class AsyncAMQPConnection(object):
+    """
+    A non-blocking pika connection shared by the AsyncAMQPTransports of a process,
+    each transport using its own channel.
+    """
+
+    MAX_CHANNELS = 1000
+    """Number of channels opened on a connection before a new connection is used by shared"""
+
+    _shared = {}
+
+    def __init__(self, host, loop=None):
+        """
+
+        :param host: the AMQP host
+        :param loop: the asyncio event loop (the current one if None)
+        """
+        self._loop = loop if loop is not None else asyncio.get_event_loop()
+        self._host = host
+        self._pending = []
+        self._opened = False
+        self.channels = 0
+        """Number of channels requested on this connection"""
+
+        self._connection = AsyncioConnection(pika.ConnectionParameters(host=host),
+                                             on_open_callback=self._on_open,
+                                             on_open_error_callback=self._on_open_error,
+                                             custom_ioloop=self._loop)
+
+    @classmethod
+    def shared(cls, host, loop=None):
+        """
+        Gets a connection of the process for the host and the loop, creating a new one
+        when the others have MAX_CHANNELS channels.
+
+        :param host: the AMQP host
+        :param loop: the asyncio event loop (the current one if None)
+        :return: an AsyncAMQPConnection
+        """
+        loop = loop if loop is not None else asyncio.get_event_loop()
+        connections = cls._shared.setdefault((host, loop), [])
+        if not connections or connections[-1].channels >= cls.MAX_CHANNELS:
+            connections.append(AsyncAMQPConnection(host, loop))
+        return connections[-1]
+
+    @property
+    def loop(self):
+        """
+
+        :return: the asyncio event loop of the connection
+        """
+        return self._loop
+
+    def _on_open(self, connection):
+        self._opened = True
+        for on_open, _ in self._pending:
+            connection.channel(on_open)
+        self._pending = []
+
+    def _on_open_error(self, connection, error):
+        if not isinstance(error, Exception):
+            error = AMQPConnectionError(error)
+        # a new connection is made for the next transports
+        connections = AsyncAMQPConnection._shared.get((self._host, self._loop), [])
+        if self in connections:
+            connections.remove(self)
+        pending, self._pending = self._pending, []
+        for _, on_error in pending:
+            on_error(error)
+
+    def open_channel(self, on_open, on_error=None):
+        """
+        Opens a new channel, as soon as the connection is opened.
+
+        :param on_open: the function called with the channel once opened
+        :param on_error: the function called with the exception if the connection cannot be opened
+        """
+        self.channels += 1
+        if self._opened:
+            self._connection.channel(on_open)
+        else:
+            self._pending.append((on_open, on_error or (lambda error: None)))
+
+    def close(self):
+        self._connection.close()
+
+
+class AsyncAMQPTransport(AsyncTransport):
+    """
+    A Transport using a channel of a (shared) AsyncAMQPConnection.
+
+    The operations requested before the channel is opened, or while a
+    declaration is waiting for its answer, are kept and sent in order. The
+    publishes never block: the frames are written by the event loop. With
+    publisher confirms, the broker acknowledges the messages by batches and
+    confirmed waits for them. If the connection cannot be opened, start
+    raises the error.
+    """
+
+    def __init__(self, connection, confirms=False):
+        """
+
+        :param connection: the AsyncAMQPConnection to use
+        :param confirms: if True, the broker confirms the published messages
+        """
+        super(AsyncAMQPTransport, self).__init__(connection.loop)
+        self._channel = None
+        self._operations = deque()
+        self._waiting = True
+
+        self._confirms = confirms
+        self._delivery_tag = 0
+        self._unconfirmed = set()
+        self._rejected = 0
+        self._all_confirmed = None
+
+        connection.open_channel(self._on_channel_open, self.fail)
+
+    def _on_channel_open(self, channel):
+        self._channel = channel
+        if self._confirms:
+            channel.confirm_delivery(self._on_confirmation)
+        self._rpc_done()
+
+    def _on_confirmation(self, frame):
+        method = frame.method
+        if method.multiple:
+            confirmed = {tag for tag in self._unconfirmed if tag <= method.delivery_tag}
+        else:
+            confirmed = {method.delivery_tag} & self._unconfirmed
+        self._unconfirmed -= confirmed
+        if isinstance(method, pika.spec.Basic.Nack):
+            self._rejected += len(confirmed)
+        if not self._unconfirmed and self._all_confirmed is not None and not self._all_confirmed.done():
+            self._all_confirmed.set_result(None)
+
+    async def confirmed(self):
+        if self._unconfirmed:
+            if self._all_confirmed is None or self._all_confirmed.done():
+                self._all_confirmed = self._loop.create_future()
+            await self._all_confirmed
+        if self._rejected:
+            rejected, self._rejected = self._rejected, 0
+            raise PublishError('%d messages rejected by the broker' % rejected)
+
+    def _rpc_done(self, *_):
+        self._waiting = False
+        while self._operations and not self._waiting:
+            operation, args = self._operations.popleft()
+            operation(*args)
+
+    def _submit(self, operation, *args):
+        if self._waiting or self._operations:
+            self._operations.append((operation, args))
+        else:
+            operation(*args)
+
+    def declare_exchange(self, exchange):
+        self._submit(self._exchange_declare, exchange)
+
+    def _exchange_declare(self, exchange):
+        self._waiting = True
+        self._channel.exchange_declare(self._rpc_done, exchange=exchange)
+
+    def declare_queue(self, queue):
+        self._submit(self._queue_declare, queue)
+        return queue
+
+    def _queue_declare(self, queue):
+        self._waiting = True
+        self._channel.queue_declare(self._rpc_done, queue=queue)
+
+    def bind(self, exchange, queue, routing_key=None):
+        self._submit(self._queue_bind, exchange, queue, routing_key)
+
+    def _queue_bind(self, exchange, queue, routing_key):
+        self._waiting = True
+        self._channel.queue_bind(self._rpc_done, queue, exchange, routing_key=routing_key)
+
+    def provision(self, topology):
+        self._submit(self._provision, topology)
+
+    def _provision(self, topology):
+        # pipelined: only the last declaration waits for its answer
+        channel = self._channel
+        for exchange in topology.exchanges:
+            channel.exchange_declare(exchange=exchange, nowait=True)
+        for queue in topology.queues:
+            channel.queue_declare(None, queue=queue, nowait=True)
+        for exchange, queue, routing_key in topology.bindings:
+            channel.queue_bind(None, queue, exchange, routing_key=routing_key, nowait=True)
+        if topology.queues:
+            self._waiting = True
+            channel.queue_declare(self._rpc_done, queue=topology.queues[-1], passive=True)
+
+    def consume(self, queue, callback, consumer_tag=None):
+        self._submit(self._basic_consume, queue, callback, consumer_tag)
+
+    def _basic_consume(self, queue, callback, consumer_tag):
+        self._channel.basic_consume(callback, queue=queue, no_ack=True, consumer_tag=consumer_tag)
+
+    def publish(self, exchange, routing_key, body, reply_to=None):
+        self._submit(self._basic_publish, exchange, routing_key, body, reply_to)
+
+    def _basic_publish(self, exchange, routing_key, body, reply_to):
+        self._channel.basic_publish(exchange, routing_key, body,
+                                    properties=pika.BasicProperties(reply_to=reply_to))
+        if self._confirms:
+            self._delivery_tag += 1
+            self._unconfirmed.add(self._delivery_tag)
+
+    def stop(self):
+        super(AsyncAMQPTransport, self).stop()
+        if self._channel is not None and self._channel.is_open:
+            self._channel.close()
+
+    def fail(self, error):
+        super(AsyncAMQPTransport, self).fail(error)
+        if self._channel is not None and self._channel.is_open:
+            self._channel.close()
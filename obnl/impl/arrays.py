@@ -0,0 +1,39 @@
+"""
+The optional NumPy support: numpy is only needed by the array attributes, the
+recorder and the population Nodes. The other modules import it from here (None
+when it is not installed).
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def is_array(value):
+    """
+
+    :param value: an attribute value
+    :return: True if the value is a NumPy array (always False without numpy)
+    """
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+
+def copy_value(value):
+    """
+
+    :param value: an attribute value
+    :return: a copy of the value if it is an array (the Node may change it afterwards), else the value
+    """
+    return numpy.array(value) if is_array(value) else value
+
+
+def require_numpy(feature):
+    """
+    Checks that numpy is installed.
+
+    :param feature: the feature needing numpy, for the error message
+    :raise ImportError: if numpy is not installed
+    """
+    if numpy is None:
+        raise ImportError(feature + ' requires NumPy')
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import pickle
+import logging
+from collections import namedtuple
+
+
+logger = logging.getLogger(__name__)
+
+
+CompiledTopology = namedtuple('CompiledTopology', ['nodes', 'attributes', 'links', 'steps', 'blocks', 'periods',
+                                                   'attribute_links', 'topology'])
+"""
+The result of the loading of a simulation:
+- nodes: the list of node names
+- attributes: a map of node names to their (inputs, outputs)
+- links: the list of links (node_out, attr_out, node_in, attr_in)
+- steps: the time steps of the schedule
+- blocks: the list of blocks (lists of node names), computed ones included
+- periods: a map of node names to (period, offset)
+- attribute_links: a map of node names to their {attr_out: [attr_in]} maps
+- topology: the broker Topology of the links and the blocks
+"""
+
+
+class TopologyCache(object):
+    """
+    A directory of CompiledTopologies (pickled) keyed by the hashes of the
+    config and schedule files, so that an unchanged simulation starts without
+    parsing its files again.
+    """
+
+    VERSION = 2
+    """Version of the format of the cached files (part of the key)"""
+
+    def __init__(self, directory):
+        """
+
+        :param directory: the cache directory (created if needed)
+        """
+        self._directory = directory
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def key(self, config_file, schedule_file):
+        """
+
+        :param config_file: the file containing the structure
+        :param schedule_file: the file containing the schedule
+        :return: the key of the simulation in the cache
+        """
+        h = hashlib.sha256(str(TopologyCache.VERSION).encode())
+        for path in (config_file, schedule_file):
+            file_hash = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    file_hash.update(chunk)
+            h.update(file_hash.digest())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self._directory, key + '.topology')
+
+    def load(self, config_file, schedule_file):
+        """
+
+        :param config_file: the file containing the structure
+        :param schedule_file: the file containing the schedule
+        :return: the cached CompiledTopology or None if missing (or unreadable)
+        """
+        path = self._path(self.key(config_file, schedule_file))
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            return CompiledTopology(*pickle.loads(data))
+        except Exception:
+            # a damaged file can fail in many ways, it is rebuilt
+            logger.warning('Unreadable cached topology %s', path)
+            return None
+
+    def store(self, config_file, schedule_file, compiled):
+        """
+        Writes a CompiledTopology in the cache (atomically).
+
+        :param config_file: the file containing the structure
+        :param schedule_file: the file containing the schedule
+        :param compiled: the CompiledTopology
+        """
+        os.makedirs(self._directory, exist_ok=True)
+        path = self._path(self.key(config_file, schedule_file))
+        temporary = path + '.' + str(os.getpid())
+        with open(temporary, 'wb') as f:
+            pickle.dump(tuple(compiled), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
@@ -0,0 +1,128 @@
+import os
+import re
+import pickle
+import logging
+import threading
+from queue import Queue
+
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore(object):
+    """
+    A directory of simulation checkpoints, written in the background.
+
+    Each checkpoint is a pickled state written to a temporary file then renamed,
+    so that a checkpoint file is always complete: the latest readable one is
+    the latest consistent checkpoint. Only the last ones are kept.
+    """
+
+    VERSION = 1
+    """Version of the format of the checkpoints"""
+
+    _FILE = re.compile(r'^checkpoint-(\d+)\.ckpt$')
+
+    def __init__(self, directory, keep=2):
+        """
+
+        :param directory: the checkpoint directory (created if needed)
+        :param keep: the number of checkpoints kept
+        """
+        self._directory = directory
+        self._keep = max(1, keep)
+        self._queue = Queue()
+        self._writer = None
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def directory(self):
+        """
+
+        :return: the checkpoint directory
+        """
+        return self._directory
+
+    def _path(self, step):
+        return os.path.join(self._directory, 'checkpoint-%010d.ckpt' % step)
+
+    def steps(self):
+        """
+
+        :return: the steps of the checkpoints in the directory, in increasing order
+        """
+        steps = []
+        for name in os.listdir(self._directory):
+            match = CheckpointStore._FILE.match(name)
+            if match:
+                steps.append(int(match.group(1)))
+        return sorted(steps)
+
+    def save(self, step, state):
+        """
+        Writes a checkpoint in a background thread.
+
+        :param step: the step index of the checkpoint
+        :param state: the state to write (pickled in the background thread: it must not be changed)
+        """
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name='obnl-checkpoint')
+            self._writer.daemon = True
+            self._writer.start()
+        self._queue.put((step, state))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self.write(*item)
+            except Exception:
+                logger.exception('Checkpoint of step %d failed', item[0])
+            finally:
+                self._queue.task_done()
+
+    def write(self, step, state):
+        """
+        Writes a checkpoint (atomically) and removes the oldest ones.
+
+        :param step: the step index of the checkpoint
+        :param state: the state to write
+        """
+        path = self._path(step)
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as f:
+            pickle.dump((CheckpointStore.VERSION, step, state), f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+        logger.info('Checkpoint of step %d written in %s', step, path)
+
+        for old in self.steps()[:-self._keep]:
+            os.remove(self._path(old))
+
+    def latest(self):
+        """
+
+        :return: the (step, state) of the latest readable checkpoint, None if there is none
+        """
+        for step in reversed(self.steps()):
+            try:
+                with open(self._path(step), 'rb') as f:
+                    version, saved_step, state = pickle.load(f)
+            except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+                logger.warning('Unreadable checkpoint of step %d', step)
+                continue
+            if version == CheckpointStore.VERSION and saved_step == step:
+                return step, state
+        return None
+
+    def close(self):
+        """
+        Waits until the submitted checkpoints are written.
+        """
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
@@ -0,0 +1,85 @@
+from obnl.impl.message import MetaMessage, Envelope, NextStep, AttributeMessage, AttributeBatch, \
+    SimulatorConnection, SchedulerConnection, Quit
+
+
+COMPACT_PREFIX = b'\x00'
+"""First byte of the compact messages (a MetaMessage never starts with it: there is no field 0)"""
+
+ENVELOPE_FIELDS = {
+    NextStep: 'next_step',
+    AttributeMessage: 'attribute',
+    AttributeBatch: 'attribute_batch',
+    SimulatorConnection: 'simulator_connection',
+    SchedulerConnection: 'scheduler_connection',
+    Quit: 'quit',
+}
+"""The field of the Envelope of each message type"""
+
+_TYPE_NAMES = {message_type.DESCRIPTOR.full_name: message_type for message_type in ENVELOPE_FIELDS}
+
+# the wire tag of the details field of each message type (length-delimited)
+_TAGS = {message_type: bytes([Envelope.DESCRIPTOR.fields_by_name[field].number << 3 | 2])
+         for message_type, field in ENVELOPE_FIELDS.items()}
+_SENDER_TAG = bytes([Envelope.DESCRIPTOR.fields_by_name['sender'].number << 3])
+
+
+def _varint(value):
+    """
+    :return: the protobuf varint encoding of a positive integer
+    """
+    encoded = bytearray()
+    while value > 0x7f:
+        encoded.append(value & 0x7f | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def encode(message, sender_name, sender_id=0, message_type=None):
+    """
+    Serializes a message in its envelope: a compact Envelope if the sender has an
+    ID (and the message type has a field), else a MetaMessage.
+
+    :param message: the protobuf message
+    :param sender_name: the name of the sender
+    :param sender_id: the interned ID of the sender (0 if unknown)
+    :param message_type: the MetaMessage type (not sent in compact mode)
+    :return: the serialized message
+    """
+    tag = _TAGS.get(type(message)) if sender_id else None
+    if tag is not None:
+        # the Envelope is written around the serialized message instead of copying it
+        details = message.SerializeToString()
+        return b''.join((COMPACT_PREFIX, _SENDER_TAG, _varint(sender_id), tag, _varint(len(details)), details))
+
+    mm = MetaMessage()
+    mm.node_name = sender_name
+    if message_type is not None:
+        mm.type = message_type
+    mm.details.Pack(message)
+    return mm.SerializeToString()
+
+
+def decode(body, sender_names):
+    """
+    Parses a message in either envelope.
+
+    :param body: the serialized message
+    :param sender_names: a map of the interned IDs to sender names
+    :return: the name of the sender and the message (None if its type is unknown)
+    """
+    if body[:1] == COMPACT_PREFIX:
+        envelope = Envelope()
+        envelope.ParseFromString(body[1:])
+        field = envelope.WhichOneof('details')
+        sender = sender_names.get(envelope.sender, envelope.sender_name)
+        return sender, getattr(envelope, field) if field is not None else None
+
+    mm = MetaMessage()
+    mm.ParseFromString(body)
+    message_type = _TYPE_NAMES.get(mm.details.TypeName())
+    if message_type is None:
+        return mm.node_name, None
+    message = message_type()
+    mm.details.Unpack(message)
+    return mm.node_name, message
@@ -0,0 +1,284 @@
+class DependencyGraph(object):
+    """
+    The dependency graph of a simulation: an edge goes from the Node sending an
+    attribute to the Node receiving it.
+
+    The graph is used to compute the schedule blocks: a Node is scheduled after
+    all the Nodes it depends on, except inside a cycle where some links have to
+    be delayed (the receiver uses the value of the previous step).
+    """
+
+    def __init__(self, nodes, links):
+        """
+
+        :param nodes: the list of node names
+        :param links: the list of links (node_out, attr_out, node_in, attr_in)
+        """
+        self._nodes = list(nodes)
+        self._links = list(links)
+
+        self._successors = {node: [] for node in self._nodes}
+        for node_out, _, node_in, _ in self._links:
+            successors = self._successors.setdefault(node_out, [])
+            self._successors.setdefault(node_in, [])
+            if node_in not in successors:
+                successors.append(node_in)
+        known = set(self._nodes)
+        for node in self._successors:
+            if node not in known:
+                self._nodes.append(node)
+
+        self._components = None
+        self._delayed = None
+        self._layers = None
+
+    @property
+    def nodes(self):
+        return self._nodes
+
+    @property
+    def links(self):
+        return self._links
+
+    def successors(self, node):
+        """
+
+        :param node: a node name
+        :return: the nodes receiving attributes from the node
+        """
+        return self._successors[node]
+
+    def strongly_connected_components(self):
+        """
+        Finds the strongly connected components (Tarjan, iterative).
+
+        :return: the list of components (lists of node names), in reverse topological order
+        """
+        if self._components is not None:
+            return self._components
+
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        components = []
+
+        for root in self._nodes:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self._successors[root]))]
+            while work:
+                node, successors = work[-1]
+                pushed = False
+                for successor in successors:
+                    if successor not in index:
+                        index[successor] = low[successor] = len(index)
+                        stack.append(successor)
+                        on_stack.add(successor)
+                        work.append((successor, iter(self._successors[successor])))
+                        pushed = True
+                        break
+                    elif successor in on_stack:
+                        low[node] = min(low[node], index[successor])
+                if pushed:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+
+        self._components = components
+        return components
+
+    def cycles(self):
+        """
+
+        :return: the strongly connected components with more than one node or a self link
+        """
+        return [c for c in self.strongly_connected_components()
+                if len(c) > 1 or c[0] in self._successors[c[0]]]
+
+    def delayed_edges(self):
+        """
+        Finds the edges to cut to break the cycles: the back edges of a depth-first
+        search following the order of the nodes. The receiver of a delayed edge uses
+        the value of the previous step (it has to be 'is_first' to start).
+
+        :return: the set of delayed edges (node_out, node_in)
+        """
+        if self._delayed is not None:
+            return self._delayed
+
+        delayed = set()
+        state = {}  # 1: in progress, 2: done
+        for root in self._nodes:
+            if root in state:
+                continue
+            state[root] = 1
+            work = [(root, iter(self._successors[root]))]
+            while work:
+                node, successors = work[-1]
+                pushed = False
+                for successor in successors:
+                    if successor not in state:
+                        state[successor] = 1
+                        work.append((successor, iter(self._successors[successor])))
+                        pushed = True
+                        break
+                    elif state[successor] == 1:
+                        delayed.add((node, successor))
+                if not pushed:
+                    state[node] = 2
+                    work.pop()
+
+        self._delayed = delayed
+        return delayed
+
+    def layers(self):
+        """
+        Computes the layer of each node: 0 for the nodes without (non delayed)
+        predecessor, otherwise one more than their latest predecessor.
+        The nodes of a same layer can step in parallel.
+
+        :return: a map of node names to layers
+        """
+        if self._layers is not None:
+            return self._layers
+
+        delayed = self.delayed_edges()
+        in_degree = {node: 0 for node in self._nodes}
+        for node in self._nodes:
+            for successor in self._successors[node]:
+                if (node, successor) not in delayed:
+                    in_degree[successor] += 1
+
+        layers = {}
+        ready = [node for node in self._nodes if in_degree[node] == 0]
+        for node in ready:
+            layers[node] = 0
+        while ready:
+            node = ready.pop()
+            for successor in self._successors[node]:
+                if (node, successor) in delayed:
+                    continue
+                layers[successor] = max(layers.get(successor, 0), layers[node] + 1)
+                in_degree[successor] -= 1
+                if in_degree[successor] == 0:
+                    ready.append(successor)
+
+        self._layers = layers
+        return layers
+
+    def blocks(self):
+        """
+        Derives the schedule blocks with the maximum parallelism.
+
+        :return: the list of blocks (lists of node names)
+        """
+        layers = self.layers()
+        blocks = [[] for _ in range(max(layers.values()) + 1 if layers else 0)]
+        for node in self._nodes:
+            blocks[layers[node]].append(node)
+        return blocks
+
+    def critical_path(self, costs=None):
+        """
+        Finds the longest chain of dependent nodes within a step.
+
+        :param costs: a map of node names to step costs (1 for the missing nodes)
+        :return: the list of nodes of the critical path and its cost
+        """
+        costs = costs or {}
+        layers = self.layers()
+        delayed = self.delayed_edges()
+
+        best = {}
+        previous = {}
+        for node in sorted(self._nodes, key=lambda n: layers[n]):
+            best[node] = best.get(node, 0) + costs.get(node, 1)
+            for successor in self._successors[node]:
+                if (node, successor) not in delayed and best[node] > best.get(successor, 0):
+                    best[successor] = best[node]
+                    previous[successor] = node
+        if not best:
+            return [], 0
+
+        node = max(best, key=lambda n: best[n])
+        cost = best[node]
+        path = [node]
+        while path[-1] in previous:
+            path.append(previous[path[-1]])
+        path.reverse()
+        return path, cost
+
+    def validate(self, blocks):
+        """
+        Checks hand-written schedule blocks against the graph.
+
+        :param blocks: the list of blocks (lists of node names)
+        :return: the list of issues (str), empty if none
+        """
+        issues = []
+        position = {}
+        for i, block in enumerate(blocks):
+            for node in block:
+                if node not in self._successors:
+                    issues.append('Node %s is scheduled but not defined' % node)
+                position.setdefault(node, i)
+        for node in self._nodes:
+            if node not in position:
+                issues.append('Node %s is not scheduled' % node)
+
+        cyclic = {}
+        for i, component in enumerate(self.strongly_connected_components()):
+            for node in component:
+                cyclic[node] = i
+
+        for node_out, attr_out, node_in, attr_in in self._links:
+            if node_out not in position or node_in not in position:
+                continue
+            link = '%s.%s -> %s.%s' % (node_out, attr_out, node_in, attr_in)
+            if position[node_in] == position[node_out] and node_in != node_out:
+                issues.append('Link %s is inside block %d: %s waits for the value %s sends at the same step '
+                              '(they do not step in parallel)' % (link, position[node_in], node_in, node_out))
+            elif position[node_in] < position[node_out] and cyclic[node_in] != cyclic[node_out]:
+                issues.append('Link %s goes backward (block %d to %d) but is not in a cycle: '
+                              '%s uses the value of the previous step'
+                              % (link, position[node_out], position[node_in], node_in))
+
+        minimum = max(self.layers().values()) + 1 if self._nodes else 0
+        if len(blocks) > minimum:
+            issues.append('The schedule has %d blocks, %d are enough' % (len(blocks), minimum))
+        return issues
+
+    def report(self, blocks=None):
+        """
+
+        :param blocks: hand-written blocks to validate, if any
+        :return: a human readable analysis of the graph
+        """
+        lines = ['%d nodes, %d links' % (len(self._nodes), len(self._links))]
+        for cycle in self.cycles():
+            lines.append('cycle: ' + ', '.join(sorted(cycle)))
+        for node_out, node_in in sorted(self.delayed_edges()):
+            lines.append('delayed link: %s -> %s (%s uses the previous step value)' % (node_out, node_in, node_in))
+        for i, block in enumerate(self.blocks()):
+            lines.append('block %d: %s' % (i, ', '.join(block)))
+        path, cost = self.critical_path()
+        lines.append('critical path: %s (%d nodes)' % (' -> '.join(path), cost))
+        if blocks is not None:
+            issues = self.validate(blocks)
+            lines.extend('issue: ' + issue for issue in issues)
+        return '\n'.join(lines)
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import importlib
+import multiprocessing
+from queue import Empty
+
+from obnl.impl.graph import DependencyGraph
+from obnl.impl.loaders import JSONLoader
+from obnl.impl.metrics import MetricsRegistry
+from obnl.impl.server import load_schedule
+
+
+def load_class(path):
+    """
+    Imports a class from its path.
+
+    :param path: the class path, as 'package.module:Class'
+    :return: the class
+    """
+    module_name, _, class_name = path.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+class Launcher(object):
+    """
+    Starts the ClientNodes of a simulation in several worker processes.
+
+    The nodes are read from the config file used by the JSONLoader. Each node is
+    created with the class given in the 'class' entry of its config (or the
+    default one), its inputs, its outputs and its 'is_first' entry.
+    The nodes of a same schedule block are spread over the workers so that they
+    can step in parallel (the blocks are computed from the links as the Scheduler
+    does when the schedule file has none).
+
+    A MetricsRegistry only counts the Nodes of its own process: to measure the
+    nodes, each worker can have its own registry (see metrics_port and metrics_file),
+    the steps and the barriers being measured by the registry of the Scheduler.
+    """
+
+    POLL_INTERVAL = 1.
+    """Time (in seconds) between two checks of the workers still running"""
+
+    def __init__(self, host, config_file, schedule_file=None, workers=None, classes=None, default_class=None,
+                 groups=None, pin=False, metrics_port=None, metrics_file=None, metrics_interval=10.):
+        """
+
+        :param host: the AMQP host
+        :param config_file: the file containing the structure
+        :param schedule_file: the file containing the schedule (blocks), optional
+        :param workers: the number of worker processes (the number of CPUs if None)
+        :param classes: a map of node names to class paths ('package.module:Class'), overrides the config
+        :param default_class: the class path of the nodes without class
+        :param groups: a list of lists of node names that must run in the same worker
+        :param pin: if True, each worker is pinned to one CPU
+        :param metrics_port: if given, each worker serves the metrics of its nodes on the port metrics_port + its index
+                             (see MetricsRegistry.serve)
+        :param metrics_file: if given, each worker writes a JSON snapshot of the metrics of its nodes periodically,
+                             in the file named after metrics_file and its index (see worker_file)
+        :param metrics_interval: the period of the metrics snapshots (in seconds)
+        """
+        self._host = host
+        self._workers = workers or os.cpu_count() or 1
+        self._pin = pin
+        self._metrics = (metrics_port, metrics_file, metrics_interval) \
+            if metrics_port is not None or metrics_file else None
+
+        with open(config_file) as jsonfile:
+            self._nodes = json.loads(jsonfile.read())['nodes']
+
+        blocks = []
+        if schedule_file:
+            _, blocks = load_schedule(schedule_file)
+            if blocks is None:
+                loader = JSONLoader(None, config_file)
+                blocks = DependencyGraph(loader.get_nodes(), loader.get_links()).blocks()
+
+        classes = classes or {}
+        self._specs = {}
+        for name, data in self._nodes.items():
+            class_path = classes.get(name, data.get('class', default_class))
+            if not class_path:
+                raise ValueError('No class for node ' + name)
+            self._specs[name] = (class_path, name, data.get('inputs'), data.get('outputs'),
+                                 data.get('is_first', False))
+
+        self._assignment = self._assign(blocks, groups or [])
+
+    @property
+    def assignment(self):
+        """
+
+        :return: the list of node names of each worker
+        """
+        return self._assignment
+
+    def _assign(self, blocks, groups):
+        """
+        Spreads the nodes over the workers: a group goes to the least loaded worker,
+        then each node of a block goes to the worker having the fewest nodes of this block.
+        """
+        assignment = [[] for _ in range(self._workers)]
+        placed = {}
+
+        for group in groups:
+            worker = min(range(self._workers), key=lambda w: len(assignment[w]))
+            for name in group:
+                if name in self._specs and name not in placed:
+                    assignment[worker].append(name)
+                    placed[name] = worker
+
+        scheduled = set(name for block in blocks for name in block)
+        ordered = [list(block) for block in blocks]
+        ordered.append([name for name in self._specs if name not in scheduled])
+        for block in ordered:
+            in_block = [0] * self._workers
+            for name in block:
+                if name in placed:
+                    in_block[placed[name]] += 1
+            for name in block:
+                if name not in self._specs or name in placed:
+                    continue
+                worker = min(range(self._workers), key=lambda w: (in_block[w], len(assignment[w])))
+                assignment[worker].append(name)
+                placed[name] = worker
+                in_block[worker] += 1
+        return assignment
+
+    def run(self):
+        """
+        Starts the workers and waits for the end of the simulation.
+
+        :return: the report of each worker (see run_worker)
+        :raise ValueError: if a worker stops without reporting (the other workers are terminated)
+        """
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else []
+        reports = multiprocessing.Queue()
+        processes = []
+        for index, names in enumerate(self._assignment):
+            if not names:
+                continue
+            worker_cpus = [cpus[index % len(cpus)]] if self._pin and cpus else None
+            p = multiprocessing.Process(target=run_worker,
+                                        args=(index, self._host, [self._specs[n] for n in names],
+                                              worker_cpus, reports, self._metrics),
+                                        name='obnl-worker-' + str(index))
+            p.start()
+            processes.append(p)
+
+        results = []
+        while len(results) < len(processes):
+            try:
+                results.append(reports.get(timeout=Launcher.POLL_INTERVAL))
+                continue
+            except Empty:
+                pass
+            # a worker reports before exiting: the simulation cannot end once one has failed
+            stopped = [p for p in processes if p.exitcode is not None]
+            failed = [p for p in stopped if p.exitcode]
+            if failed or len(stopped) == len(processes):
+                try:
+                    # (a report sent just before exiting)
+                    results.append(reports.get(timeout=Launcher.POLL_INTERVAL))
+                    continue
+                except Empty:
+                    pass
+                for p in processes:
+                    if p.exitcode is None:
+                        p.terminate()
+                    p.join()
+                raise ValueError('Worker stopped without report: ' +
+                                 ', '.join('%s (exit code %s)' % (p.name, p.exitcode) for p in failed or stopped))
+        for p in processes:
+            p.join()
+        return sorted(results, key=lambda r: r['worker'])
+
+
+def worker_file(path, index):
+    """
+
+    :param path: a file path
+    :param index: a worker index
+    :return: the path with the index before the extension, e.g. metrics.1.json for metrics.json
+    """
+    root, extension = os.path.splitext(path)
+    return '%s.%d%s' % (root, index, extension)
+
+
+def run_worker(index, host, specs, cpus, reports, metrics=None):
+    """
+    Creates and starts the nodes of a worker, then reports its utilisation:
+    the CPU time of the process and the time spent in the step functions
+    compared to the wall time.
+
+    :param index: the worker index
+    :param host: the AMQP host
+    :param specs: the list of (class path, name, inputs, outputs, is_first)
+    :param cpus: the CPUs the worker is pinned to (None to not pin)
+    :param reports: the queue receiving the report
+    :param metrics: the (port, file, interval) of the metrics of the nodes (None to not measure them),
+                    the port and the file of the worker are given by its index
+    """
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+
+    step_time = {}
+
+    def timed(node):
+        step = node.step
+
+        def timed_step(current_time, time_step):
+            start = time.perf_counter()
+            try:
+                step(current_time, time_step)
+            finally:
+                step_time[node.name] += time.perf_counter() - start
+        return timed_step
+
+    registry = None
+    server = None
+    writer = None
+    if metrics is not None:
+        port, path, interval = metrics
+        registry = MetricsRegistry()
+        if port is not None:
+            server = registry.serve(port + index)
+        if path:
+            writer = registry.write_snapshots(worker_file(path, index), interval)
+
+    nodes = []
+    for class_path, name, inputs, outputs, is_first in specs:
+        node = load_class(class_path)(host, name, inputs, outputs, is_first)
+        step_time[name] = 0.
+        node.step = timed(node)
+        node.metrics = registry
+        nodes.append(node)
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    threads = [node.start() for node in nodes]
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    if writer is not None:
+        writer.stop()
+    if server is not None:
+        server.shutdown()
+
+    reports.put({
+        'worker': index,
+        'pid': os.getpid(),
+        'cpus': cpus,
+        'nodes': [spec[1] for spec in specs],
+        'wall_time': wall,
+        'cpu_time': cpu,
+        'utilisation': cpu / wall if wall else 0.,
+        'step_time': step_time,
+    })
@@ -1,5 +1,11 @@
 import json
 
+try:
+    # optional, to stream the large configurations
+    import ijson
+except ImportError:
+    ijson = None
+
 
 class Loader(object):
     """
@@ -9,11 +15,14 @@ class Loader(object):
     def __init__(self, scheduler):
         """
         
-        :param host: the scheduler 
+        :param host: the scheduler (None to only read the data)
         """
         self._scheduler = scheduler
         self._nodes = []
         self._links = []
+        self._attributes = {}
+        # the nodes by name
+        self._index = {}
 
     def get_nodes(self):
         """
@@ -25,10 +34,17 @@ class Loader(object):
     def get_links(self):
         """
         
-        :return: the loaded links or an empty list 
+        :return: the loaded links (node_out, attr_out, node_in, attr_in) or an empty list 
         """
         return self._links
 
+    def get_attributes(self):
+        """
+
+        :return: a map of the loaded node names to their (inputs, outputs)
+        """
+        return self._attributes
+
 
 class JSONLoader(Loader):
     """
@@ -54,35 +70,50 @@ class JSONLoader(Loader):
             },
             ...
         }
-    }   
+    }
+
+    The attribute of a link can address an entity ("T[3]") or a slice of entities
+    ("T[0:100]") of a population Node (see obnl.impl.population).
+
+    When ijson is installed, the file is streamed (the nodes then the links)
+    instead of being loaded at once.
     """
     def __init__(self, scheduler, config_file):
         super(JSONLoader, self).__init__(scheduler)
 
         # load the data from json file
-        with open(config_file) as jsonfile:
-            config_data = json.loads(jsonfile.read())
+        with open(config_file, 'rb') as jsonfile:
+            if ijson is not None:
+                # load the nodes
+                self._prepare_nodes(ijson.kvitems(jsonfile, 'nodes'))
+                # then the links
+                jsonfile.seek(0)
+                self._prepare_links(ijson.kvitems(jsonfile, 'links'))
+            else:
+                config_data = json.load(jsonfile)
 
-            # load the nodes
-            self._prepare_nodes(config_data['nodes'])
-            # then the links
-            self._prepare_links(config_data['links'])
+                # load the nodes
+                self._prepare_nodes(config_data['nodes'].items())
+                # then the links
+                self._prepare_links(config_data['links'].items())
 
     def _find_in_nodes(self, str_node):
-        for node in self._nodes:
-            if str_node == node:
-                return node
+        return self._index.get(str_node)
 
     def _prepare_nodes(self, nodes):
-        for name, data in nodes.items():
+        for name, data in nodes:
             self._nodes.append(name)
+            self._index[name] = name
+            self._attributes[name] = (list(data.get('inputs', [])), list(data.get('outputs', [])))
 
     def _prepare_links(self, links):
 
-        for name, data in links.items():
+        for name, data in links:
             in_data = data["in"]
             out_data = data["out"]
             in_node = self._find_in_nodes(in_data['node'])
             out_node = self._find_in_nodes(out_data['node'])
 
-            self._scheduler.create_data_link(out_node, out_data['attr'], in_node, in_data['attr'])
+            self._links.append((out_node, out_data['attr'], in_node, in_data['attr']))
+            if self._scheduler is not None:
+                self._scheduler.create_data_link(out_node, out_data['attr'], in_node, in_data['attr'])
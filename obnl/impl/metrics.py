@@ -0,0 +1,305 @@
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+
+try:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+except ImportError:  # Python < 3.7
+    from http.server import BaseHTTPRequestHandler, HTTPServer as ThreadingHTTPServer
+
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10.)
+"""Upper bounds (in seconds) of the barrier latency histogram buckets"""
+
+RATE_WINDOW = 100
+"""Number of the last simulation steps used to compute the current steps/s"""
+
+
+class Histogram(object):
+    """
+    Counts observed durations in fixed buckets.
+    """
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+
+        :param buckets: the sorted upper bounds of the buckets (the last bucket is unbounded)
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.
+        self.count = 0
+
+    def observe(self, value):
+        """
+        Counts a value.
+
+        :param value: the observed duration
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+
+        :return: the (upper bound, number of values lower or equal) of each bucket,
+                 the last bound is float('inf')
+        """
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class NodeMetrics(object):
+    """
+    The counters of one Node, incremented directly by the Node.
+    """
+
+    __slots__ = ('messages_in', 'bytes_in', 'messages_out', 'bytes_out', 'steps', 'simulation_time',
+                 'step_time', 'input_wait')
+
+    def __init__(self):
+        self.messages_in = 0
+        self.bytes_in = 0
+        self.messages_out = 0
+        self.bytes_out = 0
+        self.steps = 0
+        self.simulation_time = 0.
+        self.step_time = 0.
+        """Wall time spent in the step function (in seconds)"""
+        self.input_wait = 0.
+        """Wall time between the NextStep messages and the reception of the inputs (in seconds)"""
+
+
+class MetricsRegistry(object):
+    """
+    Live counters of a running simulation: simulation steps and time, messages and
+    bytes of each Node, barrier latency of each block and input wait time.
+
+    The Nodes and the Scheduler it is given to update plain attributes (a check of
+    whether they have a registry without one). The registry is read from other
+    threads: by the HTTP endpoint (see serve) and the snapshot writer (see write_snapshots).
+    Only the Nodes of the process are counted: the Nodes started in other processes
+    need a registry of their own (e.g. the metrics options of obnl.launcher).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+
+        :param buckets: the upper bounds of the barrier latency histogram buckets
+        """
+        self._buckets = tuple(buckets)
+        self._nodes = {}
+        self._barriers = {}
+        self._lock = threading.Lock()
+
+        self._start = time.time()
+        self._steps = 0
+        self._simulation_time = 0.
+        self._step_times = deque(maxlen=RATE_WINDOW)
+
+    def node(self, name):
+        """
+
+        :param name: the name of a Node
+        :return: the NodeMetrics of the Node (created if needed)
+        """
+        with self._lock:
+            metrics = self._nodes.get(name)
+            if metrics is None:
+                metrics = self._nodes[name] = NodeMetrics()
+            return metrics
+
+    def barrier(self, block):
+        """
+
+        :param block: the position of a block
+        :return: the barrier latency Histogram of the block (created if needed)
+        """
+        with self._lock:
+            histogram = self._barriers.get(block)
+            if histogram is None:
+                histogram = self._barriers[block] = Histogram(self._buckets)
+            return histogram
+
+    def step_done(self, simulation_time):
+        """
+        Counts a simulation step done by every Node.
+
+        :param simulation_time: the simulation time of the step
+        """
+        self._steps += 1
+        self._simulation_time = simulation_time
+        self._step_times.append(time.time())
+
+    def snapshot(self):
+        """
+
+        :return: the current values as a dict (JSON serializable)
+        """
+        now = time.time()
+        wall_time = now - self._start
+        step_times = list(self._step_times)
+        recent = (len(step_times) - 1) / (step_times[-1] - step_times[0]) \
+            if len(step_times) > 1 and step_times[-1] > step_times[0] else 0.
+        with self._lock:
+            nodes = list(self._nodes.items())
+            barriers = list(self._barriers.items())
+
+        return {
+            'timestamp': now,
+            'wall_time': wall_time,
+            'steps': self._steps,
+            'steps_per_second': recent,
+            'mean_steps_per_second': self._steps / wall_time if wall_time > 0 else 0.,
+            'simulation_time': self._simulation_time,
+            'simulation_speed': self._simulation_time / wall_time if wall_time > 0 else 0.,
+            'nodes': {name: {slot: getattr(metrics, slot) for slot in NodeMetrics.__slots__}
+                      for name, metrics in nodes},
+            'barriers': {str(block): {'count': histogram.count, 'sum': histogram.sum,
+                                      'buckets': [[bound if bound != float('inf') else None, count]
+                                                  for bound, count in histogram.cumulative()]}
+                         for block, histogram in barriers},
+        }
+
+    def render(self):
+        """
+
+        :return: the current values in the plain text exposition format (Prometheus)
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, kind, value, help_text):
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s %s' % (name, kind))
+            lines.append('%s %s' % (name, _number(value)))
+
+        metric('obnl_steps_total', 'counter', snapshot['steps'], 'Simulation steps done by every node.')
+        metric('obnl_steps_per_second', 'gauge', snapshot['steps_per_second'],
+               'Simulation steps per second over the last %d steps.' % RATE_WINDOW)
+        metric('obnl_simulation_time', 'gauge', snapshot['simulation_time'], 'Time of the last simulation step.')
+        metric('obnl_wall_time_seconds', 'gauge', snapshot['wall_time'], 'Wall time since the registry creation.')
+
+        nodes = sorted(snapshot['nodes'].items())
+        for slot, name, kind, help_text in (
+                ('messages_in', 'obnl_node_messages_in_total', 'counter', 'Messages received by the node.'),
+                ('bytes_in', 'obnl_node_bytes_in_total', 'counter', 'Bytes received by the node.'),
+                ('messages_out', 'obnl_node_messages_out_total', 'counter', 'Messages sent by the node.'),
+                ('bytes_out', 'obnl_node_bytes_out_total', 'counter', 'Bytes sent by the node.'),
+                ('steps', 'obnl_node_steps_total', 'counter', 'Steps of the node.'),
+                ('simulation_time', 'obnl_node_simulation_time', 'gauge', 'Time of the last step of the node.'),
+                ('step_time', 'obnl_node_step_seconds_total', 'counter', 'Wall time spent in the step function.'),
+                ('input_wait', 'obnl_node_input_wait_seconds_total', 'counter',
+                 'Wall time waiting for the inputs after the NextStep messages.')):
+            if not nodes:
+                break
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for node, values in nodes:
+                lines.append('%s{node="%s"} %s' % (name, _label(node), _number(values[slot])))
+
+        if snapshot['barriers']:
+            lines.append('# HELP obnl_barrier_seconds Latency of the barriers of each block.')
+            lines.append('# TYPE obnl_barrier_seconds histogram')
+            for block, histogram in sorted(snapshot['barriers'].items(), key=lambda item: int(item[0])):
+                for bound, count in histogram['buckets']:
+                    lines.append('obnl_barrier_seconds_bucket{block="%s",le="%s"} %d'
+                                 % (block, _number(bound) if bound is not None else '+Inf', count))
+                lines.append('obnl_barrier_seconds_sum{block="%s"} %s' % (block, _number(histogram['sum'])))
+                lines.append('obnl_barrier_seconds_count{block="%s"} %d' % (block, histogram['count']))
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port=0, host='127.0.0.1'):
+        """
+        Serves the metrics over HTTP (plain text, any path) in a daemon thread.
+
+        :param port: the port (any free port if 0)
+        :param host: the interface to listen on
+        :return: the HTTP server (server_address gives the port, shutdown stops it)
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, name='obnl-metrics-http')
+        thread.daemon = True
+        thread.start()
+        return server
+
+    def write_snapshots(self, path, interval=10.):
+        """
+        Writes a JSON snapshot of the metrics in a file periodically (in a daemon thread).
+        The file is replaced atomically, so it can be read at any time.
+
+        :param path: the file path
+        :param interval: the period of the snapshots (in seconds)
+        :return: the SnapshotWriter (stop writes a last snapshot)
+        """
+        writer = SnapshotWriter(self, path, interval)
+        writer.start()
+        return writer
+
+
+class SnapshotWriter(threading.Thread):
+    """
+    The thread writing the periodic snapshots of a MetricsRegistry.
+    """
+
+    def __init__(self, registry, path, interval):
+        super(SnapshotWriter, self).__init__(name='obnl-metrics-snapshot')
+        self.daemon = True
+        self._registry = registry
+        self._path = path
+        self._interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self._interval):
+            self.write()
+
+    def write(self):
+        """
+        Writes a snapshot now.
+        """
+        temporary = self._path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(self._registry.snapshot(), f)
+        os.replace(temporary, self._path)
+
+    def stop(self):
+        """
+        Stops the periodic snapshots after a last one.
+        """
+        self._stopped.set()
+        self.write()
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -1,7 +1,54 @@
 import sys
-import pika
+import time
+import pickle
 
-from obnl.impl.message import MetaMessage, AttributeMessage, SimulatorConnection, NextStep, SchedulerConnection, Quit
+from obnl.impl.arrays import numpy, is_array, copy_value
+from obnl.impl.transports import AMQPTransport
+from obnl.impl.topology import Topology
+from obnl.impl.envelope import encode, decode
+from obnl.impl.tracing import NEXT_STEP, INPUTS_COMPLETE, STEP, REPLY
+from obnl.impl.message import MetaMessage, AttributeMessage, AttributeBatch, SimulatorConnection, NextStep, \
+    SchedulerConnection, Quit
+
+
+def _fill_attribute(am, attr, value, attribute_id=0):
+    """
+    Sets the name (or the ID in compact mode) and the value of an AttributeMessage.
+    NumPy arrays are sent as raw little-endian bytes with their dtype and shape,
+    other values as float.
+    """
+    if attribute_id:
+        am.attribute_id = attribute_id
+    else:
+        am.attribute_name = attr
+    if is_array(value):
+        array = numpy.ascontiguousarray(value, dtype=value.dtype.newbyteorder('<'))
+        am.array_value = array.tobytes()
+        am.array_dtype = array.dtype.str
+        am.array_shape.extend(array.shape)
+    else:
+        am.attribute_value = float(value)
+
+
+def _attribute_targets(sc):
+    """
+    :return: the linked inputs of each sender attribute given by a SchedulerConnection,
+             as a map of sender attributes to tuples of inputs
+    """
+    if sc.attribute_targets:
+        return {attr: tuple(targets.attributes) for attr, targets in sc.attribute_targets.items()}
+    # from a scheduler older than attribute_targets: one input per sender attribute
+    return {attr: (attr_in,) for attr, attr_in in sc.attribute_links.items()}
+
+
+def _attribute_value(am):
+    """
+    :return: the value of an AttributeMessage: a float or, for arrays, a read-only
+             NumPy view over the message bytes
+    """
+    if am.array_dtype:
+        return numpy.frombuffer(am.array_value, dtype=am.array_dtype).reshape(am.array_shape)
+    return am.attribute_value
 
 
 class Node(object):
@@ -10,6 +57,8 @@ class Node(object):
     """
 
     SCHEDULER_NAME = 'scheduler'
+    SCHEDULER_ID = 1
+    """ID of the scheduler in the compact envelopes (the Nodes get theirs in the SchedulerConnection)"""
 
     LOCAL_NODE_QUEUE = 'obnl.local.node.'
     """Base of every local queue (followed by the name of the Node)"""
@@ -26,10 +75,15 @@ class Node(object):
     DATA_NODE_EXCHANGE = 'obnl.data.node.'
     """Base of every data/attr exchange (followed by the name of the Node)"""
 
+    DATA_BATCH_ROUTING = 'obnl.data.batch'
+    """Routing key of the messages containing all the attributes updated by a Node during a step"""
+
     UPDATE_ROUTING = 'obnl.update.block.'
     """Base of every routing key for block messages (followed by the number/position of the block)"""
+    UPDATE_NODE_ROUTING = 'obnl.update.node.'
+    """Base of every routing key for messages to one Node (followed by the name of the Node)"""
 
-    def __init__(self, host, name):
+    def __init__(self, host, name, transport=None):
         """
         The constructor creates the 3 main queues
         - general: To receive data with everyone
@@ -38,18 +92,37 @@ class Node(object):
 
         :param host: the connection to AMQP
         :param name: the id of the Node
+        :param transport: the Transport to use (an AMQPTransport to host if None)
         """
-        connection = pika.BlockingConnection(pika.ConnectionParameters(host=host))
-        self._channel = connection.channel()
+        self._transport = transport if transport is not None else AMQPTransport(host)
         self._name = name
 
-        self._simulation_queue = self._channel.queue_declare(queue=Node.SIMULATION_NODE_QUEUE + self._name)
-        self._simulation_exchange = self._channel.exchange_declare(exchange=Node.SIMULATION_NODE_EXCHANGE + self._name)
+        # compact envelope mode: the interned ID of this Node (0 until known) and the sender names by ID
+        self._node_id = 0
+        self._sender_names = {Node.SCHEDULER_ID: Node.SCHEDULER_NAME}
+        # no tracing nor metrics by default
+        self._tracer = None
+        self._metrics = None
+        self._counters = None
+
+        # every queue and exchange of the Node is declared at once
+        topology = Topology()
+        self._plan_topology(topology)
+        self._transport.provision(topology)
+
+        self._simulation_queue = Node.SIMULATION_NODE_QUEUE + self._name
+        self._transport.consume(self._simulation_queue,
+                                self.on_simulation_message,
+                                consumer_tag='obnl_node_' + self._name + '_simulation')
+
+    def _plan_topology(self, topology):
+        """
+        Adds the queues and exchanges of the Node to the topology to declare.
 
-        self._channel.basic_consume(self.on_simulation_message,
-                                    consumer_tag='obnl_node_' + self._name + '_simulation',
-                                    queue=self._simulation_queue.method.queue,
-                                    no_ack=True)
+        :param topology: a Topology
+        """
+        topology.add_queue(Node.SIMULATION_NODE_QUEUE + self._name)
+        topology.add_exchange(Node.SIMULATION_NODE_EXCHANGE + self._name)
 
     @property
     def name(self):
@@ -59,11 +132,51 @@ class Node(object):
         """
         return self._name
 
+    @property
+    def transport(self):
+        """
+
+        :return: the Transport used by the Node
+        """
+        return self._transport
+
+    @property
+    def tracer(self):
+        """
+
+        :return: the Tracer recording the events of the Node (None if not traced)
+        """
+        return self._tracer
+
+    @tracer.setter
+    def tracer(self, tracer):
+        self._tracer = tracer
+
+    @property
+    def metrics(self):
+        """
+
+        :return: the MetricsRegistry updated by the Node (None if not measured)
+        """
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, metrics):
+        self._metrics = metrics
+        self._counters = metrics.node(self._name) if metrics is not None else None
+
     def start(self):
         """
         Starts listening.
         """
-        self._channel.start_consuming()
+        self._transport.start()
+
+    def _quit(self):
+        """
+        Ends the Node at the end of the simulation.
+        """
+        self._transport.flush()
+        sys.exit(0)
 
     def on_local_message(self, ch, method, props, body):
         """
@@ -92,14 +205,7 @@ class Node(object):
         :param reply_to: the routing key to reply to
         """
 
-        mm = MetaMessage()
-        mm.node_name = self._name
-        mm.details.Pack(message)
-
-        self._channel.publish(exchange=exchange,
-                              routing_key=routing,
-                              properties=pika.BasicProperties(reply_to=reply_to),
-                              body=mm.SerializeToString())
+        self._publish(exchange, routing, encode(message, self._name, self._node_id), reply_to=reply_to)
 
     def reply_to(self, reply_to, message):
         """
@@ -109,13 +215,33 @@ class Node(object):
         :param message: the message (str)
         """
         if reply_to:
-            m = MetaMessage()
-            m.node_name = self._name
-            m.type = MetaMessage.ANSWER
+            self._publish('', reply_to, encode(message, self._name, self._node_id, MetaMessage.ANSWER))
+
+    def _publish(self, exchange, routing, body, reply_to=None):
+        """
+        Publishes a serialized message (and counts it).
+
+        :param exchange: the MQTT exchange
+        :param routing: the MQTT routing key
+        :param body: the serialized message
+        :param reply_to: the routing key to reply to
+        """
+        counters = self._counters
+        if counters is not None:
+            counters.messages_out += 1
+            counters.bytes_out += len(body)
+        self._transport.publish(exchange, routing, body, reply_to=reply_to)
 
-            m.details.Pack(message)
+    def _received_message(self, body):
+        """
+        Counts a received message.
 
-            self._channel.publish(exchange='', routing_key=reply_to, body=m.SerializeToString())
+        :param body: the serialized message
+        """
+        counters = self._counters
+        if counters is not None:
+            counters.messages_in += 1
+            counters.bytes_in += len(body)
 
     def send_simulation(self, routing, message, reply_to=None):
         """
@@ -130,27 +256,24 @@ class Node(object):
 
 class ClientNode(Node):
 
-    def __init__(self, host, name, api, input_attributes=None, output_attributes=None, is_first=False):
-        super(ClientNode, self).__init__(host, name)
+    def __init__(self, host, name, api, input_attributes=None, output_attributes=None, is_first=False,
+                 transport=None, batch=False, local_queue=False, publish_policies=None):
+        self._local_queue = Node.LOCAL_NODE_QUEUE + name if local_queue else None
+        super(ClientNode, self).__init__(host, name, transport)
 
-        # Local communication
-        self._local_queue = self._channel.queue_declare(queue=Node.LOCAL_NODE_QUEUE + self._name)
-        self._local_exchange = self._channel.exchange_declare(exchange=Node.LOCAL_NODE_EXCHANGE + self._name)
-
-        self._channel.basic_consume(self.on_local_message,
-                                    consumer_tag='obnl_node_' + self._name + '_local',
-                                    queue=self._local_queue.method.queue,
-                                    no_ack=True)
-        self._channel.queue_bind(exchange=Node.LOCAL_NODE_EXCHANGE + self._name,
-                                 queue=Node.LOCAL_NODE_QUEUE + self._name)
+        # Local communication (only needed by external triggers,
+        # the readiness of the Node is checked in process)
+        if self._local_queue is not None:
+            self._transport.consume(self._local_queue,
+                                    self.on_local_message,
+                                    consumer_tag='obnl_node_' + self._name + '_local')
 
         # Data communication
-        self._data_queue = self._channel.queue_declare(queue=Node.DATA_NODE_QUEUE + self._name)
+        self._data_queue = Node.DATA_NODE_QUEUE + self._name
 
-        self._channel.basic_consume(self.on_data_message,
-                                    consumer_tag='obnl_node_' + self._name + '_data',
-                                    queue=self._data_queue.method.queue,
-                                    no_ack=True)
+        self._transport.consume(self._data_queue,
+                                self.on_data_message,
+                                consumer_tag='obnl_node_' + self._name + '_data')
 
         self._api_node = api
 
@@ -165,12 +288,61 @@ class ClientNode(Node):
         self._input_attributes = input_attributes
         self._output_attributes = output_attributes
 
+        # the input values are kept from one step to another: an input is missing
+        # until its first value is received, then it waits only for the announced updates
+        self._required_inputs = frozenset(input_attributes or ())
+        self._missing_inputs = set(self._required_inputs)
+        self._received_times = {}
+        self._waited_updates = {}
+        # wall time of the last NextStep message (measured Nodes)
+        self._next_step_time = 0.
+
+        self._policies = publish_policies or {}
+        self._last_published = {}
+        self._updates = {}
+        # the last sent value (and its simulation time) of each output, sent again when resumed
+        self._last_values = {}
+        # the outputs waited for by the Nodes of the block (see _step_done)
+        self._awaited_outputs = ()
+        # the scheduler asked for a snapshot with the answer of the current step
+        self._checkpoint = False
+        # no step recording by default (see obnl.impl.replay)
+        self._recording = None
+
+        self._batch = batch
+        self._stepping = False
+        self._pending_attributes = {}
+
+        # compact envelope mode: the IDs of the attributes sent or received (by sender name)
+        self._attribute_ids = {}
+        self._attribute_names = {}
+        # the data received before the SchedulerConnection, handled with it (resumed simulation:
+        # the restored Nodes send their last values as soon as they are connected)
+        self._early_data = []
+
+        self._simulation_handlers = {
+            NextStep: self._on_next_step,
+            SchedulerConnection: self._on_scheduler_connection,
+            Quit: self._on_quit,
+        }
+        self._data_handlers = {
+            AttributeMessage: self._on_attribute,
+            AttributeBatch: self._on_attribute_batch,
+        }
+
         si = SimulatorConnection()
         si.type = SimulatorConnection.OTHER
+        si.data_endpoint = self._transport.data_endpoint(self._name)
 
         self.send_simulation(Node.SIMULATION_NODE_EXCHANGE + Node.SCHEDULER_NAME,
                              si, reply_to=Node.SIMULATION_NODE_QUEUE + self.name)
 
+    def _plan_topology(self, topology):
+        super(ClientNode, self)._plan_topology(topology)
+        if self._local_queue is not None:
+            topology.add_binding(Node.LOCAL_NODE_EXCHANGE + self._name, self._local_queue)
+        topology.add_queue(Node.DATA_NODE_QUEUE + self._name)
+
     @property
     def input_values(self):
         return self._input_values
@@ -183,77 +355,350 @@ class ClientNode(Node):
     def output_attributes(self):
         return self._output_attributes
 
+    @property
+    def recording(self):
+        """
+
+        :return: the StepRecording recording the steps of the Node (None if not recorded)
+        """
+        return self._recording
+
+    @recording.setter
+    def recording(self, recording):
+        self._recording = recording
+
+    def set_step(self, current_time, time_step, inputs):
+        """
+        Sets the time and the inputs of the next step (replay, see obnl.impl.replay).
+
+        :param current_time: the time of the step
+        :param time_step: the time step
+        :param inputs: a map of the received input values
+        """
+        self._current_time = current_time
+        self._time_step = time_step
+        self._set_inputs(inputs)
+
     def step(self, current_time, time_step):
-        self._api_node.step(current_time, time_step)
+        self._stepping = True
+        try:
+            self._api_node.step(current_time, time_step)
+        finally:
+            self._stepping = False
+        self.flush_attributes()
 
     def update_attribute(self, attr, value):
         """
         Sends the new attribute value to those who want to know.
+        In batch mode, the values updated during a step are sent together when the step returns.
 
         :param attr: the attribute to communicate 
+        :param value: the new value of the attribute (a float or a NumPy array)
+        """
+        policy = self._policies.get(attr)
+        if policy is not None:
+            last = self._last_published.get(attr)
+            if last is not None and not policy.must_publish(last, value):
+                return
+            self._last_published[attr] = copy_value(value)
+
+        if self._recording is not None:
+            self._recording.output(attr, value)
+        self._send_attribute(attr, value)
+        if self._batch and not self._stepping:
+            self.flush_attributes()
+
+    def _send_attribute(self, attr, value):
+        """
+        Sends an attribute value (once the publish policy is applied).
+        In batch mode, the value is pending until flush_attributes is called.
+
+        :param attr: the attribute to communicate
         :param value: the new value of the attribute
         """
+        if self._output_attributes:
+            self._updates[attr] = self._current_time
+        self._last_values[attr] = (value, self._current_time)
+
         am = AttributeMessage()
+        _fill_attribute(am, attr, value, self._attribute_ids.get(attr, 0))
+
+        if self._batch:
+            # sent by flush_attributes
+            self._pending_attributes[attr] = am
+            return
+
         am.simulation_time = self._current_time
-        am.attribute_name = attr
-        am.attribute_value = float(value)
 
-        m = MetaMessage()
-        m.node_name = self._name
-        m.type = MetaMessage.ATTRIBUTE
-        m.details.Pack(am)
+        if self._output_attributes:
+            self._publish(Node.DATA_NODE_EXCHANGE + self._name,
+                          Node.DATA_NODE_EXCHANGE + attr,
+                          encode(am, self._name, self._node_id, MetaMessage.ATTRIBUTE))
+
+    def flush_attributes(self):
+        """
+        Sends the pending attribute values (batch mode) in one message.
+        """
+        if not self._pending_attributes:
+            return
+
+        ab = AttributeBatch()
+        ab.simulation_time = self._current_time
+        ab.attributes.extend(self._pending_attributes.values())
+        self._pending_attributes.clear()
 
         if self._output_attributes:
-            self._channel.publish(exchange=Node.DATA_NODE_EXCHANGE + self._name,
-                                  routing_key=Node.DATA_NODE_EXCHANGE + attr,
-                                  body=m.SerializeToString())
+            self._publish(Node.DATA_NODE_EXCHANGE + self._name,
+                          Node.DATA_BATCH_ROUTING,
+                          encode(ab, self._name, self._node_id, MetaMessage.ATTRIBUTE_BATCH))
 
     def on_local_message(self, ch, method, props, body):
-        if self._next_step \
-                and (self._is_first
-                     or not self._input_attributes
-                     or len(self._input_values.keys()) == len(self._input_attributes)):
+        """
+        Callback of the (optional) local queue: an external trigger to check if the Node can step.
+        """
+        self.check_ready()
+
+    def is_ready(self):
+        """
+
+        :return: True if the NextStep message has arrived and all the required inputs are present
+        """
+        return self._next_step and (self._is_first or not (self._missing_inputs or self._waited_updates))
+
+    def check_ready(self):
+        """
+        Steps the Node if the NextStep message has arrived and all the required inputs are present.
+        """
+        if self.is_ready():
+            self._next_step = False
+            tracer = self._tracer
+            if tracer is not None:
+                tracer.instant(INPUTS_COMPLETE, self._name, self._current_time)
+                start = tracer.now()
+            counters = self._counters
+            if counters is not None:
+                step_start = time.time()
+                counters.input_wait += step_start - self._next_step_time
+            recording = self._recording
+            if recording is not None:
+                recording.begin_step(self, self._current_time, self._time_step, self._input_values)
             # TODO: call updateX or updateY depending on the meta content
             self.step(self._current_time, self._time_step)
-            self._next_step = False
-            self._input_values.clear()
+            if recording is not None:
+                recording.end_step()
+            if tracer is not None:
+                tracer.span(STEP, self._name, start, tracer.now(), self._current_time)
+            if counters is not None:
+                self._count_step(time.time() - step_start)
+            self._step_done()
+
+    def _count_step(self, duration):
+        """
+        Counts a done step (measured Nodes).
+
+        :param duration: the wall time of the step function
+        """
+        counters = self._counters
+        counters.steps += 1
+        counters.step_time += duration
+        counters.simulation_time = self._current_time
+
+    def _step_done(self):
+        """
+        Informs the scheduler that the step is done and which attributes have been sent.
+        """
+        # the Nodes of the block wait for these outputs: the ones not sent during the step are sent again
+        awaited = [attr for attr in self._awaited_outputs if attr not in self._updates and attr in self._last_values]
+        if awaited:
+            for attr in awaited:
+                self._send_attribute(attr, self._last_values[attr][0])
+            self.flush_attributes()
+
+        nm = NextStep()
+        nm.current_time = self._current_time
+        nm.time_step = self._time_step
+        ids = self._attribute_ids
+        for attr, update_time in self._updates.items():
+            if attr in ids:
+                nm.update_ids[ids[attr]] = update_time
+            else:
+                nm.updates[attr] = update_time
+        self._updates.clear()
+        if self._checkpoint:
+            nm.snapshot = self.snapshot()
+        # the values sent during the step are written (and confirmed) before the answer
+        self._transport.flush()
+        self.reply_to(self._reply_to, nm)
+        if self._tracer is not None:
+            self._tracer.instant(REPLY, self._name, self._current_time)
+
+    def on_simulation_message(self, ch, method, props, body):
+        self._received_message(body)
+        sender, message = decode(body, self._sender_names)
+        handler = self._simulation_handlers.get(type(message))
+        if handler is not None:
+            handler(sender, message, props)
+
+    def _on_next_step(self, sender, nm, props):
+        if sender != Node.SCHEDULER_NAME:
+            return
+        if self._counters is not None:
+            self._next_step_time = time.time()
+        self._next_step = True
+        self._reply_to = props.reply_to
+        self._current_time = nm.current_time
+        self._time_step = nm.time_step
+        self._checkpoint = nm.checkpoint
+        if self._tracer is not None:
+            self._tracer.instant(NEXT_STEP, self._name, nm.current_time)
+        # the inputs updated since the last step (announced by the scheduler) have to be received,
+        # the others keep their last value
+        updates = dict(nm.updates)
+        names = self._attribute_names
+        for attribute_id, update_time in nm.update_ids.items():
+            # a block message holds the updates of the other Nodes of the block too
+            if attribute_id in names:
+                updates[names[attribute_id]] = update_time
+        received = self._received_times
+        self._waited_updates = {attr: update_time for attr, update_time in updates.items()
+                                if attr in self._links and received.get(attr, update_time - 1) < update_time}
+        self.check_ready()
+
+    def _on_scheduler_connection(self, sender, sc, props):
+        self._links = _attribute_targets(sc)
+        self._attribute_ids = dict(sc.attribute_ids)
+        self._attribute_names = {attribute_id: attr for attr, attribute_id in self._attribute_ids.items()}
+        # the following messages use the compact envelope if the scheduler gave an ID
+        self._node_id = sc.node_id
+        self._select_outputs(sc.output_selections)
+        self._awaited_outputs = tuple(sc.awaited_outputs)
+        if sc.data_outputs or sc.data_inputs:
+            self._transport.open_data_links(self._name, sc.data_plane, sc.data_outputs, sc.data_inputs,
+                                            sc.broker_routes)
+        if sc.snapshot:
+            self.restore(sc.snapshot)
+            # the scheduler starts the resumed simulation when every Node has answered
             nm = NextStep()
             nm.current_time = self._current_time
-            nm.time_step = self._time_step
-            self.reply_to(self._reply_to, nm)
+            self.send_scheduler(nm)
 
-    def on_simulation_message(self, ch, method, props, body):
-        mm = MetaMessage()
-        mm.ParseFromString(body)
+        early_data, self._early_data = self._early_data, None
+        for body in early_data:
+            self.on_data_message(None, None, None, body)
 
-        if mm.details.Is(NextStep.DESCRIPTOR) and mm.node_name == Node.SCHEDULER_NAME:
-            nm = NextStep()
-            mm.details.Unpack(nm)
-            self._next_step = True
-            self._reply_to = props.reply_to
-            self._current_time = nm.current_time
-            self._time_step = nm.time_step
-            self.send_local(mm.details)
-        elif mm.details.Is(SchedulerConnection.DESCRIPTOR):
-            sc = SchedulerConnection()
-            mm.details.Unpack(sc)
-            self._links = dict(sc.attribute_links)
-        elif mm.details.Is(Quit.DESCRIPTOR):
-            sys.exit(0)
+    def _select_outputs(self, selections):
+        """
+        Prepares the indexed outputs of the Node linked to other Nodes (see obnl.impl.population).
 
-    def on_data_message(self, ch, method, props, body):
-        mm = MetaMessage()
-        mm.ParseFromString(body)
+        :param selections: the indexed outputs (e.g. 'T[3]' or 'T[0:100]')
+        """
+        if selections:
+            raise ValueError('The indexed outputs of %s (%s) require a PopulationNode'
+                             % (self._name, ', '.join(selections)))
+
+    def snapshot(self):
+        """
+        Saves the state of the Node: its inputs, its last sent values and the state given by the
+        save function of the api (if any).
 
-        if mm.details.Is(AttributeMessage.DESCRIPTOR):
+        :return: the snapshot (bytes)
+        """
+        save = getattr(self._api_node, 'save', None)
+        return pickle.dumps({
+            'time': self._current_time,
+            'inputs': dict(self._input_values),
+            'received': dict(self._received_times),
+            'last_published': dict(self._last_published),
+            'last_values': dict(self._last_values),
+            'state': save() if save is not None else None,
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def restore(self, snapshot):
+        """
+        Restores the state of the Node from a snapshot (resumed simulation), then sends its last
+        values again: the Nodes of the previous blocks may not have received the ones of the
+        checkpoint step before it was written.
+
+        :param snapshot: the snapshot (see snapshot)
+        """
+        data = pickle.loads(snapshot)
+        self._current_time = data['time']
+        self._input_values.update(data['inputs'])
+        self._missing_inputs.difference_update(data['inputs'])
+        self._received_times.update(data['received'])
+        self._last_published.update(data['last_published'])
+        self._last_values.update(data['last_values'])
+        restore = getattr(self._api_node, 'restore', None)
+        if restore is not None:
+            restore(data['state'])
+
+        if not self._output_attributes:
+            return
+        for attr, (value, simulation_time) in data['last_values'].items():
             am = AttributeMessage()
-            mm.details.Unpack(am)
-            self._input_values[self._links[am.attribute_name]] = am.attribute_value
-        self.send_local(mm.details)
+            _fill_attribute(am, attr, value, self._attribute_ids.get(attr, 0))
+            am.simulation_time = simulation_time
+            self._publish(Node.DATA_NODE_EXCHANGE + self._name,
+                          Node.DATA_NODE_EXCHANGE + attr,
+                          encode(am, self._name, self._node_id, MetaMessage.ATTRIBUTE))
+
+    def _on_quit(self, sender, message, props):
+        self._quit()
+
+    def on_data_message(self, ch, method, props, body):
+        if self._early_data is not None:
+            self._early_data.append(body)
+            return
+        self._received_message(body)
+        sender, message = decode(body, self._sender_names)
+        handler = self._data_handlers.get(type(message))
+        if handler is not None:
+            handler(message)
+        self.check_ready()
+
+    def _on_attribute(self, am):
+        name = am.attribute_name or self._attribute_names[am.attribute_id]
+        value = _attribute_value(am)
+        self._set_inputs({attr: value for attr in self._links[name]})
+        self._received(name, am.simulation_time)
+
+    def _on_attribute_batch(self, ab):
+        # a batch holds every attribute of the sender, only the linked ones are kept
+        links = self._links
+        names = self._attribute_names
+        values = {}
+        for am in ab.attributes:
+            name = am.attribute_name or names.get(am.attribute_id)
+            if name in links:
+                value = _attribute_value(am)
+                for attr in links[name]:
+                    values[attr] = value
+                self._received(name, ab.simulation_time)
+        self._set_inputs(values)
+
+    def _set_inputs(self, values):
+        """
+        Keeps received input values.
+
+        :param values: a map of the input attributes (from the Node point of view) to their values
+        """
+        self._input_values.update(values)
+        self._missing_inputs.difference_update(values)
+
+    def _received(self, attr, simulation_time):
+        """
+        Records the reception of a value.
+
+        :param attr: the attribute name (from the sender point of view)
+        :param simulation_time: the simulation time of the value
+        """
+        self._received_times[attr] = simulation_time
+        if attr in self._waited_updates and simulation_time >= self._waited_updates[attr]:
+            del self._waited_updates[attr]
 
     def send_local(self, message):
         """
-        Sends the content to local.
+        Sends the content to local (requires the local queue).
 
         :param message: a protobuf message 
         """
@@ -0,0 +1,274 @@
+import os
+import socket
+import struct
+import selectors
+import threading
+
+from obnl.impl.node import Node
+from obnl.impl.transports import WrappingTransport, PublishError, LocalMethod, LocalProperties
+
+_LENGTH = struct.Struct('<I')
+
+
+def parse_endpoint(endpoint):
+    """
+    Reads the address of a Node: 'tcp://host:port' or 'unix:///path/of/the/socket'.
+
+    :param endpoint: the address
+    :return: the socket family and address
+    """
+    scheme, _, address = endpoint.partition('://')
+    if scheme == 'unix' and address:
+        return socket.AF_UNIX, address
+    if scheme == 'tcp':
+        host, _, port = address.rpartition(':')
+        if host and port.isdigit():
+            return socket.AF_INET, (host.strip('[]'), int(port))
+    raise ValueError('Invalid endpoint (tcp://host:port or unix:///path expected): ' + endpoint)
+
+
+def _frame(body):
+    return _LENGTH.pack(len(body)) + body
+
+
+class _Connection(object):
+    """
+    A connection accepted by the listener: the bytes received not read yet and the sender
+    (given by the first message).
+    """
+
+    def __init__(self, sock):
+        self.socket = sock
+        self.buffer = bytearray()
+        self.method = None
+
+
+class PeerTransport(WrappingTransport):
+    """
+    A Transport carrying the data links of a Node directly to the Nodes receiving them, over
+    persistent TCP or Unix socket connections.
+
+    It wraps the Transport used for everything else (the control messages, the topology and
+    the data links going through the broker). The Node listens on its endpoint (see data_endpoint)
+    and gives it to the Scheduler when it connects; the Scheduler gives each sender the endpoints
+    of its receivers in the SchedulerConnection (see the peer_to_peer Nodes of the Scheduler).
+    The sender connects to each receiver once and sends its name, then the messages of the link
+    (their length on 4 bytes and their bytes). The data published by the Node goes to the
+    connections of its links, and to the wrapped transport only if some receivers are still
+    bound on the broker.
+
+    A reader thread reads the connections of the senders and gives the messages to the data
+    callback from the thread of the wrapped transport (see Transport.call_threadsafe).
+    The listener is closed when the transport stops, or by close if it is not started.
+    """
+
+    POLL_INTERVAL = 0.01
+    """Maximum time (in seconds) the reader waits without checking if the transport is closed"""
+
+    def __init__(self, transport, listen='tcp://127.0.0.1:0', advertise=None, timeout=10.):
+        """
+
+        :param transport: the Transport of the control messages (and of the other data links)
+        :param listen: the address the Node listens on (see parse_endpoint), a free port is
+                       taken if the port is 0
+        :param advertise: the host given to the senders for a tcp address (the listened one if None,
+                          the name of the host if it listens on every interface)
+        :param timeout: the time (in seconds) a connection to a receiver can take
+        """
+        super(PeerTransport, self).__init__(transport)
+        self._listen = listen
+        self._advertise = advertise
+        self._timeout = timeout
+        self._callbacks = {}
+        # data exchange of the Node -> ({routing key: [socket]}, routing keys on the broker,
+        #                              True if the wrapped transport carries other links)
+        self._outputs = {}
+        self._peers = []
+
+        self._endpoint = None
+        self._listener = None
+        self._unix_path = None
+        self._queue = None
+        self._reader = None
+        self._closed = False
+
+    @property
+    def endpoint(self):
+        """
+
+        :return: the address of the Node (None until data_endpoint is called)
+        """
+        return self._endpoint
+
+    def consume(self, queue, callback, consumer_tag=None):
+        self._callbacks[queue] = (callback, consumer_tag)
+        self._transport.consume(queue, callback, consumer_tag)
+
+    def publish(self, exchange, routing_key, body, reply_to=None):
+        output = self._outputs.get(exchange)
+        if output is None:
+            self._transport.publish(exchange, routing_key, body, reply_to=reply_to)
+            return
+        routes, broker_routes, wrapped_links = output
+        peers = routes.get(routing_key)
+        if peers:
+            frame = _frame(body)
+            for peer in peers:
+                try:
+                    peer.sendall(frame)
+                except OSError as e:
+                    raise PublishError('The data link to %s is broken: %s' % (peer.getpeername(), e))
+        if wrapped_links or routing_key in broker_routes:
+            self._transport.publish(exchange, routing_key, body, reply_to=reply_to)
+
+    def start(self):
+        try:
+            self._transport.start()
+        finally:
+            self.close()
+
+    def data_endpoint(self, node):
+        if self._endpoint is not None:
+            return self._endpoint
+        family, address = parse_endpoint(self._listen)
+        self._listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_UNIX:
+            try:
+                os.unlink(address)
+            except FileNotFoundError:
+                pass
+            self._listener.bind(address)
+            self._unix_path = address
+            self._endpoint = 'unix://' + address
+        else:
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._listener.bind(address)
+            host = self._advertise or address[0]
+            if host in ('', '0.0.0.0', '::'):
+                host = socket.getfqdn()
+            self._endpoint = 'tcp://%s:%d' % (host, self._listener.getsockname()[1])
+        self._listener.listen(64)
+        self._listener.setblocking(False)
+
+        self._queue = Node.DATA_NODE_QUEUE + node
+        self._reader = threading.Thread(target=self._read_loop, name='obnl-peer-' + node)
+        self._reader.daemon = True
+        self._reader.start()
+        return self._endpoint
+
+    def open_data_links(self, node, data_plane, outputs, inputs, broker_routes):
+        # the shared memory links are left to the wrapped transport
+        other_outputs = [link for link in outputs if not link.endpoint]
+        other_inputs = [link for link in inputs if not link.endpoint]
+        if other_outputs or other_inputs:
+            self._transport.open_data_links(node, data_plane, other_outputs, other_inputs, broker_routes)
+        outputs = [link for link in outputs if link.endpoint]
+
+        if outputs:
+            routes = {}
+            for link in outputs:
+                peer = self._connect(link.endpoint)
+                peer.sendall(_frame(node.encode()))
+                self._peers.append(peer)
+                routes.setdefault(Node.DATA_BATCH_ROUTING, []).append(peer)
+                for attr in link.attributes:
+                    routes.setdefault(Node.DATA_NODE_EXCHANGE + attr, []).append(peer)
+            self._outputs[Node.DATA_NODE_EXCHANGE + node] = (routes, frozenset(broker_routes), bool(other_outputs))
+        # the connections of the senders are accepted by the reader
+
+    def _connect(self, endpoint):
+        family, address = parse_endpoint(endpoint)
+        if family == socket.AF_UNIX:
+            peer = socket.socket(family, socket.SOCK_STREAM)
+            peer.settimeout(self._timeout)
+            peer.connect(address)
+        else:
+            peer = socket.create_connection(address, timeout=self._timeout)
+            peer.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        peer.settimeout(None)
+        return peer
+
+    def _read_loop(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self._listener, selectors.EVENT_READ)
+        try:
+            while not self._closed:
+                messages = []
+                for key, _ in selector.select(PeerTransport.POLL_INTERVAL):
+                    if key.data is None:
+                        self._accept(selector)
+                    else:
+                        self._read(selector, key.data, messages)
+                if messages:
+                    self._transport.call_threadsafe(lambda messages=messages: self._deliver(messages))
+        finally:
+            for key in list(selector.get_map().values()):
+                if key.data is not None:
+                    key.data.socket.close()
+            selector.close()
+
+    def _accept(self, selector):
+        try:
+            sock, _ = self._listener.accept()
+        except (BlockingIOError, OSError):
+            return
+        sock.setblocking(False)
+        if sock.family != socket.AF_UNIX:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        selector.register(sock, selectors.EVENT_READ, _Connection(sock))
+
+    def _read(self, selector, connection, messages):
+        try:
+            data = connection.socket.recv(1 << 16)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            # the sender has stopped
+            selector.unregister(connection.socket)
+            connection.socket.close()
+            return
+
+        buffer = connection.buffer
+        buffer += data
+        start = 0
+        while len(buffer) - start >= 4:
+            length, = _LENGTH.unpack_from(buffer, start)
+            if len(buffer) - start - 4 < length:
+                break
+            body = bytes(buffer[start + 4:start + 4 + length])
+            start += 4 + length
+            if connection.method is None:
+                _, consumer_tag = self._callbacks[self._queue]
+                connection.method = LocalMethod(consumer_tag, Node.DATA_NODE_EXCHANGE + body.decode(), None)
+            else:
+                messages.append((connection.method, body))
+        del buffer[:start]
+
+    def _deliver(self, messages):
+        callback, _ = self._callbacks[self._queue]
+        props = LocalProperties(reply_to=None)
+        for method, body in messages:
+            callback(self, method, props, body)
+
+    def close(self):
+        """
+        Stops the reader and closes the connections and the listener of the Node.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._reader is not None and self._reader is not threading.current_thread():
+            self._reader.join()
+        for peer in self._peers:
+            peer.close()
+        self._peers = []
+        self._outputs = {}
+        if self._listener is not None:
+            self._listener.close()
+            if self._unix_path is not None:
+                try:
+                    os.unlink(self._unix_path)
+                except FileNotFoundError:
+                    pass
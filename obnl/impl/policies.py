@@ -0,0 +1,80 @@
+from obnl.impl.arrays import numpy, is_array
+
+
+class PublishPolicy(object):
+    """
+    Base class of every publish policies.
+
+    A publish policy decides if a new value of an output attribute is sent,
+    compared to the last sent value. The receivers keep the last value of
+    their inputs, so an attribute which is not sent keeps its value.
+    """
+
+    def must_publish(self, last, value):
+        """
+
+        :param last: the last sent value (float or NumPy array)
+        :param value: the new value
+        :return: True if the new value has to be sent
+        """
+        raise NotImplementedError('Abstract function call from '+str(self.__class__))
+
+
+class Always(PublishPolicy):
+    """
+    Sends every value (the default behaviour).
+    """
+
+    def must_publish(self, last, value):
+        return True
+
+
+class OnChange(PublishPolicy):
+    """
+    Sends the values different from the last sent one.
+    """
+
+    def must_publish(self, last, value):
+        if is_array(value) or is_array(last):
+            return numpy.shape(last) != numpy.shape(value) or not numpy.array_equal(last, value)
+        return float(value) != float(last)
+
+
+class AbsoluteDeadband(PublishPolicy):
+    """
+    Sends the values which differ from the last sent one by more than a fixed amount.
+    """
+
+    def __init__(self, deadband):
+        """
+
+        :param deadband: the largest absolute difference that is not sent
+        """
+        self._deadband = deadband
+
+    def must_publish(self, last, value):
+        if is_array(value) or is_array(last):
+            if numpy.shape(last) != numpy.shape(value):
+                return True
+            return bool(numpy.any(numpy.abs(numpy.subtract(value, last)) > self._deadband))
+        return abs(float(value) - float(last)) > self._deadband
+
+
+class RelativeDeadband(PublishPolicy):
+    """
+    Sends the values which differ from the last sent one by more than a fraction of it.
+    """
+
+    def __init__(self, deadband):
+        """
+
+        :param deadband: the largest difference, relative to the last sent value, that is not sent
+        """
+        self._deadband = deadband
+
+    def must_publish(self, last, value):
+        if is_array(value) or is_array(last):
+            if numpy.shape(last) != numpy.shape(value):
+                return True
+            return bool(numpy.any(numpy.abs(numpy.subtract(value, last)) > self._deadband * numpy.abs(last)))
+        return abs(float(value) - float(last)) > self._deadband * abs(float(last))
@@ -0,0 +1,169 @@
+import re
+
+from obnl.impl.arrays import numpy, require_numpy
+from obnl.impl.node import ClientNode, _attribute_targets
+
+_SELECTION = re.compile(r'^(?P<attr>[^\[\]]+)\[\s*(?P<start>-?\d*)\s*(?:(?P<colon>:)\s*(?P<stop>-?\d*)\s*'
+                        r'(?::\s*(?P<step>-?\d*)\s*)?)?\]$')
+
+
+def parse_selection(selection):
+    """
+    Reads an attribute of a population Node: the whole attribute ('T'), one entity ('T[3]')
+    or a slice of entities ('T[0:100]', 'T[::2]', Python slices).
+
+    :param selection: the attribute as written in the links
+    :return: the attribute name and the index (an int, a slice or None for the whole attribute)
+    """
+    if not selection.endswith(']'):
+        return selection, None
+    match = _SELECTION.match(selection)
+    if match is None or (not match.group('colon') and not match.group('start')):
+        raise ValueError('Invalid attribute selection (attr[i] or attr[start:stop:step] expected): ' + selection)
+
+    def bound(name):
+        value = match.group(name)
+        return int(value) if value else None
+    if not match.group('colon'):
+        return match.group('attr'), int(match.group('start'))
+    if match.group('step') == '0':
+        raise ValueError('Invalid attribute selection (null step): ' + selection)
+    return match.group('attr'), slice(bound('start'), bound('stop'), bound('step'))
+
+
+def _check_index(selection, index, size):
+    """
+    Checks that a selection addresses entities of the population.
+    """
+    if isinstance(index, slice):
+        if len(range(*index.indices(size))) == 0:
+            raise ValueError('The selection %s has no entity (population of %d)' % (selection, size))
+    elif index is not None and not -size <= index < size:
+        raise ValueError('The selection %s is out of the population of %d' % (selection, size))
+
+
+class PopulationNode(ClientNode):
+    """
+    A ClientNode holding a population of entities of the same model: each attribute is a
+    NumPy array with one value per entity, and the whole population steps at once (one
+    participant of the barriers of the Scheduler).
+
+    The links of the config can address an entity ('T[3]') or a slice of entities ('T[0:100]')
+    of the population, on both sides:
+    - an input selection gets the received value (a float is given to each selected entity, an
+      array has one value per selected entity), the other entities keep their value,
+    - an output selection is sent with the whole attribute: the value of the entity as a float,
+      the values of the slice as an array.
+    The Scheduler gives the linked output selections in the SchedulerConnection; a selection is
+    waited for like an input attribute of a ClientNode.
+
+    The input arrays are copied when first written after a step, so the arrays given to a step
+    are not modified afterwards (see obnl.impl.replay).
+    """
+
+    def __init__(self, host, name, api, size, input_attributes=None, output_attributes=None, is_first=False,
+                 transport=None, batch=False, local_queue=False, publish_policies=None, defaults=None):
+        """
+
+        :param size: the number of entities
+        :param defaults: a map of input attributes to their value (a float or an array of size values)
+                         until received, NaN by default
+        """
+        require_numpy('The population Nodes')
+        super(PopulationNode, self).__init__(host, name, api, input_attributes, output_attributes, is_first,
+                                             transport, batch, local_queue, publish_policies)
+        self._size = size
+        defaults = defaults or {}
+        for attr in input_attributes or ():
+            self._input_values[attr] = numpy.full(size, defaults.get(attr, numpy.nan), dtype=float)
+        # the inputs are the linked selections (given in the SchedulerConnection)
+        self._required_inputs = frozenset()
+        self._missing_inputs = set()
+        # input selection -> (input attribute, index)
+        self._scatter = {}
+        # output attribute -> [(selection, index)]
+        self._gather = {}
+        # the input arrays copied since the last step
+        self._copied = set()
+
+    @property
+    def size(self):
+        """
+
+        :return: the number of entities
+        """
+        return self._size
+
+    def _on_scheduler_connection(self, sender, sc, props):
+        inputs = frozenset(self._input_attributes or ())
+        scatter = {}
+        for selection in {attr for targets in _attribute_targets(sc).values() for attr in targets}:
+            attr, index = parse_selection(selection)
+            if attr not in inputs:
+                raise ValueError('Unknown input %s of the population %s' % (selection, self._name))
+            _check_index(selection, index, self._size)
+            scatter[selection] = (attr, index)
+        self._scatter = scatter
+        self._required_inputs = frozenset(scatter)
+        self._missing_inputs = set(scatter)
+        super(PopulationNode, self)._on_scheduler_connection(sender, sc, props)
+
+    def _select_outputs(self, selections):
+        outputs = frozenset(self._output_attributes or ())
+        gather = {}
+        for selection in selections:
+            attr, index = parse_selection(selection)
+            if attr not in outputs:
+                raise ValueError('Unknown output %s of the population %s' % (selection, self._name))
+            _check_index(selection, index, self._size)
+            gather.setdefault(attr, []).append((selection, index))
+        self._gather = gather
+
+    def restore(self, snapshot):
+        super(PopulationNode, self).restore(snapshot)
+        # the received selections are not missing anymore
+        links = self._links
+        for name in self._received_times:
+            self._missing_inputs.difference_update(links.get(name, ()))
+
+    def _set_inputs(self, values):
+        scatter = self._scatter
+        for selection, value in values.items():
+            attr, index = scatter.get(selection) or (selection, None)
+            array = self._input_values.get(attr)
+            if array is None:
+                # not an input attribute (e.g. replayed inputs)
+                self._input_values[attr] = value
+                continue
+            if attr not in self._copied:
+                array = self._input_values[attr] = array.copy()
+                self._copied.add(attr)
+            try:
+                if index is None:
+                    array[...] = value
+                else:
+                    array[index] = value
+            except ValueError as e:
+                raise ValueError('The value of %s does not fit the population %s: %s' % (selection, self._name, e))
+        self._missing_inputs.difference_update(values)
+
+    def step(self, current_time, time_step):
+        self._copied.clear()
+        super(PopulationNode, self).step(current_time, time_step)
+
+    def update_attribute(self, attr, value):
+        """
+        Sends the new values of an output attribute, and of its linked selections.
+
+        :param attr: the attribute to communicate
+        :param value: the values of the entities (an array of size values, a float for all the entities)
+        """
+        value = numpy.asarray(value)
+        if value.ndim == 0:
+            value = numpy.full(self._size, value, dtype=value.dtype if value.dtype.kind == 'f' else float)
+        elif value.shape[0] != self._size:
+            raise ValueError('%s of the population %s has %d values instead of %d'
+                             % (attr, self._name, value.shape[0], self._size))
+        super(PopulationNode, self).update_attribute(attr, value)
+        for selection, index in self._gather.get(attr, ()):
+            super(PopulationNode, self).update_attribute(selection, value[index])
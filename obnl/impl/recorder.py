@@ -0,0 +1,300 @@
+import os
+import json
+import time
+
+from obnl.impl.arrays import numpy, is_array, require_numpy
+from obnl.impl.node import Node, _attribute_value
+from obnl.impl.envelope import decode
+from obnl.impl.message import AttributeMessage, AttributeBatch, SimulatorConnection, SchedulerConnection, Quit
+
+
+class _Column(object):
+    """
+    The time and value columns of one attribute: two files memory-mapped as NumPy
+    arrays, grown by doubling their capacity.
+    """
+
+    def __init__(self, directory, entry, writable):
+        self._directory = directory
+        self.entry = entry
+        self._writable = writable
+        self._times = None
+        self._values = None
+        self._map(entry['capacity'] if writable else entry['length'])
+
+    @property
+    def length(self):
+        return self.entry['length']
+
+    def _paths(self):
+        base = os.path.join(self._directory, self.entry['file'])
+        return base + '.time', base + '.value'
+
+    def _map(self, capacity):
+        time_path, value_path = self._paths()
+        shape = tuple(self.entry['shape'])
+        dtype = numpy.dtype(self.entry['dtype'])
+        if not self._writable:
+            # a memmap cannot be empty
+            self._times = numpy.memmap(time_path, dtype='<f8', mode='r', shape=(capacity,)) \
+                if capacity else numpy.empty(0, dtype='<f8')
+            self._values = numpy.memmap(value_path, dtype=dtype, mode='r', shape=(capacity,) + shape) \
+                if capacity else numpy.empty((0,) + shape, dtype=dtype)
+            return
+        row = dtype.itemsize * int(numpy.prod(shape))
+        for path, size in ((time_path, 8), (value_path, row)):
+            with open(path, 'ab') as f:
+                f.truncate(capacity * size)
+        self._times = numpy.memmap(time_path, dtype='<f8', mode='r+', shape=(capacity,))
+        self._values = numpy.memmap(value_path, dtype=dtype, mode='r+', shape=(capacity,) + shape)
+        self.entry['capacity'] = capacity
+
+    def append(self, simulation_time, value):
+        n = self.entry['length']
+        if n and simulation_time <= self.entry['end']:
+            if simulation_time < self.entry['end']:
+                return False
+            # a value sent again at the same time replaces the previous one
+            self._values[n - 1] = value
+            return True
+        if n == self.entry['capacity']:
+            self.flush()
+            self._map(2 * n)
+        self._times[n] = simulation_time
+        self._values[n] = value
+        self.entry['length'] = n + 1
+        if not n:
+            self.entry['start'] = simulation_time
+        self.entry['end'] = simulation_time
+        return True
+
+    def flush(self):
+        if self._writable:
+            self._times.flush()
+            self._values.flush()
+
+    def read(self, start=None, end=None):
+        times = self._times[:self.entry['length']]
+        values = self._values[:self.entry['length']]
+        first = 0 if start is None else int(numpy.searchsorted(times, start, 'left'))
+        last = len(times) if end is None else int(numpy.searchsorted(times, end, 'left'))
+        return times[first:last], values[first:last]
+
+
+class ColumnStore(object):
+    """
+    A columnar store of attribute values on disk.
+
+    Each attribute ('node.attr') has a time column (float64) and a value column
+    (float64, or the dtype and shape of its array values), memory-mapped and appended
+    to without keeping the values in memory. The index file gives the file, type,
+    length and time range of each column; it is rewritten (atomically) by flush,
+    so a reader sees the values up to the last flush.
+
+    The values of an attribute are kept in simulation time order, so a time range
+    is found by binary search in the time column: a value older than the last one of
+    its column is dropped (e.g. the last values sent again by the Nodes of a resumed
+    simulation), a value at the same time replaces it.
+    """
+
+    INDEX = 'index.json'
+    """Name of the index file in the directory"""
+    VERSION = 1
+    """Version of the index format"""
+    INITIAL_CAPACITY = 4096
+    """Number of rows of a new column"""
+
+    def __init__(self, directory, writable=False):
+        """
+
+        :param directory: the directory of the store (created if writable)
+        :param writable: if True, values can be appended (after the existing ones)
+        """
+        require_numpy('The ColumnStore')
+        self._directory = directory
+        self._writable = writable
+        if writable:
+            os.makedirs(directory, exist_ok=True)
+
+        entries = {}
+        index_path = os.path.join(directory, ColumnStore.INDEX)
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                index = json.load(f)
+            if index.get('version') != ColumnStore.VERSION:
+                raise ValueError('Unsupported store version: ' + str(index.get('version')))
+            entries = index['columns']
+        elif not writable:
+            raise ValueError('No column store in ' + directory)
+        self._columns = {key: _Column(directory, entry, writable) for key, entry in entries.items()}
+
+    @property
+    def directory(self):
+        """
+
+        :return: the directory of the store
+        """
+        return self._directory
+
+    @property
+    def columns(self):
+        """
+
+        :return: the recorded attributes ('node.attr')
+        """
+        return sorted(self._columns)
+
+    def info(self, key):
+        """
+
+        :param key: a recorded attribute ('node.attr')
+        :return: a dict of the length, the time range (start and end), the dtype and the shape of the values
+        """
+        entry = self._columns[key].entry
+        return {name: entry.get(name) for name in ('length', 'start', 'end', 'dtype', 'shape')}
+
+    def append(self, key, simulation_time, value):
+        """
+        Appends a value to a column (created at its first value).
+
+        :param key: the attribute ('node.attr')
+        :param simulation_time: the simulation time of the value
+        :param value: a float or a NumPy array (all the values of a column have the same dtype and shape)
+        :return: False if the value was dropped (older than the last one of the column)
+        """
+        column = self._columns.get(key)
+        if column is None:
+            column = self._create(key, value)
+        return column.append(simulation_time, value)
+
+    def _create(self, key, value):
+        if is_array(value):
+            dtype, shape = value.dtype.newbyteorder('<').str, list(value.shape)
+        else:
+            dtype, shape = '<f8', []
+        entry = {'file': 'c%d' % len(self._columns), 'dtype': dtype, 'shape': shape, 'length': 0,
+                 'capacity': ColumnStore.INITIAL_CAPACITY, 'start': None, 'end': None}
+        column = self._columns[key] = _Column(self._directory, entry, True)
+        return column
+
+    def flush(self):
+        """
+        Writes the columns and the index to disk.
+        """
+        if not self._writable:
+            return
+        for column in self._columns.values():
+            column.flush()
+        index_path = os.path.join(self._directory, ColumnStore.INDEX)
+        temporary = index_path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'version': ColumnStore.VERSION,
+                       'columns': {key: column.entry for key, column in self._columns.items()}}, f)
+        os.replace(temporary, index_path)
+
+    def read(self, key, start=None, end=None):
+        """
+        Reads the values of an attribute in a simulation time range.
+
+        :param key: the attribute ('node.attr')
+        :param start: the first simulation time (included), from the first value if None
+        :param end: the last simulation time (excluded), to the last value if None
+        :return: the times and the values (NumPy arrays mapped on the files)
+        """
+        return self._columns[key].read(start, end)
+
+
+class RecorderNode(Node):
+    """
+    A Node recording attribute updates in a ColumnStore.
+
+    The Scheduler binds the data exchanges of the recorded Nodes to the data queue
+    of the recorder (see the recorders of the Scheduler): it does not take part in the
+    steps. It connects to the Scheduler like the other Nodes, which gives it the
+    recorded attributes (and their IDs in compact mode), and ends with the simulation.
+    """
+
+    def __init__(self, host, name, directory, transport=None, flush_interval=1.):
+        """
+
+        :param host: the AMQP host
+        :param name: the name of the recorder (given to the Scheduler)
+        :param directory: the directory of the ColumnStore (the values are appended to an existing store)
+        :param transport: the Transport to use (an AMQPTransport to host if None)
+        :param flush_interval: the time (in seconds) between two writes of the index
+        """
+        self._store = ColumnStore(directory, writable=True)
+        super(RecorderNode, self).__init__(host, name, transport)
+
+        self._flush_interval = flush_interval
+        self._last_flush = time.time()
+        # the recorded attributes (by sender) and the attribute names by ID (compact mode)
+        self._recorded = {}
+        self._attribute_names = {}
+
+        self._data_queue = Node.DATA_NODE_QUEUE + self._name
+        self._transport.consume(self._data_queue,
+                                self.on_data_message,
+                                consumer_tag='obnl_node_' + self._name + '_data')
+
+        si = SimulatorConnection()
+        si.type = SimulatorConnection.RECORDER
+        self.send_simulation(Node.SIMULATION_NODE_EXCHANGE + Node.SCHEDULER_NAME,
+                             si, reply_to=Node.SIMULATION_NODE_QUEUE + self.name)
+
+    def _plan_topology(self, topology):
+        super(RecorderNode, self)._plan_topology(topology)
+        topology.add_queue(Node.DATA_NODE_QUEUE + self._name)
+
+    @property
+    def store(self):
+        """
+
+        :return: the ColumnStore written by the recorder
+        """
+        return self._store
+
+    def on_local_message(self, ch, method, props, body):
+        pass
+
+    def on_simulation_message(self, ch, method, props, body):
+        self._received_message(body)
+        sender, message = decode(body, self._sender_names)
+        if isinstance(message, SchedulerConnection):
+            self._on_scheduler_connection(message)
+        elif isinstance(message, Quit):
+            self._quit()
+
+    def _on_scheduler_connection(self, sc):
+        # the keys of the links are the recorded attributes ('node.attr')
+        for key in sc.attribute_links:
+            node, _, attr = key.partition('.')
+            self._recorded.setdefault(node, set()).add(attr)
+        self._attribute_names = {attribute_id: attr for attr, attribute_id in sc.attribute_ids.items()}
+        self._sender_names.update(sc.node_names)
+        self._node_id = sc.node_id
+
+    def on_data_message(self, ch, method, props, body):
+        self._received_message(body)
+        sender, message = decode(body, self._sender_names)
+        recorded = self._recorded.get(sender, ())
+        names = self._attribute_names
+        if isinstance(message, AttributeMessage):
+            attr = message.attribute_name or names.get(message.attribute_id)
+            if attr in recorded:
+                self._store.append(sender + '.' + attr, message.simulation_time, _attribute_value(message))
+        elif isinstance(message, AttributeBatch):
+            # a batch holds every attribute of the sender, only the recorded ones are kept
+            for am in message.attributes:
+                attr = am.attribute_name or names.get(am.attribute_id)
+                if attr in recorded:
+                    self._store.append(sender + '.' + attr, message.simulation_time, _attribute_value(am))
+
+        now = time.time()
+        if now - self._last_flush >= self._flush_interval:
+            self._store.flush()
+            self._last_flush = now
+
+    def _quit(self):
+        self._store.flush()
+        super(RecorderNode, self)._quit()
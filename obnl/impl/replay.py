@@ -0,0 +1,253 @@
+import math
+import time
+import pickle
+import asyncio
+import inspect
+
+from obnl.impl.arrays import numpy, is_array, copy_value
+
+
+FORMAT = 'obnl-recording'
+"""First item of the header of the recordings"""
+VERSION = 1
+"""Version of the format of the recordings"""
+
+
+class StepRecording(object):
+    """
+    Records the steps of a ClientNode in a file: for each step, its time, its time
+    step, the inputs received since the previous step and the values it sent.
+
+    The steps are appended to the file (pickled one by one) as they are done, so a
+    long run is not kept in memory, and can be replayed with Replay.
+    """
+
+    def __init__(self, path):
+        """
+
+        :param path: the file of the recording (overwritten)
+        """
+        self._path = path
+        self._file = None
+        self._last_inputs = {}
+        self._step = None
+
+    @property
+    def path(self):
+        """
+
+        :return: the file of the recording
+        """
+        return self._path
+
+    def begin_step(self, node, current_time, time_step, input_values):
+        """
+        Called by the Node before its step.
+
+        :param node: the Node
+        :param current_time: the time of the step
+        :param time_step: the time step
+        :param input_values: the current input values of the Node
+        """
+        if self._file is None:
+            self._file = open(self._path, 'wb')
+            pickle.dump((FORMAT, VERSION, node.name, list(node.input_attributes or ()),
+                         list(node.output_attributes or ())), self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        # the received values are new objects: the identity tells which ones were received
+        last = self._last_inputs
+        changed = {attr: value for attr, value in input_values.items() if last.get(attr) is not value}
+        last.update(changed)
+        self._step = (current_time, time_step, changed, [])
+
+    def output(self, attr, value):
+        """
+        Called by the Node when it sends a value during its step.
+
+        :param attr: the output attribute
+        :param value: the sent value
+        """
+        if self._step is not None:
+            self._step[3].append((attr, copy_value(value)))
+
+    def end_step(self):
+        """
+        Called by the Node after its step: writes the step.
+        """
+        if self._step is None:
+            return
+        pickle.dump(self._step, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.flush()
+        self._step = None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def load_recording(path):
+    """
+    Reads the header of a recording and iterates over its steps.
+
+    :param path: the file of the recording
+    :return: the header (node name, inputs, outputs) and an iterator over the steps
+             (time, time step, received inputs, sent values)
+    """
+    f = open(path, 'rb')
+    header = pickle.load(f)
+    if header[:2] != (FORMAT, VERSION):
+        f.close()
+        raise ValueError('Not a recording (or unsupported version): ' + path)
+
+    def steps():
+        with f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+    return header[2:], steps()
+
+
+class ReplayResult(object):
+    """
+    The result of a Replay: number of steps, time spent in the steps and the differences
+    between the sent values and the recorded ones.
+    """
+
+    def __init__(self):
+        self.steps = 0
+        self.step_time = 0.
+        self.mismatches = []
+        """The differences: (time, description)"""
+
+    @property
+    def ok(self):
+        """
+
+        :return: True if the Node sent the recorded values
+        """
+        return not self.mismatches
+
+    def __str__(self):
+        lines = ['%d steps replayed in %.3fs (%.3fms per step), %d mismatches'
+                 % (self.steps, self.step_time, self.step_time / self.steps * 1e3 if self.steps else 0.,
+                    len(self.mismatches))]
+        lines.extend('  t=%s: %s' % mismatch for mismatch in self.mismatches[:20])
+        if len(self.mismatches) > 20:
+            lines.append('  ...')
+        return '\n'.join(lines)
+
+
+class _Collector(object):
+    """
+    Stands for a StepRecording during a replay to collect the sent values.
+    """
+
+    def __init__(self):
+        self.values = []
+
+    def begin_step(self, node, current_time, time_step, input_values):
+        pass
+
+    def output(self, attr, value):
+        self.values.append((attr, value))
+
+    def end_step(self):
+        pass
+
+
+class Replay(object):
+    """
+    Drives a ClientNode with a recording: each recorded step is called directly with the
+    recorded inputs, without broker nor scheduler, and the sent values are compared with
+    the recorded ones.
+
+    The Node needs a Transport that does not go anywhere, e.g. a LocalTransport on a new
+    LocalBroker where the data exchange of the Node is declared. The steps of an AsyncClientNode
+    are run on the loop of its transport (or a new loop), which must not be running.
+    """
+
+    def __init__(self, path, rtol=1e-9, atol=0.):
+        """
+
+        :param path: the file of the recording
+        :param rtol: the relative tolerance of the comparison of the values
+        :param atol: the absolute tolerance of the comparison of the values
+        """
+        self._path = path
+        self._rtol = rtol
+        self._atol = atol
+        (self._name, self._inputs, self._outputs), _ = load_recording(path)
+
+    @property
+    def name(self):
+        """
+
+        :return: the name of the recorded Node
+        """
+        return self._name
+
+    @property
+    def input_attributes(self):
+        return self._inputs
+
+    @property
+    def output_attributes(self):
+        return self._outputs
+
+    def run(self, node, check=True):
+        """
+        Replays the recording.
+
+        :param node: the ClientNode (or its implementation)
+        :param check: if False, the sent values are not compared
+        :return: a ReplayResult
+        :raise ValueError: if the Node is async and the loop of its transport is running
+        """
+        node = getattr(node, '_node_impl', node)
+        loop, own_loop = None, False
+        if inspect.iscoroutinefunction(node.step):
+            loop = getattr(node.transport, 'loop', None)
+            if loop is None:
+                loop, own_loop = asyncio.new_event_loop(), True
+            elif loop.is_running():
+                raise ValueError('The steps of %s cannot be awaited: the loop of its transport is running'
+                                 % node.name)
+        collector = _Collector()
+        recording = node.recording
+        node.recording = collector
+        result = ReplayResult()
+        try:
+            _, steps = load_recording(self._path)
+            for current_time, time_step, inputs, expected in steps:
+                node.set_step(current_time, time_step, inputs)
+                del collector.values[:]
+                start = time.perf_counter()
+                if loop is not None:
+                    loop.run_until_complete(node.step(current_time, time_step))
+                else:
+                    node.step(current_time, time_step)
+                result.step_time += time.perf_counter() - start
+                result.steps += 1
+                if check:
+                    result.mismatches.extend((current_time, difference)
+                                             for difference in self._compare(expected, collector.values))
+        finally:
+            node.recording = recording
+            if own_loop:
+                loop.close()
+        return result
+
+    def _compare(self, expected, values):
+        if [attr for attr, _ in expected] != [attr for attr, _ in values]:
+            return ['sent %s instead of %s' % ([attr for attr, _ in values], [attr for attr, _ in expected])]
+        return ['%s is %r instead of %r' % (attr, value, recorded)
+                for (attr, recorded), (_, value) in zip(expected, values) if not self._equal(recorded, value)]
+
+    def _equal(self, recorded, value):
+        if is_array(recorded) or is_array(value):
+            recorded, value = numpy.asarray(recorded), numpy.asarray(value)
+            return recorded.shape == value.shape and \
+                bool(numpy.allclose(value, recorded, rtol=self._rtol, atol=self._atol))
+        return math.isclose(float(value), float(recorded), rel_tol=self._rtol, abs_tol=self._atol)
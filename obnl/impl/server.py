@@ -1,24 +1,145 @@
-import sys
 import json
+import time
+import uuid
+import logging
+from itertools import accumulate
 
 from obnl.impl.node import Node
+from obnl.impl.graph import DependencyGraph
 from obnl.impl.loaders import JSONLoader
-from obnl.impl.message import SimulatorConnection, NextStep, MetaMessage, SchedulerConnection, Quit
+from obnl.impl.cache import CompiledTopology, TopologyCache
+from obnl.impl.checkpoint import CheckpointStore
+from obnl.impl.topology import Topology
+from obnl.impl.envelope import decode
+from obnl.impl.tracing import BARRIER, DISPATCH, message_time
+from obnl.impl.message import SimulatorConnection, NextStep, SchedulerConnection, Quit
+
+
+logger = logging.getLogger(__name__)
+
+
+def load_schedule(schedule_file):
+    """
+    Reads a schedule file.
+
+    :param schedule_file: the file containing the schedule
+    :return: the steps and the blocks (None if the blocks are computed from the links)
+    """
+    # Currently only JSON can be loaded
+    with open(schedule_file) as jsonfile:
+        schedule_data = json.loads(jsonfile.read())
+    blocks = schedule_data.get('schedule', Scheduler.AUTO_SCHEDULE)
+    return schedule_data['steps'], None if blocks == Scheduler.AUTO_SCHEDULE else blocks
+
+
+def load_periods(schedule_file, blocks):
+    """
+    Reads the step periods of a schedule file.
+
+    A period (and an optional offset, 0 by default) is given in simulation time,
+    per Node ("periods" and "offsets" maps) or per block ("block_periods" and
+    "block_offsets" lists, null for the blocks stepping at each step). The Node
+    entries override the block ones.
+
+    :param schedule_file: the file containing the schedule
+    :param blocks: the blocks of the simulation
+    :return: a map of node names to (period, offset), for the Nodes having a period
+    """
+    with open(schedule_file) as jsonfile:
+        schedule_data = json.loads(jsonfile.read())
+
+    periods = {}
+    block_periods = schedule_data.get('block_periods', [])
+    block_offsets = schedule_data.get('block_offsets', [])
+    for i, block in enumerate(blocks):
+        if i < len(block_periods) and block_periods[i] is not None:
+            offset = block_offsets[i] if i < len(block_offsets) and block_offsets[i] is not None else 0
+            for node in block:
+                periods[node] = (block_periods[i], offset)
+
+    offsets = schedule_data.get('offsets', {})
+    for node, period in schedule_data.get('periods', {}).items():
+        periods[node] = (period, offsets.get(node, 0))
+    for node, offset in offsets.items():
+        if node in periods:
+            periods[node] = (periods[node][0], offset)
+
+    for node, (period, offset) in periods.items():
+        if period <= 0 or offset < 0:
+            raise ValueError('Invalid period %s (offset %s) of Node %s' % (period, offset, node))
+    return periods
+
+
+def analyze(config_file, schedule_file):
+    """
+    Analyzes the dependency graph of a simulation without starting it.
+
+    :param config_file: the file containing the structure
+    :param schedule_file: the file containing the schedule
+    :return: a human readable report
+    """
+    loader = JSONLoader(None, config_file)
+    _, blocks = load_schedule(schedule_file)
+    graph = DependencyGraph(loader.get_nodes(), loader.get_links())
+    report = graph.report(blocks)
+    periods = load_periods(schedule_file, blocks if blocks is not None else graph.blocks())
+    for node, (period, offset) in sorted(periods.items()):
+        report += '\nperiod: %s every %s from %s' % (node, period, offset)
+    return report
 
 
 class Scheduler(Node):
     """
     The Scheduler is a Node that manage the time flow.
+
+    Every Node steps at each step of the schedule, unless it has a period: it
+    then steps at the first step reaching each of its due times (offset + n * period)
+    and its time step is the time elapsed since its previous step. The inputs
+    coming from a faster Node are sampled (the consumer gets the value of the
+    latest step of the producer), the inputs coming from a slower Node are held
+    (the consumer keeps the last received value until the producer steps again).
+
+    A Node linked to a Node of its block waits for the value sent at the same
+    step (unless it is first), a Node linked to a Node of a later block gets the
+    value of the previous step.
     """
 
-    def __init__(self, host, config_file, schedule_file):
+    AUTO_SCHEDULE = 'auto'
+    """Value of the schedule entry to compute the blocks from the links"""
+
+    def __init__(self, host, config_file, schedule_file, transport=None, lookahead=False, cache_dir=None,
+                 compact=False, recorders=None, checkpoint_dir=None, checkpoint_steps=None,
+                 checkpoint_interval=None, resume=False, shared_memory=None, peer_to_peer=None):
         """
         
         :param host: the AMQP host 
         :param config_file: a file containing time steps
-        :param schedule_file: a file containing schedule blocks
+        :param schedule_file: a file containing schedule blocks ('auto' or no blocks to compute them
+                              from the links)
+        :param transport: the Transport to use (an AMQPTransport to host if None)
+        :param lookahead: if True, each Node gets its next step as soon as the Nodes it depends on are done
+                          instead of waiting for the whole block (same results, no global barrier)
+        :param cache_dir: a directory where the loaded simulation is kept, to start again
+                          without loading the files while they are unchanged (no cache if None)
+        :param compact: if True, the messages use the compact envelope: an ID for each Node and
+                        attribute is given in the SchedulerConnection instead of their names
+        :param recorders: a map of recorder names (see obnl.impl.recorder) to the recorded outputs:
+                          a list of Node names (all their outputs) or 'node.attr', all the outputs if None.
+                          The simulation starts when the recorders are connected too
+        :param checkpoint_dir: a directory where the state of the simulation (Scheduler and Nodes snapshots,
+                               see ClientNode.save) is written at the end of some steps (no checkpoint if None)
+        :param checkpoint_steps: writes a checkpoint every checkpoint_steps steps
+        :param checkpoint_interval: writes a checkpoint every checkpoint_interval seconds
+        :param resume: if True, the simulation starts after the latest checkpoint of checkpoint_dir
+                       (the Nodes get their snapshot when they connect)
+        :param shared_memory: a list of groups of Nodes running on the same host (lists of names): the data
+                              links between the Nodes of a group go through shared memory instead of the
+                              broker (the Nodes need a SharedMemoryTransport, see obnl.impl.shm)
+        :param peer_to_peer: a list of Nodes (names) sending their data directly to each other instead of
+                             through the broker, True for all the Nodes (the Nodes need a PeerTransport,
+                             see obnl.impl.peer). The links of a shared memory group stay in shared memory
         """
-        super(Scheduler, self).__init__(host, Node.SCHEDULER_NAME)
+        super(Scheduler, self).__init__(host, Node.SCHEDULER_NAME, transport)
         self._current_step = 0
         self._current_block = 0
 
@@ -26,94 +147,622 @@ class Scheduler(Node):
         self._sent = set()
         self._links = {}
 
-        self._channel.exchange_declare(exchange=Node.SIMULATION_NODE_EXCHANGE + self._name)
+        # the links are planned in a Topology, declared at once when loaded
+        self._topology = Topology()
+        self._cache = TopologyCache(cache_dir) if cache_dir is not None else None
 
         self._steps, self._blocks = self._load_data(config_file, schedule_file)
+        self._check_rates()
+        # the indexed outputs (e.g. T[3]) sent by the population Nodes
+        self._output_selections = {}
+        for node_out, attr_out, _, _ in self._graph.links:
+            if attr_out.endswith(']'):
+                self._output_selections.setdefault(node_out, set()).add(attr_out)
+        self._recorders = self._plan_recorders(recorders or {})
+        self._recorders_connected = set()
+        self._data_outputs, self._data_inputs, self._broker_routes, self._peer_links = \
+            self._plan_data_links(shared_memory or [], peer_to_peer)
+        # the data plane is new for each run, so that the rings of another simulation are not reused
+        self._data_plane = uuid.uuid4().hex if self._data_outputs else ''
+        # direct links: the SchedulerConnections are sent when every Node has given its endpoint
+        self._endpoints = {}
+        self._pending_connections = []
+
+        self._setup_time = self._topology.apply(self._transport)
+        logger.info('%d exchanges, %d queues and %d bindings declared in %.3fs',
+                    len(self._topology.exchanges), len(self._topology.queues),
+                    len(self._topology.bindings), self._setup_time)
+
+        # precomputed barrier bookkeeping
+        self._node_count = sum(len(b) for b in self._blocks)
+        self._block_sets = [frozenset(b) for b in self._blocks]
+        self._remaining = len(self._block_sets[0]) if self._block_sets else 0
+        self._due = self._block_sets[0] if self._block_sets else frozenset()
+
+        # the inputs of the Nodes of each block (by sender attribute name)
+        # and the simulation time of their last update
+        self._block_inputs = [frozenset(attr for node in block for attr in self._links.get(node, ()))
+                              for block in self._blocks]
+        self._last_updates = {}
+        # the links inside the blocks: the receiver waits for the value sent at the same step
+        # (receiver -> [(sender, sender attribute)]), so the sender sends it at each of its steps
+        self._inner_links = {}
+        self._awaited_outputs = {}
+        for block in self._block_sets:
+            for node_out, attr_out, node_in, _ in self._graph.links:
+                if node_out != node_in and node_out in block and node_in in block:
+                    self._inner_links.setdefault(node_in, []).append((node_out, attr_out))
+                    self._awaited_outputs.setdefault(node_out, set()).add(attr_out)
 
         self._current_time = 0
+        self._barrier_start = 0.
+
+        self._simulation_handlers = {
+            NextStep: self._on_next_step,
+            SimulatorConnection: self._on_simulator_connection,
+        }
+        self._compact = compact
+        self._node_ids = {}
+        self._attribute_ids = {}
+        self._attribute_names = {}
+        if compact:
+            self._intern()
+
+        self._lookahead = lookahead
+        if lookahead:
+            self._prepare_lookahead()
+
+        # checkpoints: the Nodes send their snapshot with their answer during the steps following
+        # a checkpoint request, the state is written in the background when every Node has sent one
+        self._checkpoints = CheckpointStore(checkpoint_dir) if checkpoint_dir is not None else None
+        self._checkpoint_steps = checkpoint_steps
+        self._checkpoint_interval = checkpoint_interval
+        self._checkpoint_pending = False
+        self._pending_snapshots = set()
+        self._snapshots = {}
+        # resumed simulation: the Nodes not restored yet
+        self._restoring = set()
+        self._last_checkpoint = time.time()
+        self._first_step = 0
+        if self._checkpoints is not None:
+            if lookahead:
+                raise ValueError('The checkpoints require the barrier mode (no lookahead)')
+            # the hashes of the files: a checkpoint is only resumed by the same simulation
+            self._simulation_key = TopologyCache(checkpoint_dir).key(config_file, schedule_file)
+            if resume:
+                self._resume()
 
     def _load_data(self, config_file, schedule_file):
         """
         :param config_file: the file containing the structure
         :param schedule_file: the file containing the schedule 
         """
+        compiled = None
+        if self._cache is not None:
+            compiled = self._cache.load(config_file, schedule_file)
+        if compiled is None:
+            compiled = self._compile(config_file, schedule_file)
+            if self._cache is not None:
+                self._cache.store(config_file, schedule_file, compiled)
+        else:
+            logger.info('Topology loaded from the cache %s', self._cache.directory)
+            self._graph = DependencyGraph(compiled.nodes, compiled.links)
+            self._topology.update(compiled.topology)
+            self._links = compiled.attribute_links
+
+        self._attributes = compiled.attributes
+        self._rates = self._prepare_rates(compiled.steps, compiled.periods)
+        return compiled.steps, compiled.blocks
+
+    def _compile(self, config_file, schedule_file):
+        """
+        Loads the simulation from its files.
 
-        # Currently only JSON can be loaded
-        with open(schedule_file) as jsonfile:
-            schedule_data = json.loads(jsonfile.read())
-            steps = schedule_data['steps']
-            blocks = schedule_data['schedule']
+        :param config_file: the file containing the structure
+        :param schedule_file: the file containing the schedule
+        :return: a CompiledTopology
+        """
+        steps, blocks = load_schedule(schedule_file)
 
         # Currently only JSON can be loaded
-        # Load all the Nodes and creates the associated links
-        loader = JSONLoader(self, config_file)
+        # Load all the Nodes and the links
+        loader = JSONLoader(None, config_file)
+
+        self._graph = DependencyGraph(loader.get_nodes(), loader.get_links())
+        if blocks is None:
+            blocks = self._graph.blocks()
+            path, cost = self._graph.critical_path()
+            logger.info('%d blocks computed from the links, critical path: %s',
+                        len(blocks), ' -> '.join(path))
+            for node_out, node_in in sorted(self._graph.delayed_edges()):
+                logger.info('Delayed link %s -> %s: %s uses the value of the previous step',
+                            node_out, node_in, node_in)
+        else:
+            for issue in self._graph.validate(blocks):
+                logger.warning(issue)
+
+        for link in loader.get_links():
+            self.create_data_link(*link)
         # Connects the created Nodes to the update exchanger
         # using the schedule definition (blocks)
-        # TODO: Should it be in Creator or Scheduler ???
-        for node in loader.get_nodes():
-            i = 0
-            for block in blocks:
-                if node in block:
+        nodes = frozenset(loader.get_nodes())
+        for i, block in enumerate(blocks):
+            for node in block:
+                if node in nodes:
                     self.create_simulation_links(node, i)
-                i += 1
-        return steps, blocks
+
+        # with auto blocks, the block periods apply to the computed blocks
+        return CompiledTopology(loader.get_nodes(), loader.get_attributes(), loader.get_links(),
+                                steps, blocks, load_periods(schedule_file, blocks),
+                                self._links, self._topology)
+
+    @staticmethod
+    def _prepare_rates(steps, periods):
+        """
+        Computes the steps of the Nodes having a period.
+
+        :param steps: the time steps of the schedule
+        :param periods: a map of node names to (period, offset)
+        :return: a map of node names to maps of their step indexes to their time steps
+        """
+        times = list(accumulate(steps))
+        rates = {}
+        for node, (period, offset) in periods.items():
+            due = {}
+            last = 0
+            next_time = offset
+            for i, t in enumerate(times):
+                # tolerance for the sums of float steps
+                eps = 1e-9 * max(1., abs(t))
+                if t + eps >= next_time:
+                    due[i] = t - last
+                    last = t
+                    while next_time <= t + eps:
+                        next_time += period
+            rates[node] = due
+        return rates
+
+    def _check_rates(self):
+        """
+        Checks that every linked input has a value at the first step of its Node: the value of
+        a Node having a period is only sent from its first due step, a Node stepping before
+        would wait for it forever.
+        """
+        if not self._rates:
+            return
+        position = {node: i for i, block in enumerate(self._blocks) for node in block}
+        first = {node: min(rate) if rate else None for node, rate in self._rates.items()}
+        for node_out, attr_out, node_in, attr_in in self._graph.links:
+            if node_out == node_in or node_out not in position or node_in not in position:
+                continue
+            if node_out not in first and node_in not in first:
+                continue
+            sent = first.get(node_out, 0)
+            needed = first.get(node_in, 0)
+            if needed is None:
+                continue
+            # a Node of an earlier block gets the value at the next step, like without periods
+            # (at the first step of the simulation, it has to be first)
+            if sent is None or sent > needed or (sent == needed and position[node_out] > position[node_in]
+                                                 and needed > 0):
+                times = list(accumulate(self._steps))
+                raise ValueError('Link %s.%s -> %s.%s: %s has no value at its first step (time %s), '
+                                 '%s first steps %s'
+                                 % (node_out, attr_out, node_in, attr_in, node_in, times[needed], node_out,
+                                    'never' if sent is None else 'at time %s' % times[sent]))
+
+    def _time_step(self, node, step):
+        """
+
+        :param node: a node name
+        :param step: a step index
+        :return: the time step of the Node at this step, None if it is not due
+        """
+        rate = self._rates.get(node)
+        if rate is None:
+            return self._steps[step]
+        return rate.get(step)
+
+    @property
+    def graph(self):
+        """
+
+        :return: the DependencyGraph of the simulation
+        """
+        return self._graph
+
+    @property
+    def attributes(self):
+        """
+
+        :return: a map of the node names to their (inputs, outputs) in the config
+        """
+        return self._attributes
+
+    @property
+    def topology(self):
+        """
+
+        :return: the broker Topology of the simulation
+        """
+        return self._topology
+
+    @property
+    def setup_time(self):
+        """
+
+        :return: the time spent declaring the topology on the broker (in seconds)
+        """
+        return self._setup_time
 
     def start(self):
         """
         Starts listening.
         """
-        self._current_step = 0
-        self._current_block = 0
+        self._rewind()
         super(Scheduler, self).start()
 
+    def _intern(self):
+        """
+        Gives an ID to each Node and attribute (compact envelope mode).
+        """
+        self._node_id = Node.SCHEDULER_ID
+        # the attributes each Node sends or receives
+        self._node_attributes = {node: set(outputs) for node, (_, outputs) in self._attributes.items()}
+        for node_out, attr_out, node_in, _ in self._graph.links:
+            self._node_attributes.setdefault(node_out, set()).add(attr_out)
+            self._node_attributes.setdefault(node_in, set()).add(attr_out)
+
+        for node, attrs in self._node_attributes.items():
+            self._node_ids[node] = len(self._node_ids) + Node.SCHEDULER_ID + 1
+            for attr in sorted(attrs):
+                if attr not in self._attribute_ids:
+                    self._attribute_ids[attr] = len(self._attribute_ids) + 1
+        self._sender_names.update({node_id: node for node, node_id in self._node_ids.items()})
+        self._attribute_names = {attribute_id: attr for attr, attribute_id in self._attribute_ids.items()}
+
+    def _resume(self):
+        """
+        Restores the state of the latest checkpoint: the simulation starts at the following step.
+        """
+        checkpoint = self._checkpoints.latest()
+        if checkpoint is None:
+            logger.warning('No checkpoint in %s, the simulation starts from the beginning',
+                           self._checkpoints.directory)
+            return
+        step, state = checkpoint
+        if state['key'] != self._simulation_key:
+            raise ValueError('The checkpoint of step %d is not from this simulation (config or schedule changed)'
+                             % step)
+        self._first_step = self._current_step = step + 1
+        self._current_time = state['time']
+        self._last_updates = state['last_updates']
+        self._snapshots = state['snapshots']
+        self._restoring = set(self._snapshots)
+        logger.info('Resumed from the checkpoint of step %d (time %s)', step, self._current_time)
+
+    def _rewind(self):
+        """
+        Goes back to the first step (the one following the checkpoint if resumed) of the first block.
+        """
+        self._current_step = self._first_step
+        self._current_block = 0
+        self._remaining = len(self._block_sets[0]) if self._block_sets else 0
+        self._due = self._block_sets[0] if self._block_sets else frozenset()
+        if self._lookahead:
+            self._prepare_lookahead()
+
+    def _prepare_lookahead(self):
+        """
+        Computes the step dependencies of each Node from the links and the blocks.
+
+        With a link from P to C where P is scheduled before C, C at step s needs P at
+        step s, and P at step s+1 needs C at step s (its new value would replace the
+        one C has to use). When P is scheduled after C, C uses the value of step s-1:
+        C at step s needs P at step s-1 and P at step s needs C at step s. When P is
+        scheduled with C, C waits for the value of step s by itself (as in the barrier
+        mode): each one at step s needs the other at step s-1. Each Node needs its own
+        previous step.
+        """
+        position = {}
+        for i, block in enumerate(self._blocks):
+            for node in block:
+                position.setdefault(node, i)
+
+        # requirements of a node: (other node, 0 for the same step or 1 for the previous one)
+        requires = {node: {(node, 1)} for node in position}
+        for node_out, _, node_in, _ in self._graph.links:
+            if node_out not in position or node_in not in position or node_out == node_in:
+                continue
+            if position[node_out] < position[node_in]:
+                requires[node_in].add((node_out, 0))
+                requires[node_out].add((node_in, 1))
+            elif position[node_out] == position[node_in]:
+                requires[node_in].add((node_out, 1))
+                requires[node_out].add((node_in, 1))
+            else:
+                requires[node_in].add((node_out, 1))
+                requires[node_out].add((node_in, 0))
+
+        self._requires = {node: tuple(r) for node, r in requires.items()}
+        self._dependents = {node: set() for node in position}
+        for node, r in requires.items():
+            for other, _ in r:
+                self._dependents[other].add(node)
+        self._node_inputs = {node: frozenset(self._links.get(node, ())) for node in position}
+        self._times = list(accumulate(self._steps))
+        self._done = {node: 0 for node in position}
+        self._completions = [0] * len(self._steps)
+        self._running = set()
+        self._finished = 0
+
+    def _plan_recorders(self, recorders):
+        """
+        Plans the bindings of the recorded outputs to the data queue of each recorder.
+
+        :param recorders: a map of recorder names to the recorded outputs (see __init__)
+        :return: a map of recorder names to their recorded (node, attr)
+        """
+        planned = {}
+        for recorder, selection in recorders.items():
+            if recorder in self._attributes or recorder == self._name:
+                raise ValueError('The recorder %s has the name of a Node' % recorder)
+            recorded = []
+            for item in (selection if selection is not None else sorted(self._attributes)):
+                node, _, attr = item.partition('.')
+                if node not in self._attributes:
+                    raise ValueError('Unknown recorded node: ' + node)
+                outputs = self._attributes[node][1]
+                if attr and attr not in outputs:
+                    raise ValueError('Unknown recorded output: ' + item)
+                recorded.extend((node, a) for a in ([attr] if attr else outputs))
+
+            queue = Node.DATA_NODE_QUEUE + recorder
+            for node, attr in recorded:
+                self._topology.add_exchange(Node.DATA_NODE_EXCHANGE + node)
+                self._topology.add_binding(Node.DATA_NODE_EXCHANGE + node, queue,
+                                           routing_key=Node.DATA_NODE_EXCHANGE + attr)
+                self._topology.add_binding(Node.DATA_NODE_EXCHANGE + node, queue,
+                                           routing_key=Node.DATA_BATCH_ROUTING)
+            # the recorder only gets its SchedulerConnection and the Quit message
+            self._topology.add_binding(Node.SIMULATION_NODE_EXCHANGE + self._name,
+                                       Node.SIMULATION_NODE_QUEUE + recorder,
+                                       routing_key=Node.UPDATE_NODE_ROUTING + recorder)
+            self._topology.add_binding(Node.SIMULATION_NODE_EXCHANGE + recorder,
+                                       Node.SIMULATION_NODE_QUEUE + self._name,
+                                       routing_key=Node.SIMULATION_NODE_EXCHANGE + self._name)
+            planned[recorder] = recorded
+        return planned
+
+    def _plan_data_links(self, groups, peers):
+        """
+        Moves the data links between the Nodes of a same shared memory group, and between the peer to
+        peer Nodes, out of the broker: their bindings are removed from the topology (after the recorders
+        have been planned).
+
+        :param groups: the groups of Nodes running on the same host (see __init__)
+        :param peers: the Nodes sending their data directly (see __init__)
+        :return: the links by sender (receiver -> attributes), by receiver (senders), the routing keys
+                 of the data of each sender still bound on the broker and the direct links (sender, receiver)
+        """
+        group_of = {}
+        for i, group in enumerate(groups):
+            for node in group:
+                if node not in self._attributes:
+                    raise ValueError('Unknown node in a shared memory group: ' + node)
+                group_of[node] = i
+        if peers is True:
+            peers = set(self._attributes)
+        for node in peers or ():
+            if node not in self._attributes:
+                raise ValueError('Unknown peer to peer node: ' + node)
+        peers = frozenset(peers or ())
+
+        outputs = {}
+        inputs = {}
+        peer_links = set()
+        for node_out, attr_out, node_in, _ in self._graph.links:
+            if node_out == node_in:
+                continue
+            if node_out in group_of and group_of.get(node_in) == group_of[node_out]:
+                pass
+            elif node_out in peers and node_in in peers:
+                peer_links.add((node_out, node_in))
+            else:
+                continue
+            outputs.setdefault(node_out, {}).setdefault(node_in, []).append(attr_out)
+            inputs.setdefault(node_in, set()).add(node_out)
+            self._topology.discard_binding(Node.DATA_NODE_EXCHANGE + node_out, Node.DATA_NODE_QUEUE + node_in,
+                                           routing_key=Node.DATA_NODE_EXCHANGE + attr_out)
+            self._topology.discard_binding(Node.DATA_NODE_EXCHANGE + node_out, Node.DATA_NODE_QUEUE + node_in,
+                                           routing_key=Node.DATA_BATCH_ROUTING)
+
+        exchanges = {Node.DATA_NODE_EXCHANGE + node: node for node in outputs}
+        broker_routes = {node: set() for node in outputs}
+        for exchange, _, routing_key in self._topology.bindings:
+            if exchange in exchanges:
+                broker_routes[exchanges[exchange]].add(routing_key)
+        return outputs, inputs, broker_routes, peer_links
+
     def create_data_link(self, node_out, attr_out, node_in, attr_in):
         """
-        Creates and connects the attribute communication from Node to Node.
+        Plans the attribute communication from Node to Node.
 
         :param node_out: the Node sender name
         :param attr_out: the name of the attribute the Node want to communicate
         :param node_in: the Node receiver name
         :param attr_in: the name of the attribute from the Node receiver point of view
         """
-        self._channel.exchange_declare(exchange=Node.DATA_NODE_EXCHANGE + node_out)
-        self._channel.queue_declare(queue=Node.DATA_NODE_QUEUE + node_in)
-
-        self._channel.queue_bind(exchange=Node.DATA_NODE_EXCHANGE + node_out,
-                                 routing_key=Node.DATA_NODE_EXCHANGE + attr_out,
-                                 queue=Node.DATA_NODE_QUEUE + node_in)
-        if node_in not in self._links:
-            self._links[node_in] = {}
-        self._links[node_in][attr_out] = attr_in
+        self._topology.add_binding(Node.DATA_NODE_EXCHANGE + node_out,
+                                   Node.DATA_NODE_QUEUE + node_in,
+                                   routing_key=Node.DATA_NODE_EXCHANGE + attr_out)
+        # attributes sent in batch (one binding per pair of Nodes)
+        self._topology.add_binding(Node.DATA_NODE_EXCHANGE + node_out,
+                                   Node.DATA_NODE_QUEUE + node_in,
+                                   routing_key=Node.DATA_BATCH_ROUTING)
+        # an attribute can be linked to several inputs of the same Node
+        targets = self._links.setdefault(node_in, {}).setdefault(attr_out, [])
+        if attr_in not in targets:
+            targets.append(attr_in)
 
     def create_simulation_links(self, node, position):
         """
-        Connects the scheduler exchange to the update queue of the Node
+        Plans the connection of the scheduler exchange to the update queue of the Node
 
         :param node: the node to be connected to
         :param position: the position of the containing block
         """
-        self._channel.exchange_declare(exchange=Node.SIMULATION_NODE_EXCHANGE + self._name)
-        self._channel.queue_declare(queue=Node.SIMULATION_NODE_QUEUE + node)
-        self._channel.queue_bind(exchange=Node.SIMULATION_NODE_EXCHANGE + self._name,
-                                 routing_key=Node.UPDATE_ROUTING + str(position),
-                                 queue=Node.SIMULATION_NODE_QUEUE + node)
+        self._topology.add_binding(Node.SIMULATION_NODE_EXCHANGE + self._name,
+                                   Node.SIMULATION_NODE_QUEUE + node,
+                                   routing_key=Node.UPDATE_ROUTING + str(position))
+        self._topology.add_binding(Node.SIMULATION_NODE_EXCHANGE + self._name,
+                                   Node.SIMULATION_NODE_QUEUE + node,
+                                   routing_key=Node.UPDATE_NODE_ROUTING + node)
 
-        self._channel.exchange_declare(exchange=Node.SIMULATION_NODE_EXCHANGE + node)
-        self._channel.queue_declare(queue=Node.SIMULATION_NODE_QUEUE + self._name)
-        self._channel.queue_bind(exchange=Node.SIMULATION_NODE_EXCHANGE + node,
-                                 routing_key=Node.SIMULATION_NODE_EXCHANGE + self._name,
-                                 queue=Node.SIMULATION_NODE_QUEUE + self._name)
+        self._topology.add_binding(Node.SIMULATION_NODE_EXCHANGE + node,
+                                   Node.SIMULATION_NODE_QUEUE + self._name,
+                                   routing_key=Node.SIMULATION_NODE_EXCHANGE + self._name)
 
     def _update_time(self):
         """
-        Sends new time message to the current block. 
+        Sends new time message to the Nodes of the current block due at the current step.
+
+        :return: the number of Nodes the message was sent to
+        """
+        block = self._block_sets[self._current_block]
+        step = self._current_step
+        self._sent.clear()
+        if self._tracer is not None or self._metrics is not None:
+            self._barrier_start = time.time()
+
+        rated = [node for node in block if node in self._rates] if self._rates else ()
+        if not rated:
+            self._due = block
+            self._remaining = len(block)
+
+            ns = NextStep()
+            ns.time_step = self._steps[step]
+            ns.current_time = self._current_time
+            ns.checkpoint = self._checkpoint_pending
+            self._fill_updates(ns, self._block_inputs[self._current_block])
+            for node in block:
+                self._expect_updates(ns, self._inner_links.get(node, ()), block, self._current_time)
+
+            self.send_simulation(Node.UPDATE_ROUTING + str(self._current_block),
+                                 ns, reply_to=Node.SIMULATION_NODE_QUEUE + self.name)
+            return len(block)
+
+        # some Nodes of the block have a period: one message per due Node
+        due = {}
+        for node in block:
+            time_step = self._time_step(node, step)
+            if time_step is not None:
+                due[node] = time_step
+        self._due = frozenset(due)
+        self._remaining = len(due)
+
+        for node, time_step in due.items():
+            ns = NextStep()
+            ns.time_step = time_step
+            ns.current_time = self._current_time
+            ns.checkpoint = self._checkpoint_pending
+            self._fill_updates(ns, self._links.get(node, ()))
+            self._expect_updates(ns, self._inner_links.get(node, ()), due, self._current_time)
+            self.send_simulation(Node.UPDATE_NODE_ROUTING + node,
+                                 ns, reply_to=Node.SIMULATION_NODE_QUEUE + self.name)
+        return len(due)
+
+    def _fill_updates(self, ns, attrs):
         """
-        ns = NextStep()
-        ns.time_step = self._steps[self._current_step]
-        ns.current_time = self._current_time
+        Sets the last updates of some attributes in a NextStep message (by ID in compact mode).
 
-        self.send_simulation(Node.UPDATE_ROUTING + str(self._current_block),
-                             ns, reply_to=Node.SIMULATION_NODE_QUEUE + self.name)
+        :param ns: the NextStep message
+        :param attrs: the attribute names (from the sender point of view)
+        """
+        last_updates = self._last_updates
+        ids = self._attribute_ids
+        if not ids:
+            for attr in attrs:
+                if attr in last_updates:
+                    ns.updates[attr] = last_updates[attr]
+            return
+        for attr in attrs:
+            if attr in last_updates:
+                if attr in ids:
+                    ns.update_ids[ids[attr]] = last_updates[attr]
+                else:
+                    ns.updates[attr] = last_updates[attr]
+
+    def _expect_updates(self, ns, links, due, update_time):
+        """
+        Announces in a NextStep message the attributes sent by the Nodes of the same block
+        during the step: the receiver waits for their value of the step.
+
+        :param ns: the NextStep message
+        :param links: the links of the receiver inside its block [(sender, sender attribute)]
+        :param due: the Nodes of the block due at the step
+        :param update_time: the simulation time of the step
+        """
+        ids = self._attribute_ids
+        for node_out, attr in links:
+            if node_out in due:
+                if attr in ids:
+                    ns.update_ids[ids[attr]] = update_time
+                else:
+                    ns.updates[attr] = update_time
+
+    def _next_block(self):
+        """
+        Moves to the next block having due Nodes, sending them their step, or ends
+        the simulation after the last step.
+        """
+        while True:
+            self._current_block = (self._current_block + 1) % len(self._blocks)
+            if self._current_block == 0:
+                if self._metrics is not None:
+                    self._metrics.step_done(self._current_time)
+                if self._checkpoints is not None:
+                    self._checkpoint()
+                self._current_step += 1
+                if self._current_step >= len(self._steps):
+                    self.broadcast_simulation(Quit())
+                    self._quit()
+                    return
+                else:
+                    self._current_time += self._steps[self._current_step]
+            if self._update_time():
+                return
+
+    def _checkpoint(self):
+        """
+        At the end of a step: writes the pending checkpoint if every Node has sent its snapshot,
+        and requests the snapshots of a new one when it is due.
+        """
+        step = self._current_step
+        if self._checkpoint_pending and not self._pending_snapshots:
+            self._checkpoint_pending = False
+            self._last_checkpoint = time.time()
+            # the snapshots are immutable bytes: shallow copies are enough for the background writer
+            self._checkpoints.save(step, {
+                'key': self._simulation_key,
+                'time': self._current_time,
+                'last_updates': dict(self._last_updates),
+                'snapshots': dict(self._snapshots),
+            })
+
+        # no checkpoint after the last step
+        if self._checkpoint_pending or step + 2 >= len(self._steps):
+            return
+        if (self._checkpoint_steps and (step + 1) % self._checkpoint_steps == 0) \
+                or (self._checkpoint_interval is not None
+                    and time.time() - self._last_checkpoint >= self._checkpoint_interval):
+            self._checkpoint_pending = True
+            self._pending_snapshots = set().union(*self._block_sets)
+
+    def _quit(self):
+        if self._checkpoints is not None:
+            self._checkpoints.close()
+        super(Scheduler, self)._quit()
 
     def on_local_message(self, ch, method, props, body):
         """
@@ -125,41 +774,210 @@ class Scheduler(Node):
         """
         Callback when a message come from Node.
         """
-        m = MetaMessage()
-        m.ParseFromString(body)
+        self._received_message(body)
+        sender, message = decode(body, self._sender_names)
+        handler = self._simulation_handlers.get(type(message))
+        if handler is not None:
+            handler(sender, message, props)
+
+    def _on_next_step(self, node_name, ns, props):
+        last_updates = self._last_updates
+        last_updates.update(ns.updates)
+        if ns.update_ids:
+            names = self._attribute_names
+            for attribute_id, update_time in ns.update_ids.items():
+                last_updates[names[attribute_id]] = update_time
+        if ns.snapshot:
+            self._snapshots[node_name] = ns.snapshot
+            self._pending_snapshots.discard(node_name)
+        if self._restoring:
+            # resumed simulation: the answer of a restored Node, sent after its last values
+            self._restoring.discard(node_name)
+            self._start_simulation()
+            return
+
+        if self._lookahead:
+            self._lookahead_done(node_name)
+            return
+
+        if node_name in self._due and node_name not in self._sent:
+            self._sent.add(node_name)
+            self._remaining -= 1
+
+        if self._remaining == 0 and len(self._connected) == self._node_count:
+            if self._tracer is not None:
+                self._tracer.span(BARRIER, self._name, self._barrier_start, self._tracer.now(),
+                                  message_time(self._current_time),
+                                  {'block': self._current_block, 'nodes': len(self._due)})
+            if self._metrics is not None:
+                self._metrics.barrier(self._current_block).observe(time.time() - self._barrier_start)
+            # block management
+            self._next_block()
 
-        if m.details.Is(SimulatorConnection.DESCRIPTOR):
-            self._simulator_connection(m, props.reply_to)
-            if len(self._connected) == sum([len(b) for b in self._blocks]):
-                self._current_time += self._steps[self._current_step]
-                self._update_time()
+    def _on_simulator_connection(self, node_name, sc, props):
+        if sc.type == SimulatorConnection.RECORDER:
+            self._recorder_connection(node_name, props.reply_to)
+        else:
+            self._simulator_connection(node_name, props.reply_to, sc.data_endpoint)
+        self._start_simulation()
 
-        if m.details.Is(NextStep.DESCRIPTOR):
-            if m.node_name in self._blocks[self._current_block]:
-                self._sent.add(m.node_name)
+    def _start_simulation(self):
+        """
+        Sends the first step when every Node and recorder is connected (and every Node restored
+        in a resumed simulation).
+        """
+        if len(self._connected) == self._node_count and len(self._recorders_connected) == len(self._recorders) \
+                and not self._restoring:
+            if self._lookahead:
+                self._lookahead_dispatch(self._done)
+                return
+            self._current_time += self._steps[self._current_step]
+            if not self._update_time():
+                self._next_block()
+
+    def _lookahead_done(self, node_name):
+        """
+        Records the end of the step of a Node and starts the steps it was blocking (lookahead mode).
+        """
+        if node_name not in self._running:
+            return
+        self._running.discard(node_name)
+        if self._lookahead_advance(node_name):
+            self._lookahead_dispatch(self._dependents[node_name])
 
-        if len(self._connected) == sum([len(b) for b in self._blocks]):
-            # block management
-            if len(self._sent) == len(self._blocks[self._current_block]):
-                self._current_block = (self._current_block + 1) % len(self._blocks)
-                if self._current_block == 0:
-                    self._current_step += 1
-                    if self._current_step >= len(self._steps):
-                        self.broadcast_simulation(Quit())
-                        sys.exit(0)
-                    else:
-                        self._current_time += self._steps[self._current_step]
-                self._update_time()
-                self._sent.clear()
-
-    def _simulator_connection(self, message, reply_to):
-        node_name = message.node_name
-        self._connected.add(node_name)
+    def _lookahead_advance(self, node_name):
+        """
+        Counts a done step of a Node, ending the simulation after the last one (lookahead mode).
 
+        :return: False if the simulation is over
+        """
+        self._done[node_name] += 1
+        if self._metrics is not None:
+            # a step is done when every Node has done it
+            step = self._done[node_name] - 1
+            self._completions[step] += 1
+            if self._completions[step] == len(self._done):
+                self._metrics.step_done(self._times[step])
+        if self._done[node_name] == len(self._steps):
+            self._finished += 1
+            if self._finished == len(self._done):
+                self.broadcast_simulation(Quit())
+                self._quit()
+                return False
+        return True
+
+    def _lookahead_dispatch(self, candidates):
+        """
+        Sends its next step to each candidate Node whose requirements are done (lookahead mode).
+        The steps where a Node is not due are done at once.
+        """
+        done = self._done
+        candidates = list(candidates)
+        while candidates:
+            node = candidates.pop()
+            step = done[node]
+            if node in self._running or step >= len(self._steps):
+                continue
+            if any(done[other] < step + 1 - previous for other, previous in self._requires[node]):
+                continue
+
+            time_step = self._time_step(node, step)
+            if time_step is None:
+                if not self._lookahead_advance(node):
+                    return
+                candidates.append(node)
+                candidates.extend(self._dependents[node])
+                continue
+
+            ns = NextStep()
+            ns.time_step = time_step
+            ns.current_time = self._times[step]
+            self._fill_updates(ns, self._node_inputs[node])
+            inner_links = self._inner_links.get(node)
+            if inner_links:
+                due = frozenset(other for other, _ in inner_links if self._time_step(other, step) is not None)
+                self._expect_updates(ns, inner_links, due, ns.current_time)
+
+            self._running.add(node)
+            self.send_simulation(Node.UPDATE_NODE_ROUTING + node,
+                                 ns, reply_to=Node.SIMULATION_NODE_QUEUE + self.name)
+            if self._tracer is not None:
+                self._tracer.instant(DISPATCH, self._name, ns.current_time, {'to': node})
+
+    def _simulator_connection(self, node_name, reply_to, endpoint=''):
+        self._connected.add(node_name)
+        if self._peer_links:
+            # the senders need the endpoints of their receivers
+            self._endpoints[node_name] = endpoint
+            self._pending_connections.append((node_name, reply_to))
+            if len(self._connected) == self._node_count:
+                for pending in self._pending_connections:
+                    self._send_scheduler_connection(*pending)
+                self._pending_connections = []
+            return
+        self._send_scheduler_connection(node_name, reply_to)
+
+    def _send_scheduler_connection(self, node_name, reply_to):
         sc = SchedulerConnection()
+        if node_name in self._snapshots:
+            sc.snapshot = self._snapshots[node_name]
         if node_name in self._links:
             for k, v in self._links[node_name].items():
-                sc.attribute_links[k] = v
+                sc.attribute_targets[k].attributes.extend(v)
+                # for the Nodes older than attribute_targets, which keep one input per sender attribute
+                sc.attribute_links[k] = v[-1]
+        if self._compact and node_name in self._node_ids:
+            sc.node_id = self._node_ids[node_name]
+            ids = self._attribute_ids
+            for attr in self._node_attributes[node_name]:
+                sc.attribute_ids[attr] = ids[attr]
+        if node_name in self._output_selections:
+            sc.output_selections.extend(sorted(self._output_selections[node_name]))
+        if node_name in self._awaited_outputs:
+            sc.awaited_outputs.extend(sorted(self._awaited_outputs[node_name]))
+        if node_name in self._data_outputs or node_name in self._data_inputs:
+            self._fill_data_links(node_name, sc)
+
+        self.reply_to(reply_to, sc)
+
+    def _fill_data_links(self, node_name, sc):
+        """
+        Gives a Node its data links outside the broker and the routing keys of its data
+        still bound on the broker (the ones it has to publish there).
+        """
+        sc.data_plane = self._data_plane
+        for receiver, attrs in sorted(self._data_outputs.get(node_name, {}).items()):
+            sc.data_outputs.add(node=receiver, attributes=attrs,
+                                endpoint=self._endpoint((node_name, receiver), receiver))
+        for sender in sorted(self._data_inputs.get(node_name, ())):
+            sc.data_inputs.add(node=sender, endpoint=self._endpoint((sender, node_name), node_name))
+        sc.broker_routes.extend(sorted(self._broker_routes.get(node_name, ())))
+
+    def _endpoint(self, link, receiver):
+        """
+
+        :return: the endpoint of the receiver if the link is direct, '' if it is in shared memory
+        """
+        if link not in self._peer_links:
+            return ''
+        if not self._endpoints.get(receiver):
+            raise ValueError('The node %s has no data endpoint for its direct links (it needs a PeerTransport)'
+                             % receiver)
+        return self._endpoints[receiver]
+
+    def _recorder_connection(self, recorder, reply_to):
+        if recorder not in self._recorders:
+            logger.warning('Unknown recorder %s', recorder)
+            return
+        self._recorders_connected.add(recorder)
+
+        sc = SchedulerConnection()
+        for node, attr in self._recorders[recorder]:
+            key = node + '.' + attr
+            sc.attribute_links[key] = key
+            if self._compact:
+                sc.attribute_ids[attr] = self._attribute_ids[attr]
+                sc.node_names[self._node_ids[node]] = node
 
         self.reply_to(reply_to, sc)
 
@@ -174,4 +992,7 @@ class Scheduler(Node):
         for block_id in range(len(self._blocks)):
             self.send_simulation(Node.UPDATE_ROUTING + str(block_id),
                                  message, reply_to=reply_to)
+        for recorder in self._recorders:
+            self.send_simulation(Node.UPDATE_NODE_ROUTING + recorder,
+                                 message, reply_to=reply_to)
 
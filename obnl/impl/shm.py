@@ -0,0 +1,458 @@
+import os
+import time
+import struct
+import select
+import socket
+import hashlib
+import platform
+import tempfile
+import threading
+from multiprocessing import shared_memory, resource_tracker
+
+from obnl.impl.node import Node
+from obnl.impl.transports import WrappingTransport, PublishError, LocalMethod, LocalProperties
+
+_LENGTH = struct.Struct('<I')
+
+# the CPUs keeping the order of the writes of a process for the others (total store order)
+_ORDERED_MACHINES = frozenset(['x86_64', 'amd64', 'i386', 'i686', 'x86'])
+
+
+def _tracker_id():
+    """
+
+    :return: the identifier of the resource tracker of the process (the inode of its pipe,
+             the same for the processes sharing it)
+    """
+    return os.fstat(resource_tracker.getfd()).st_ino
+
+
+class RingBuffer(object):
+    """
+    A single-producer single-consumer ring of messages in a shared memory block.
+
+    The block starts with a header: the identifier of the resource tracker of its creator,
+    the read position of the consumer (total bytes read) and the waiting flag of the consumer,
+    each in its own cache line. The data follows: each message is a record of 16 bytes aligned,
+    made of its sequence number (8 bytes), its length (4 bytes, 4 bytes unused) and its bytes.
+    A record which does not fit before the end of the ring is preceded by a wrap record sending
+    the consumer back to the start.
+
+    The producer writes the length and the bytes, then publishes the record by writing its
+    sequence number; the consumer reads a record once the sequence number at its position is
+    the next one, then gives the room back by writing its read position. Python has no memory
+    fence: the sequence numbers and the positions are aligned 8 byte words written and read at
+    once, and the protocol relies on the CPU showing the writes of a process to the others in
+    their order (x86).
+
+    The creator of the block unlinks it when closed (see close). The resource tracker of each
+    process removes the blocks it registered if the process dies: a block is registered once
+    per tracker (the opener unregisters it if its tracker is not the one of the creator).
+    """
+
+    HEADER = 192
+    """Size of the header of the block"""
+    RECORD = 16
+    """Size of the header of a record, and alignment of the records"""
+
+    _TRACKER = 0
+    _READ = 8
+    _WAITING = 16
+    _WRAP = 0xFFFFFFFF
+
+    def __init__(self, name, size=1 << 20):
+        """
+
+        :param name: the name of the shared memory block (created or opened)
+        :param size: the size of the data part when created
+        """
+        size = -(-size // RingBuffer.RECORD) * RingBuffer.RECORD
+        self._name = name
+        self._memory, self._owner = self._open(name, RingBuffer.HEADER + size)
+        self._buffer = self._memory.buf
+        self._words = self._buffer.cast('Q')
+        self._capacity = (len(self._buffer) - RingBuffer.HEADER) // RingBuffer.RECORD * RingBuffer.RECORD
+        # the sequence number of the next record and the total bytes written (producer) or read (consumer)
+        self._sequence = 1
+        self._position = 0
+
+    def _open(self, name, size):
+        """
+        Creates the shared memory block, or opens it if the other end of the link has created it.
+
+        :return: the SharedMemory and True if it was created
+        """
+        while True:
+            try:
+                memory = shared_memory.SharedMemory(name, create=True, size=size)
+            except FileExistsError:
+                try:
+                    memory = shared_memory.SharedMemory(name)
+                except (FileNotFoundError, ValueError):
+                    # unlinked in the meantime, or not sized yet by its creator
+                    time.sleep(0.001)
+                    continue
+            else:
+                memory.buf.cast('Q')[RingBuffer._TRACKER] = _tracker_id()
+                return memory, True
+            break
+
+        words = memory.buf.cast('Q')
+        try:
+            while not words[RingBuffer._TRACKER]:
+                time.sleep(0.0001)
+            if words[RingBuffer._TRACKER] != _tracker_id():
+                # the block stays registered by the tracker of its creator only
+                resource_tracker.unregister(memory._name, 'shared_memory')
+        finally:
+            words.release()
+        return memory, False
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def capacity(self):
+        """
+
+        :return: the size of the data part (a message takes its size plus 16 bytes, rounded up to 16)
+        """
+        return self._capacity
+
+    @property
+    def waiting(self):
+        """
+
+        :return: True if the consumer sleeps until notified
+        """
+        return bool(self._words[RingBuffer._WAITING])
+
+    @waiting.setter
+    def waiting(self, waiting):
+        self._words[RingBuffer._WAITING] = 1 if waiting else 0
+
+    def ready(self):
+        """
+
+        :return: True if a record can be read (consumer)
+        """
+        return self._words[(RingBuffer.HEADER + self._position % self._capacity) >> 3] == self._sequence
+
+    def put(self, body):
+        """
+        Writes a message (producer).
+
+        :param body: the message (bytes)
+        :return: False if the ring has not enough room for it
+        """
+        length = len(body)
+        size = (length + 2 * RingBuffer.RECORD - 1) & -RingBuffer.RECORD
+        capacity = self._capacity
+        if size > capacity:
+            raise ValueError('Message of %d bytes larger than the ring %s' % (length, self._name))
+        write = self._position
+        start = write % capacity
+        padding = capacity - start if start + size > capacity else 0
+        if write + padding + size - self._words[RingBuffer._READ] > capacity:
+            return False
+
+        words = self._words
+        sequence = self._sequence
+        if padding:
+            _LENGTH.pack_into(self._buffer, RingBuffer.HEADER + start + 8, RingBuffer._WRAP)
+            words[(RingBuffer.HEADER + start) >> 3] = sequence
+            sequence += 1
+            start = 0
+        offset = RingBuffer.HEADER + start
+        _LENGTH.pack_into(self._buffer, offset + 8, length)
+        self._buffer[offset + RingBuffer.RECORD:offset + RingBuffer.RECORD + length] = body
+        # published once written
+        words[offset >> 3] = sequence
+        self._sequence = sequence + 1
+        self._position = write + padding + size
+        return True
+
+    def get(self):
+        """
+        Reads a message (consumer).
+
+        :return: the message (bytes), None if there is none
+        """
+        words = self._words
+        while True:
+            read = self._position
+            offset = RingBuffer.HEADER + read % self._capacity
+            if words[offset >> 3] != self._sequence:
+                return None
+            self._sequence += 1
+            length, = _LENGTH.unpack_from(self._buffer, offset + 8)
+            if length == RingBuffer._WRAP:
+                self._position = read + self._capacity - (offset - RingBuffer.HEADER)
+                words[RingBuffer._READ] = self._position
+                continue
+            body = self._buffer[offset + RingBuffer.RECORD:offset + RingBuffer.RECORD + length].tobytes()
+            # the room is given back once read
+            self._position = read + ((length + 2 * RingBuffer.RECORD - 1) & -RingBuffer.RECORD)
+            words[RingBuffer._READ] = self._position
+            return body
+
+    def close(self):
+        """
+        Closes the block, and removes it if it was created by this end (the other end keeps its mapping).
+        """
+        self._words.release()
+        self._buffer.release()
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+
+def ring_name(data_plane, sender, receiver):
+    """
+
+    :return: the name of the shared memory block of the link from sender to receiver
+    """
+    digest = hashlib.sha1('\0'.join((data_plane, sender, receiver)).encode()).hexdigest()
+    return 'obnl' + digest[:24]
+
+
+def notification_path(data_plane, receiver):
+    """
+
+    :return: the path of the socket waking up the reader of the receiver
+    """
+    digest = hashlib.sha1('\0'.join((data_plane, receiver)).encode()).hexdigest()
+    return os.path.join(tempfile.gettempdir(), 'obnl-%s.sock' % digest[:24])
+
+
+class SharedMemoryTransport(WrappingTransport):
+    """
+    A Transport carrying the data links between Nodes of the same host through shared memory.
+
+    It wraps the Transport used for everything else (the control messages, the topology and
+    the data links going through the broker). The Scheduler gives the links to carry in the
+    SchedulerConnection (see the shared_memory groups of the Scheduler): each link is a
+    RingBuffer written by the sender and read by the receiver. The data published by the Node
+    goes to the rings of its links, and to the wrapped transport only if some receivers are still
+    bound on the broker.
+
+    The rings of the receiver are read from the thread of the wrapped transport: a watcher thread
+    sleeps on a Unix datagram socket the senders write to when it waits (see RingBuffer.waiting),
+    and has the rings drained when a message comes (see Transport.call_threadsafe). After giving
+    messages to the data callback, the drain polls the rings for a while (giving the CPU to the
+    other processes meanwhile) before going back to the loop of the wrapped transport: the next
+    messages are read without being notified. A notification crossing the waiting flag is not
+    missed for longer than POLL_INTERVAL.
+    The rings are removed when the transport stops, or by close if it is not started.
+    """
+
+    RING_SIZE = 1 << 20
+    """Default size (in bytes) of the rings"""
+    SPIN_TIME = 0.0002
+    """Default time (in seconds) the rings are polled after the last message before sleeping"""
+    POLL_INTERVAL = 0.01
+    """Maximum time (in seconds) the watcher sleeps without checking the rings"""
+
+    def __init__(self, transport, ring_size=RING_SIZE, timeout=10., spin_time=SPIN_TIME):
+        """
+
+        :param transport: the Transport of the control messages (and of the other data links)
+        :param ring_size: the size (in bytes) of the rings created by the Node
+        :param timeout: the time (in seconds) a publish waits for room in a full ring before failing
+        :param spin_time: the time (in seconds) the rings are polled after the last message before sleeping
+        """
+        machine = platform.machine().lower()
+        if machine not in _ORDERED_MACHINES:
+            raise ValueError('The shared memory links need a CPU keeping the order of the writes (x86), not '
+                             + machine)
+        super(SharedMemoryTransport, self).__init__(transport)
+        self._ring_size = ring_size
+        self._timeout = timeout
+        self._spin_time = spin_time
+        self._callbacks = {}
+        # data exchange of the Node -> ({routing key: [(ring, notification path)]}, routing keys on the broker,
+        #                              True if the wrapped transport carries other links)
+        self._outputs = {}
+        self._rings = []
+        self._notifier = None
+
+        self._inputs = []
+        self._input_rings = []
+        self._socket = None
+        self._socket_path = None
+        self._watcher = None
+        # set when no drain is pending (the watcher waits meanwhile)
+        self._drained = threading.Event()
+        self._drained.set()
+        self._closed = False
+
+    def consume(self, queue, callback, consumer_tag=None):
+        self._callbacks[queue] = (callback, consumer_tag)
+        self._transport.consume(queue, callback, consumer_tag)
+
+    def publish(self, exchange, routing_key, body, reply_to=None):
+        output = self._outputs.get(exchange)
+        if output is None:
+            self._transport.publish(exchange, routing_key, body, reply_to=reply_to)
+            return
+        routes, broker_routes, wrapped_links = output
+        for ring, path in routes.get(routing_key, ()):
+            self._put(ring, path, body)
+        if wrapped_links or routing_key in broker_routes:
+            self._transport.publish(exchange, routing_key, body, reply_to=reply_to)
+
+    def _put(self, ring, path, body):
+        if not ring.put(body):
+            # full: the reader is woken up until it makes room
+            deadline = time.time() + self._timeout
+            while not ring.put(body):
+                self._notify(path)
+                if time.time() > deadline:
+                    raise PublishError('The shared memory ring %s stays full' % ring.name)
+                time.sleep(0.0001)
+        if ring.waiting:
+            self._notify(path)
+
+    def _notify(self, path):
+        try:
+            self._notifier.sendto(b'\0', path)
+        except OSError:
+            # not bound yet (it reads the rings when it starts) or already woken up
+            pass
+
+    def start(self):
+        try:
+            self._transport.start()
+        finally:
+            self.close()
+
+    def open_data_links(self, node, data_plane, outputs, inputs, broker_routes):
+        # the direct links are left to the wrapped transport
+        other_outputs = [link for link in outputs if link.endpoint]
+        other_inputs = [link for link in inputs if link.endpoint]
+        if other_outputs or other_inputs:
+            self._transport.open_data_links(node, data_plane, other_outputs, other_inputs, broker_routes)
+        outputs = [link for link in outputs if not link.endpoint]
+        inputs = [link for link in inputs if not link.endpoint]
+
+        if outputs:
+            if self._notifier is None:
+                self._notifier = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                self._notifier.setblocking(False)
+            routes = {}
+            for link in outputs:
+                ring = RingBuffer(ring_name(data_plane, node, link.node), self._ring_size)
+                self._rings.append(ring)
+                target = (ring, notification_path(data_plane, link.node))
+                routes.setdefault(Node.DATA_BATCH_ROUTING, []).append(target)
+                for attr in link.attributes:
+                    routes.setdefault(Node.DATA_NODE_EXCHANGE + attr, []).append(target)
+            self._outputs[Node.DATA_NODE_EXCHANGE + node] = (routes, frozenset(broker_routes), bool(other_outputs))
+
+        if inputs:
+            callback, consumer_tag = self._callbacks[Node.DATA_NODE_QUEUE + node]
+            self._socket_path = notification_path(data_plane, node)
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            try:
+                os.unlink(self._socket_path)
+            except FileNotFoundError:
+                pass
+            self._socket.bind(self._socket_path)
+            self._socket.setblocking(False)
+            for link in inputs:
+                ring = RingBuffer(ring_name(data_plane, link.node, node), self._ring_size)
+                self._rings.append(ring)
+                method = LocalMethod(consumer_tag, Node.DATA_NODE_EXCHANGE + link.node, None)
+                self._inputs.append((ring, callback, method))
+                self._input_rings.append(ring)
+            self._watcher = threading.Thread(target=self._watch, name='obnl-shm-' + node)
+            self._watcher.daemon = True
+            self._watcher.start()
+
+    def _read_inputs(self):
+        """
+
+        :return: the messages of the input rings (callback, method, body)
+        """
+        messages = []
+        for ring, callback, method in self._inputs:
+            body = ring.get()
+            while body is not None:
+                messages.append((callback, method, body))
+                body = ring.get()
+        return messages
+
+    def _poll(self):
+        """
+        Polls the input rings until a message comes or SPIN_TIME has elapsed.
+
+        :return: the messages (callback, method, body)
+        """
+        deadline = time.perf_counter() + self._spin_time
+        rings = self._input_rings
+        while not any(ring.ready() for ring in rings):
+            if time.perf_counter() >= deadline:
+                return []
+            os.sched_yield()
+        return self._read_inputs()
+
+    def _drain(self):
+        try:
+            if self._closed:
+                return
+            messages = self._read_inputs()
+            while messages:
+                self._deliver(messages)
+                messages = self._poll()
+        finally:
+            self._drained.set()
+
+    def _watch(self):
+        rings = self._input_rings
+        while not self._closed:
+            self._drained.wait()
+            # the senders notify the socket once the flag is set: the rings are checked again
+            # after setting it, so that a message written in between is not missed
+            for ring in rings:
+                ring.waiting = True
+            if not any(ring.ready() for ring in rings):
+                select.select([self._socket], [], [], SharedMemoryTransport.POLL_INTERVAL)
+            for ring in rings:
+                ring.waiting = False
+            try:
+                while True:
+                    self._socket.recv(64)
+            except (BlockingIOError, OSError):
+                pass
+            if any(ring.ready() for ring in rings) and not self._closed:
+                self._drained.clear()
+                self._transport.call_threadsafe(self._drain)
+
+    def _deliver(self, messages):
+        props = LocalProperties(reply_to=None)
+        for callback, method, body in messages:
+            callback(self, method, props, body)
+
+    def close(self):
+        """
+        Stops the watcher and removes the rings and the socket of the Node.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._drained.set()
+        if self._watcher is not None and self._watcher is not threading.current_thread():
+            self._watcher.join()
+        for ring in self._rings:
+            ring.close()
+        self._rings = []
+        self._outputs = {}
+        if self._socket is not None:
+            self._socket.close()
+            try:
+                os.unlink(self._socket_path)
+            except FileNotFoundError:
+                pass
+        if self._notifier is not None:
+            self._notifier.close()
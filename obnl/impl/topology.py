@@ -0,0 +1,104 @@
+import time
+
+
+class Topology(object):
+    """
+    The broker topology of a simulation (exchanges, queues and bindings).
+
+    The declarations are planned first, without duplicates, then applied at once
+    by a Transport (which can pipeline them instead of waiting for each answer).
+    """
+
+    def __init__(self):
+        # dicts keep the declaration order and make the duplicate checks O(1)
+        self._exchanges = {}
+        self._queues = {}
+        self._bindings = {}
+
+    @property
+    def exchanges(self):
+        """
+
+        :return: the names of the exchanges, in declaration order
+        """
+        return list(self._exchanges)
+
+    @property
+    def queues(self):
+        """
+
+        :return: the names of the queues, in declaration order
+        """
+        return list(self._queues)
+
+    @property
+    def bindings(self):
+        """
+
+        :return: the bindings (exchange, queue, routing_key), in declaration order
+        """
+        return list(self._bindings)
+
+    def add_exchange(self, exchange):
+        """
+        Plans the declaration of a (direct) exchange.
+
+        :param exchange: the name of the exchange
+        """
+        self._exchanges[exchange] = None
+
+    def add_queue(self, queue):
+        """
+        Plans the declaration of a queue.
+
+        :param queue: the name of the queue
+        :return: the name of the queue
+        """
+        self._queues[queue] = None
+        return queue
+
+    def add_binding(self, exchange, queue, routing_key=None):
+        """
+        Plans the binding of a queue to an exchange (and their declarations).
+
+        :param exchange: the name of the exchange
+        :param queue: the name of the queue
+        :param routing_key: the routing key of the binding (the queue name if None)
+        """
+        self.add_exchange(exchange)
+        self.add_queue(queue)
+        self._bindings[(exchange, queue, routing_key if routing_key is not None else queue)] = None
+
+    def discard_binding(self, exchange, queue, routing_key=None):
+        """
+        Removes a planned binding (the exchange and the queue stay declared).
+
+        :param exchange: the name of the exchange
+        :param queue: the name of the queue
+        :param routing_key: the routing key of the binding (the queue name if None)
+        """
+        self._bindings.pop((exchange, queue, routing_key if routing_key is not None else queue), None)
+
+    def update(self, other):
+        """
+        Adds the declarations of another topology.
+
+        :param other: a Topology
+        """
+        self._exchanges.update(other._exchanges)
+        self._queues.update(other._queues)
+        self._bindings.update(other._bindings)
+
+    def apply(self, transport):
+        """
+        Declares the topology on a transport.
+
+        :param transport: the Transport to use
+        :return: the setup time (in seconds)
+        """
+        start = time.perf_counter()
+        transport.provision(self)
+        return time.perf_counter() - start
+
+    def __len__(self):
+        return len(self._exchanges) + len(self._queues) + len(self._bindings)
@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import struct
+from bisect import bisect_right
+
+
+NEXT_STEP = 'next_step'
+"""Instant event: a Node received its NextStep message"""
+INPUTS_COMPLETE = 'inputs_complete'
+"""Instant event: a Node has all its inputs and starts its step"""
+STEP = 'step'
+"""Span: the step function of a Node"""
+REPLY = 'reply'
+"""Instant event: a Node answered the scheduler"""
+BARRIER = 'barrier'
+"""Span (scheduler): from the NextStep of a block to the last answer of its Nodes"""
+DISPATCH = 'dispatch'
+"""Instant event (scheduler, lookahead mode): a Node was sent its NextStep"""
+
+_FLOAT = struct.Struct('<f')
+
+
+def message_time(simulation_time):
+    """
+    Rounds a simulation time as the NextStep messages do (float field): the Nodes trace the
+    time they receive, the scheduler has to trace the same one.
+
+    :param simulation_time: a simulation time
+    :return: the simulation time received by the Nodes
+    """
+    return _FLOAT.unpack(_FLOAT.pack(simulation_time))[0]
+
+
+class Tracer(object):
+    """
+    Records timestamped events of the Nodes (and Scheduler) it is given to, per
+    simulation step, and exports them in the Chrome trace-event format (chrome://tracing,
+    Perfetto). The timestamps are wall clock times, so the traces of several processes
+    can be analyzed together.
+
+    The Nodes only check whether they have a tracer: the cost is negligible without one.
+    """
+
+    def __init__(self):
+        # (phase, name, node, timestamp, duration, simulation time, args)
+        self._events = []
+        self._pid = os.getpid()
+
+    @staticmethod
+    def now():
+        """
+
+        :return: the timestamp of an event (in seconds)
+        """
+        return time.time()
+
+    def instant(self, name, node, simulation_time, args=None):
+        """
+        Records an instant event.
+
+        :param name: the event name
+        :param node: the node name
+        :param simulation_time: the current simulation time of the node
+        :param args: a map of additional data
+        """
+        self._events.append(('i', name, node, time.time(), 0., simulation_time, args))
+
+    def span(self, name, node, start, end, simulation_time, args=None):
+        """
+        Records an event with a duration.
+
+        :param name: the event name
+        :param node: the node name
+        :param start: the start timestamp (see now)
+        :param end: the end timestamp (see now)
+        :param simulation_time: the current simulation time of the node
+        :param args: a map of additional data
+        """
+        self._events.append(('X', name, node, start, end - start, simulation_time, args))
+
+    def __len__(self):
+        return len(self._events)
+
+    def events(self):
+        """
+
+        :return: the recorded events in the Chrome trace-event format (one thread per node)
+        """
+        threads = {}
+        events = []
+        for phase, name, node, timestamp, duration, simulation_time, args in self._events:
+            if node not in threads:
+                threads[node] = len(threads) + 1
+                events.append({'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': threads[node],
+                               'args': {'name': node}})
+            event_args = {'node': node, 'time': simulation_time}
+            if args:
+                event_args.update(args)
+            event = {'name': name, 'ph': phase, 'ts': timestamp * 1e6, 'pid': self._pid, 'tid': threads[node],
+                     'args': event_args}
+            if phase == 'X':
+                event['dur'] = duration * 1e6
+            else:
+                event['s'] = 't'
+            events.append(event)
+        return events
+
+    def export(self, path):
+        """
+        Writes the trace in a JSON file.
+
+        :param path: the file path
+        """
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.events(), 'displayTimeUnit': 'ms'}, f)
+
+
+def load_trace(paths):
+    """
+    Reads Chrome trace files written by Tracers.
+
+    :param paths: the file paths (one per process)
+    :return: the events of every file
+    """
+    events = []
+    for path in paths:
+        with open(path) as f:
+            data = json.load(f)
+        events.extend(data['traceEvents'] if isinstance(data, dict) else data)
+    return events
+
+
+class _NodeStep(object):
+    """
+    The events of a Node during one step.
+    """
+
+    __slots__ = ('node', 'time', 'next_step', 'inputs_complete', 'start', 'end', 'reply')
+
+    def __init__(self, node, simulation_time):
+        self.node = node
+        self.time = simulation_time
+        self.next_step = self.inputs_complete = self.start = self.end = self.reply = None
+
+    @property
+    def input_wait(self):
+        if self.next_step is None or self.inputs_complete is None:
+            return 0.
+        return self.inputs_complete - self.next_step
+
+    @property
+    def compute(self):
+        return self.end - self.start if self.start is not None and self.end is not None else 0.
+
+
+def analyze_trace(events, top=5):
+    """
+    Finds where the step time goes.
+
+    The steps of the Nodes are assigned to the scheduler barriers (block and
+    simulation time) in which they received their NextStep. The Node closing each
+    barrier (the last to answer) is on the critical path: its time is split in
+    broker latency (NextStep and answer), input wait and step computation.
+
+    :param events: the trace events (see load_trace)
+    :param top: the number of slowest nodes listed per block
+    :return: a human readable report
+    """
+    steps = {}
+    barriers = []
+    for event in events:
+        if event.get('ph') == 'M':
+            continue
+        args = event.get('args', {})
+        name = event['name']
+        timestamp = event['ts'] / 1e6
+        if name == BARRIER:
+            # older traces have the unrounded time of the scheduler
+            barriers.append((timestamp, timestamp + event['dur'] / 1e6, args.get('block'),
+                             message_time(args['time'])))
+            continue
+        if name not in (NEXT_STEP, INPUTS_COMPLETE, STEP, REPLY):
+            continue
+        key = (args['node'], args['time'])
+        step = steps.get(key)
+        if step is None:
+            step = steps[key] = _NodeStep(args['node'], args['time'])
+        if name == NEXT_STEP:
+            step.next_step = timestamp
+        elif name == INPUTS_COMPLETE:
+            step.inputs_complete = timestamp
+        elif name == STEP:
+            step.start = timestamp
+            step.end = timestamp + event['dur'] / 1e6
+        else:
+            step.reply = timestamp
+
+    lines = ['%d node steps, %d barriers' % (len(steps), len(barriers))]
+    if not barriers:
+        # lookahead mode (or no scheduler trace): only the nodes can be ranked
+        lines.append('slowest nodes (mean step, mean input wait):')
+        lines.extend(_slowest(steps.values(), top))
+        return '\n'.join(lines)
+
+    barriers.sort()
+    starts = [b[0] for b in barriers]
+    by_barrier = {}
+    for step in steps.values():
+        if step.next_step is None:
+            continue
+        index = bisect_right(starts, step.next_step) - 1
+        if index >= 0 and barriers[index][3] == step.time:
+            by_barrier.setdefault(index, []).append(step)
+
+    # critical path: the last node of each barrier
+    blocks = {}
+    closers = {}
+    total = {'barrier': 0., 'latency': 0., 'input wait': 0., 'compute': 0.}
+    for index, (start, end, block, _) in enumerate(barriers):
+        members = by_barrier.get(index, [])
+        blocks.setdefault(block, []).extend(members)
+        total['barrier'] += end - start
+        answered = [s for s in members if s.reply is not None]
+        if not answered:
+            continue
+        last = max(answered, key=lambda s: s.reply)
+        closers[last.node] = closers.get(last.node, 0) + 1
+        total['input wait'] += last.input_wait
+        total['compute'] += last.compute
+        total['latency'] += (end - start) - last.input_wait - last.compute
+
+    lines.append('critical path: %.3fs in barriers' % total['barrier'])
+    for part in ('compute', 'input wait', 'latency'):
+        share = total[part] / total['barrier'] * 100 if total['barrier'] else 0.
+        lines.append('  %-10s %.3fs (%.1f%%)' % (part, total[part], share))
+    lines.append('nodes closing the barriers: ' +
+                 ', '.join('%s (%d)' % (n, c) for n, c in sorted(closers.items(), key=lambda x: -x[1])[:top]))
+
+    for block in sorted(blocks, key=lambda b: (b is None, b)):
+        lines.append('block %s, slowest nodes (mean step, mean input wait):' % block)
+        lines.extend(_slowest(blocks[block], top))
+    return '\n'.join(lines)
+
+
+def _slowest(steps, top):
+    compute = {}
+    wait = {}
+    count = {}
+    for step in steps:
+        compute[step.node] = compute.get(step.node, 0.) + step.compute
+        wait[step.node] = wait.get(step.node, 0.) + step.input_wait
+        count[step.node] = count.get(step.node, 0) + 1
+    ranked = sorted(compute, key=lambda n: -compute[n] / count[n])[:top]
+    return ['  %s: %.3fms, %.3fms' % (n, compute[n] / count[n] * 1e3, wait[n] / count[n] * 1e3) for n in ranked]
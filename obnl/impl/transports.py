@@ -0,0 +1,712 @@
+import threading
+from collections import namedtuple, deque
+from queue import Queue, Empty
+
+import pika
+
+
+LocalMethod = namedtuple('LocalMethod', ['consumer_tag', 'exchange', 'routing_key'])
+"""The delivery information given to the callbacks by the local backend (mimics pika.spec.Basic.Deliver)"""
+
+LocalProperties = namedtuple('LocalProperties', ['reply_to'])
+"""The message properties given to the callbacks by the local backend (mimics pika.BasicProperties)"""
+
+
+class Transport(object):
+    """
+    Base class of every Transports.
+
+    A Transport hides the message broker from the Nodes. It offers the AMQP
+    topology (exchanges, queues and bindings) and calls the consumer callbacks
+    with the pika signature: callback(ch, method, props, body).
+    """
+
+    def declare_exchange(self, exchange):
+        """
+        Declares a (direct) exchange.
+
+        :param exchange: the name of the exchange
+        """
+        raise NotImplementedError('Abstract function call from '+str(self.__class__))
+
+    def declare_queue(self, queue):
+        """
+        Declares a queue.
+
+        :param queue: the name of the queue
+        :return: the name of the declared queue
+        """
+        raise NotImplementedError('Abstract function call from '+str(self.__class__))
+
+    def bind(self, exchange, queue, routing_key=None):
+        """
+        Binds a queue to an exchange.
+
+        :param exchange: the name of the exchange
+        :param queue: the name of the queue
+        :param routing_key: the routing key of the binding (the queue name if None)
+        """
+        raise NotImplementedError('Abstract function call from '+str(self.__class__))
+
+    def provision(self, topology):
+        """
+        Declares all the exchanges, queues and bindings of a topology (in that order).
+        The Transports able to send them without waiting for each answer override it.
+
+        :param topology: the Topology to declare
+        """
+        for exchange in topology.exchanges:
+            self.declare_exchange(exchange)
+        for queue in topology.queues:
+            self.declare_queue(queue)
+        for exchange, queue, routing_key in topology.bindings:
+            self.bind(exchange, queue, routing_key)
+
+    def consume(self, queue, callback, consumer_tag=None):
+        """
+        Registers a callback for the messages of a queue.
+
+        :param queue: the name of the queue
+        :param callback: the function called with (ch, method, props, body)
+        :param consumer_tag: the name of the consumer
+        """
+        raise NotImplementedError('Abstract function call from '+str(self.__class__))
+
+    def publish(self, exchange, routing_key, body, reply_to=None):
+        """
+        Publishes a message.
+
+        :param exchange: the exchange to publish to ('' to send directly to a queue)
+        :param routing_key: the routing key
+        :param body: the serialized message
+        :param reply_to: the routing key to reply to
+        """
+        raise NotImplementedError('Abstract function call from '+str(self.__class__))
+
+    def flush(self):
+        """
+        Sends the buffered messages and, with publisher confirms, waits until the
+        broker has confirmed them. Does nothing when the messages are not buffered.
+        """
+        pass
+
+    def start(self):
+        """
+        Starts consuming. Blocks until stop is called.
+        """
+        raise NotImplementedError('Abstract function call from '+str(self.__class__))
+
+    def stop(self):
+        """
+        Stops consuming.
+        """
+        raise NotImplementedError('Abstract function call from '+str(self.__class__))
+
+    def call_threadsafe(self, function):
+        """
+        Calls a function from the thread calling the consumer callbacks (can be called from any thread).
+
+        :param function: the function, called without argument
+        """
+        raise NotImplementedError('Abstract function call from '+str(self.__class__))
+
+    def data_endpoint(self, node):
+        """
+        Listens for the data links of the other Nodes connecting directly to the Node (see obnl.impl.peer).
+
+        :param node: the name of the Node
+        :return: the address of the Node (given to the Scheduler in the SimulatorConnection),
+                 '' if the transport does not receive direct data links
+        """
+        return ''
+
+    def open_data_links(self, node, data_plane, outputs, inputs, broker_routes):
+        """
+        Carries data links of a Node outside the broker (given by the Scheduler in the SchedulerConnection).
+
+        :param node: the name of the Node
+        :param data_plane: the name of the data plane of the simulation
+        :param outputs: the links of the Node as sender (DataLink: receiver, attributes and endpoint)
+        :param inputs: the links of the Node as receiver (DataLink: sender and endpoint)
+        :param broker_routes: the routing keys of the data of the Node still bound on the broker
+        """
+        raise ValueError('The data links of %s require a transport carrying them outside the broker '
+                         '(e.g. a SharedMemoryTransport or a PeerTransport), not a %s'
+                         % (node, self.__class__.__name__))
+
+
+class PublishError(Exception):
+    """
+    Raised by flush when the broker has rejected published messages.
+    """
+    pass
+
+
+class WrappingTransport(Transport):
+    """
+    Base class of the Transports carrying some data links themselves: everything else goes
+    through the wrapped Transport (the control messages, the topology and the other data links).
+    """
+
+    def __init__(self, transport):
+        """
+
+        :param transport: the wrapped Transport
+        """
+        self._transport = transport
+
+    @property
+    def transport(self):
+        """
+
+        :return: the wrapped Transport
+        """
+        return self._transport
+
+    def declare_exchange(self, exchange):
+        self._transport.declare_exchange(exchange)
+
+    def declare_queue(self, queue):
+        return self._transport.declare_queue(queue)
+
+    def bind(self, exchange, queue, routing_key=None):
+        self._transport.bind(exchange, queue, routing_key)
+
+    def provision(self, topology):
+        self._transport.provision(topology)
+
+    def consume(self, queue, callback, consumer_tag=None):
+        self._transport.consume(queue, callback, consumer_tag)
+
+    def publish(self, exchange, routing_key, body, reply_to=None):
+        self._transport.publish(exchange, routing_key, body, reply_to=reply_to)
+
+    def flush(self):
+        self._transport.flush()
+
+    def start(self):
+        self._transport.start()
+
+    def stop(self):
+        self._transport.stop()
+
+    def call_threadsafe(self, function):
+        self._transport.call_threadsafe(function)
+
+    def data_endpoint(self, node):
+        return self._transport.data_endpoint(node)
+
+    def open_data_links(self, node, data_plane, outputs, inputs, broker_routes):
+        self._transport.open_data_links(node, data_plane, outputs, inputs, broker_routes)
+
+
+class AMQPTransport(Transport):
+    """
+    A Transport using a blocking pika connection to an AMQP broker.
+
+    In pipelined mode, a publish only adds the message frames to the output
+    buffer of the connection: they are written together when the consumer
+    callback returns (or on flush) instead of one write per message.
+    Publisher confirms can be added, the broker acknowledging the messages by
+    batches; flush waits for them. The pipelined mode and the confirms use the
+    channel and the output buffer under the blocking adapter of pika 0.13 (the
+    version pinned in the requirements).
+    """
+
+    def __init__(self, host, pipelined=False, confirms=False):
+        """
+
+        :param host: the AMQP host
+        :param pipelined: if True, the published messages are buffered until the callback returns or flush
+        :param confirms: if True, the broker confirms the published messages (pipelined),
+                         flush waits for the confirmations
+        """
+        self._connection, self._channel = self._open(host)
+
+        self._pipelined = pipelined or confirms
+        self._confirms = confirms
+        self._delivery_tag = 0
+        self._unconfirmed = set()
+        self._rejected = 0
+        if confirms:
+            # on the channel under the blocking one, to get the acknowledgements by callback
+            # (pika internals: BlockingChannel._impl is the channel of pika 0.13)
+            self._channel._impl.confirm_delivery(self._on_confirmation)
+
+    def _open(self, host):
+        """
+
+        :param host: the AMQP host
+        :return: the connection and the channel of the transport
+        """
+        connection = pika.BlockingConnection(pika.ConnectionParameters(host=host))
+        return connection, connection.channel()
+
+    def _on_confirmation(self, frame):
+        method = frame.method
+        if method.multiple:
+            confirmed = {tag for tag in self._unconfirmed if tag <= method.delivery_tag}
+        else:
+            confirmed = {method.delivery_tag} & self._unconfirmed
+        self._unconfirmed -= confirmed
+        if isinstance(method, pika.spec.Basic.Nack):
+            self._rejected += len(confirmed)
+
+    def declare_exchange(self, exchange):
+        self._channel.exchange_declare(exchange=exchange)
+
+    def declare_queue(self, queue):
+        return self._channel.queue_declare(queue=queue).method.queue
+
+    def bind(self, exchange, queue, routing_key=None):
+        self._channel.queue_bind(exchange=exchange, queue=queue, routing_key=routing_key)
+
+    def provision(self, topology):
+        # pipelined: every declaration is sent without waiting for its answer (nowait)
+        # on the channel under the blocking one, then a last blocking declaration waits
+        # for the broker to have processed them all (an error closes the channel and
+        # makes it raise). Relies on pika internals: BlockingChannel._impl (pika 0.13)
+        channel = self._channel._impl
+        for exchange in topology.exchanges:
+            channel.exchange_declare(exchange=exchange, nowait=True)
+        for queue in topology.queues:
+            channel.queue_declare(None, queue=queue, nowait=True)
+        for exchange, queue, routing_key in topology.bindings:
+            channel.queue_bind(None, queue, exchange, routing_key=routing_key, nowait=True)
+        if topology.queues:
+            self._channel.queue_declare(queue=topology.queues[-1], passive=True)
+        elif topology.exchanges:
+            self._channel.exchange_declare(exchange=topology.exchanges[-1], passive=True)
+
+    def consume(self, queue, callback, consumer_tag=None):
+        self._channel.basic_consume(callback,
+                                    consumer_tag=consumer_tag,
+                                    queue=queue,
+                                    no_ack=True)
+
+    def publish(self, exchange, routing_key, body, reply_to=None):
+        if not self._pipelined:
+            self._channel.publish(exchange=exchange,
+                                  routing_key=routing_key,
+                                  properties=pika.BasicProperties(reply_to=reply_to),
+                                  body=body)
+            return
+
+        # pika internals: the channel under the blocking one only adds the frames to the output buffer
+        self._channel._impl.basic_publish(exchange, routing_key, body,
+                                          properties=pika.BasicProperties(reply_to=reply_to))
+        if self._confirms:
+            self._delivery_tag += 1
+            self._unconfirmed.add(self._delivery_tag)
+
+    def flush(self):
+        if not self._pipelined:
+            return
+        # pika internals: BlockingConnection._flush_output (pika 0.13) writes the output buffer
+        # and processes the events until the condition (if any) holds
+        if self._confirms:
+            self._connection._flush_output(lambda: not self._unconfirmed)
+            if self._rejected:
+                rejected, self._rejected = self._rejected, 0
+                raise PublishError('%d messages rejected by the broker' % rejected)
+        else:
+            self._connection._flush_output()
+
+    def start(self):
+        self._channel.start_consuming()
+
+    def stop(self):
+        self._channel.stop_consuming()
+
+    def call_threadsafe(self, function):
+        self._connection.add_callback_threadsafe(function)
+
+
+class AMQPConnectionPool(object):
+    """
+    A blocking pika connection shared by the Nodes of a process, each Node using
+    its own channel (see SharedAMQPTransport).
+
+    A single I/O loop waits for the events of the connection and calls the
+    callbacks of all the Nodes. It is run by the first started transport (the
+    other started transports wait until they are stopped), or by one thread of
+    the pool (start), so that no thread is needed per Node. The loop ends when
+    every transport of the pool is stopped. As pika connections are not thread-safe, every Node has
+    to be created before the first one is started. The number of Nodes is limited
+    by the number of channels the broker allows on a connection (channel_max).
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, host):
+        """
+
+        :param host: the AMQP host
+        """
+        self._host = host
+        self._connection = None
+        self._lock = threading.Lock()
+        self._transports = set()
+        self._running = False
+        self._thread = None
+
+    @classmethod
+    def shared(cls, host):
+        """
+
+        :param host: the AMQP host
+        :return: the pool of the process for the host
+        """
+        with cls._shared_lock:
+            if host not in cls._shared:
+                cls._shared[host] = AMQPConnectionPool(host)
+            return cls._shared[host]
+
+    @property
+    def host(self):
+        return self._host
+
+    def channel(self):
+        """
+        Opens a channel on the connection, opening the connection first if needed.
+
+        :return: the connection and the channel
+        """
+        with self._lock:
+            if self._connection is None:
+                self._connection = pika.BlockingConnection(pika.ConnectionParameters(host=self._host))
+            return self._connection, self._connection.channel()
+
+    def register(self, transport):
+        with self._lock:
+            self._transports.add(transport)
+
+    def release(self, transport):
+        """
+        Stops a transport: the loop ends when none is left.
+        """
+        with self._lock:
+            self._transports.discard(transport)
+            running = self._running
+        transport.stopped.set()
+        if running:
+            # wakes the loop up (called from a callback or from another thread)
+            self._connection.add_callback_threadsafe(lambda: None)
+
+    def start(self):
+        """
+        Runs the I/O loop of the pool in a thread if it does not run yet.
+
+        :return: the thread running the loop
+        """
+        with self._lock:
+            if not self._running:
+                self._running = True
+                self._thread = threading.Thread(target=self._loop)
+                self._thread.start()
+            return self._thread
+
+    def run(self, transport):
+        """
+        Runs the I/O loop of the pool if it does not run yet, else waits until the transport is stopped.
+
+        :param transport: the started SharedAMQPTransport
+        """
+        with self._lock:
+            runner = not self._running
+            self._running = True
+            if runner:
+                self._thread = threading.current_thread()
+        if runner:
+            self._loop()
+        else:
+            transport.stopped.wait()
+
+    def _loop(self):
+        try:
+            while self._transports:
+                # blocks until some events are dispatched
+                self._connection.process_data_events(time_limit=None)
+        finally:
+            with self._lock:
+                self._running = False
+
+
+class SharedAMQPTransport(AMQPTransport):
+    """
+    An AMQPTransport using a channel of a (shared) AMQPConnectionPool.
+
+    A Node quitting from a callback (SystemExit) only stops its transport, the
+    loop goes on for the other Nodes of the pool.
+    """
+
+    def __init__(self, pool, pipelined=False, confirms=False):
+        """
+
+        :param pool: the AMQPConnectionPool to use
+        :param pipelined: see AMQPTransport
+        :param confirms: see AMQPTransport
+        """
+        self._pool = pool
+        self.stopped = threading.Event()
+        """Set when the transport is stopped"""
+        super(SharedAMQPTransport, self).__init__(pool.host, pipelined, confirms)
+        pool.register(self)
+
+    def _open(self, host):
+        return self._pool.channel()
+
+    def consume(self, queue, callback, consumer_tag=None):
+        def guarded(ch, method, props, body):
+            if self.stopped.is_set():
+                return
+            try:
+                callback(ch, method, props, body)
+            except SystemExit:
+                self.stop()
+        super(SharedAMQPTransport, self).consume(queue, guarded, consumer_tag)
+
+    def start(self):
+        self._pool.run(self)
+
+    def start_thread(self):
+        """
+        Starts the I/O loop of the pool in its thread if it does not run yet (see AMQPConnectionPool.start).
+
+        :return: the thread running the loop of the pool
+        """
+        return self._pool.start()
+
+    def stop(self):
+        self._pool.release(self)
+
+
+class LocalBroker(object):
+    """
+    An in-process stand-in for the AMQP broker.
+
+    It routes messages with the same exchange/queue/routing key topology as the
+    direct exchanges used by OBNL, but through Python queues. Every Node of a
+    simulation (Scheduler included) has to use a LocalTransport on the same broker.
+
+    The Nodes can either be started (one thread per Node, as with AMQP) or driven
+    from a single thread with run_until_idle.
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._exchanges = {}
+        self._queues = {}
+        self._transports = []
+        # the LocalTransports given a message since the last run_until_idle (FIFO, with duplicates)
+        self._ready = deque()
+
+        self.published = 0
+        """Number of messages published on the broker"""
+        self.delivered = 0
+        """Number of messages delivered to a queue"""
+
+    @classmethod
+    def default(cls):
+        """
+
+        :return: the broker shared by the LocalTransports created without broker
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = LocalBroker()
+            return cls._default
+
+    def declare_exchange(self, exchange):
+        with self._lock:
+            self._exchanges.setdefault(exchange, {})
+
+    def declare_queue(self, queue):
+        with self._lock:
+            if queue not in self._queues:
+                self._queues[queue] = _LocalQueue(queue)
+            return queue
+
+    def bind(self, exchange, queue, routing_key=None):
+        with self._lock:
+            if exchange not in self._exchanges:
+                raise ValueError('Unknown exchange: ' + exchange)
+            if queue not in self._queues:
+                raise ValueError('Unknown queue: ' + queue)
+            if routing_key is None:
+                routing_key = queue
+            # a dict keeps the binding order and makes the duplicate check O(1)
+            self._exchanges[exchange].setdefault(routing_key, {})[queue] = None
+
+    def provision(self, topology):
+        with self._lock:
+            for exchange in topology.exchanges:
+                self._exchanges.setdefault(exchange, {})
+            for queue in topology.queues:
+                if queue not in self._queues:
+                    self._queues[queue] = _LocalQueue(queue)
+            for exchange, queue, routing_key in topology.bindings:
+                self._exchanges[exchange].setdefault(routing_key, {})[queue] = None
+
+    def consume(self, queue, transport, callback, consumer_tag=None):
+        with self._lock:
+            if queue not in self._queues:
+                raise ValueError('Unknown queue: ' + queue)
+            if transport not in self._transports:
+                self._transports.append(transport)
+            self._queues[queue].add_consumer(transport, callback, consumer_tag)
+
+    def publish(self, exchange, routing_key, body, reply_to=None):
+        with self._lock:
+            if exchange:
+                if exchange not in self._exchanges:
+                    raise ValueError('Unknown exchange: ' + exchange)
+                targets = self._exchanges[exchange].get(routing_key, ())
+            else:
+                # default exchange: the routing key is the queue name
+                targets = (routing_key,) if routing_key in self._queues else ()
+
+            self.published += 1
+            props = LocalProperties(reply_to=reply_to)
+            for queue in targets:
+                self.delivered += 1
+                self._queues[queue].put(exchange, routing_key, props, body)
+
+    def run_until_idle(self):
+        """
+        Delivers the pending messages of every LocalTransport of this broker from
+        the calling thread, until none is left.
+
+        :return: the number of processed messages
+        """
+        # only the transports having received a message are visited, so that a round
+        # does not cost the number of Nodes
+        count = 0
+        ready = self._ready
+        while ready:
+            count += ready.popleft().process_events()
+        return count
+
+    def mark_ready(self, transport):
+        """
+        Called by a LocalTransport given a message while it is not started.
+
+        :param transport: the LocalTransport
+        """
+        self._ready.append(transport)
+
+
+class _LocalQueue(object):
+    """
+    A queue of the LocalBroker. It keeps the messages until a consumer is registered.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._consumers = []
+        self._next = 0
+        self._backlog = deque()
+
+    def add_consumer(self, transport, callback, consumer_tag):
+        self._consumers.append((transport, callback, consumer_tag))
+        while self._backlog:
+            self.put(*self._backlog.popleft())
+
+    def put(self, exchange, routing_key, props, body):
+        if not self._consumers:
+            self._backlog.append((exchange, routing_key, props, body))
+            return
+        # round-robin between the consumers, like AMQP does
+        transport, callback, consumer_tag = self._consumers[self._next % len(self._consumers)]
+        self._next += 1
+        transport.deliver(callback, LocalMethod(consumer_tag, exchange, routing_key), props, body)
+
+
+class LocalTransport(Transport):
+    """
+    A broker-free Transport: the messages are routed through a LocalBroker inside the process.
+    """
+
+    def __init__(self, broker=None):
+        """
+
+        :param broker: the LocalBroker to use (the process default one if None)
+        """
+        self._broker = broker if broker is not None else LocalBroker.default()
+        self._inbox = Queue()
+        self._running = False
+
+    @property
+    def broker(self):
+        """
+
+        :return: the LocalBroker used by this transport
+        """
+        return self._broker
+
+    def declare_exchange(self, exchange):
+        self._broker.declare_exchange(exchange)
+
+    def declare_queue(self, queue):
+        return self._broker.declare_queue(queue)
+
+    def bind(self, exchange, queue, routing_key=None):
+        self._broker.bind(exchange, queue, routing_key)
+
+    def provision(self, topology):
+        self._broker.provision(topology)
+
+    def consume(self, queue, callback, consumer_tag=None):
+        self._broker.consume(queue, self, callback, consumer_tag)
+
+    def publish(self, exchange, routing_key, body, reply_to=None):
+        self._broker.publish(exchange, routing_key, body, reply_to)
+
+    def deliver(self, callback, method, props, body):
+        """
+        Called by the LocalBroker to give a message to this transport.
+        """
+        self._inbox.put((callback, method, props, body))
+        if not self._running:
+            self._broker.mark_ready(self)
+
+    def process_events(self):
+        """
+        Calls the callbacks of the pending messages without blocking.
+
+        :return: the number of processed messages
+        """
+        count = 0
+        while True:
+            try:
+                delivery = self._inbox.get_nowait()
+            except Empty:
+                return count
+            if delivery is None:
+                continue
+            count += 1
+            self._dispatch(delivery)
+
+    def start(self):
+        self._running = True
+        while self._running:
+            delivery = self._inbox.get()
+            if delivery is None:
+                break
+            self._dispatch(delivery)
+        self._running = False
+
+    def stop(self):
+        self._running = False
+        self._inbox.put(None)
+
+    def call_threadsafe(self, function):
+        self.deliver(lambda ch, method, props, body: function(), None, None, None)
+
+    def _dispatch(self, delivery):
+        callback, method, props, body = delivery
+        callback(self, method, props, body)
@@ -0,0 +1,42 @@
+import argparse
+from obnl.impl.launcher import Launcher
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Starts the nodes of a simulation in worker processes.')
+    parser.add_argument("host")
+    parser.add_argument("config_file")
+    parser.add_argument("--schedule", dest="schedule_file",
+                        help="the schedule file, to spread the nodes of a block over the workers")
+    parser.add_argument("--workers", type=int, help="the number of worker processes (default: number of CPUs)")
+    parser.add_argument("--class", dest="classes", action="append", default=[], metavar="NODE=MODULE:CLASS",
+                        help="the class of a node (overrides the 'class' entry of the config)")
+    parser.add_argument("--default-class", metavar="MODULE:CLASS",
+                        help="the class of the nodes without class")
+    parser.add_argument("--group", dest="groups", action="append", default=[], metavar="NODE1,NODE2,...",
+                        help="nodes that must run in the same worker")
+    parser.add_argument("--pin", action="store_true", help="pins each worker to one CPU")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="each worker serves the live metrics of its nodes on http://127.0.0.1:PORT+INDEX")
+    parser.add_argument("--metrics-file", metavar="FILE",
+                        help="each worker writes a JSON snapshot of the live metrics of its nodes periodically "
+                             "(in FILE with its index before the extension)")
+    parser.add_argument("--metrics-interval", type=float, default=10., metavar="SECONDS",
+                        help="period of the metrics snapshots (default: 10)")
+
+    args = parser.parse_args()
+
+    launcher = Launcher(args.host, args.config_file, args.schedule_file, args.workers,
+                        dict(c.split('=', 1) for c in args.classes), args.default_class,
+                        [g.split(',') for g in args.groups], args.pin, args.metrics_port, args.metrics_file,
+                        args.metrics_interval)
+
+    for report in launcher.run():
+        print('worker %d (pid %d, cpus %s): %s' % (report['worker'], report['pid'], report['cpus'],
+                                                   ', '.join(report['nodes'])))
+        print('    wall %.2fs, cpu %.2fs, utilisation %.0f%%' % (report['wall_time'], report['cpu_time'],
+                                                              100 * report['utilisation']))
+        for name, step_time in sorted(report['step_time'].items()):
+            print('    %s: %.2fs in step (%.0f%%)' % (name, step_time,
+                                                     100 * step_time / report['wall_time']
+                                                     if report['wall_time'] else 0))
@@ -0,0 +1,52 @@
+from obnl.client import ClientNode
+from obnl.impl.population import PopulationNode as _PopulationNodeImpl
+
+
+class PopulationNode(ClientNode):
+    """
+    A ClientNode simulating a population of entities of the same model with one vectorized
+    step: the input values are NumPy arrays with one value per entity, and update_attribute
+    takes such arrays. The links of the config can address an entity ('T[3]') or a slice of
+    entities ('T[0:100]') of the population (see obnl.impl.population).
+    """
+
+    def __init__(self, host, name, size, input_attributes=None, output_attributes=None, is_first=False,
+                 transport=None, batch=False, local_queue=False, publish_policies=None, defaults=None):
+        """
+
+        :param host: the AMQP host
+        :param name: the node name
+        :param size: the number of entities
+        :param input_attributes: the list of input attributes
+        :param output_attributes: the list of output attributes
+        :param is_first: True if the node does not wait for its inputs
+        :param transport: the Transport to use (an AMQPTransport to host if None)
+        :param batch: if True, the attributes updated during a step are sent in one message when the step returns
+                      (advised when many selections are linked)
+        :param local_queue: if True, the local queue is created so that external triggers can ask the node
+                            to check if it can step
+        :param publish_policies: a map of output attributes (or selections) to PublishPolicy
+                                 (see obnl.impl.policies), the attributes without policy are always sent
+        :param defaults: a map of input attributes to their value (a float or an array of size values)
+                         until received, NaN by default
+        """
+        self._node_impl = _PopulationNodeImpl(host, name, self, size, input_attributes, output_attributes,
+                                              is_first, transport, batch, local_queue, publish_policies, defaults)
+
+    @property
+    def size(self):
+        """
+
+        :return: the number of entities
+        """
+        return self._node_impl.size
+
+    def update_attribute(self, attr, value):
+        """
+        Sends the new values of an attribute to those who want to know, with the values
+        of its linked entities and slices.
+
+        :param attr: the attribute to communicate
+        :param value: the values of the entities: an array of size values (a float for all the entities)
+        """
+        self._node_impl.update_attribute(attr, value)
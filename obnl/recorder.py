@@ -0,0 +1,31 @@
+import argparse
+from obnl.impl.recorder import RecorderNode, ColumnStore
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="records the attribute updates of a simulation in a column store")
+    subparsers = parser.add_subparsers(dest="command")
+
+    record = subparsers.add_parser("record", help="starts a recorder (named with the --recorder of the scheduler)")
+    record.add_argument("host")
+    record.add_argument("name")
+    record.add_argument("directory")
+    record.add_argument("--flush-interval", type=float, default=1., metavar="SECONDS",
+                        help="time between two writes of the index (default: 1)")
+
+    info = subparsers.add_parser("info", help="lists the recorded attributes of a column store")
+    info.add_argument("directory")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        RecorderNode(args.host, args.name, args.directory, flush_interval=args.flush_interval).start()
+    elif args.command == "info":
+        store = ColumnStore(args.directory)
+        for key in store.columns:
+            column = store.info(key)
+            print('%s: %d values from %s to %s (%s%s)' % (key, column['length'], column['start'], column['end'],
+                                                         column['dtype'],
+                                                         ', shape %s' % column['shape'] if column['shape'] else ''))
+    else:
+        parser.print_help()
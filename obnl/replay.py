@@ -0,0 +1,41 @@
+import sys
+import pstats
+import argparse
+import cProfile
+from obnl.impl.node import Node
+from obnl.impl.launcher import load_class
+from obnl.impl.replay import Replay
+from obnl.impl.transports import LocalBroker, LocalTransport
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="replays the steps of a node recorded with a StepRecording, "
+                                                 "without broker nor scheduler, and checks the sent values")
+    parser.add_argument("recording", help="the recording file")
+    parser.add_argument("node_class", metavar="MODULE:CLASS",
+                        help="the class of the node (created with the host, the name, the inputs, the outputs "
+                             "and a transport keyword argument)")
+    parser.add_argument("--rtol", type=float, default=1e-9, help="relative tolerance of the values")
+    parser.add_argument("--atol", type=float, default=0., help="absolute tolerance of the values")
+    parser.add_argument("--no-check", action="store_true", help="does not compare the sent values")
+    parser.add_argument("--profile", type=int, metavar="N", help="profiles the replay and prints the N "
+                                                                 "functions taking the most time")
+
+    args = parser.parse_args()
+
+    replay = Replay(args.recording, args.rtol, args.atol)
+    # the sent values are encoded and published as in a simulation, but nothing receives them
+    broker = LocalBroker()
+    broker.declare_exchange(Node.DATA_NODE_EXCHANGE + replay.name)
+    node = load_class(args.node_class)(None, replay.name, replay.input_attributes, replay.output_attributes,
+                                       transport=LocalTransport(broker))
+
+    if args.profile:
+        profile = cProfile.Profile()
+        result = profile.runcall(replay.run, node, not args.no_check)
+        pstats.Stats(profile).sort_stats('cumulative').print_stats(args.profile)
+    else:
+        result = replay.run(node, not args.no_check)
+    print(result)
+    if not result.ok:
+        sys.exit(1)
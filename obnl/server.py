@@ -1,5 +1,8 @@
 import argparse
-from obnl.impl.server import Scheduler
+from obnl.impl.server import Scheduler, analyze
+from obnl.impl.transports import AMQPTransport
+from obnl.impl.tracing import Tracer
+from obnl.impl.metrics import MetricsRegistry
 
 if __name__ == "__main__":
 
@@ -7,8 +10,74 @@ if __name__ == "__main__":
     parser.add_argument("host")
     parser.add_argument("config_file")
     parser.add_argument("schedule_file")
+    parser.add_argument("--lookahead", action="store_true",
+                        help="starts the step of each node as soon as the nodes it depends on are done")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="keeps the loaded simulation in DIR to start faster while the files are unchanged")
+    parser.add_argument("--compact", action="store_true",
+                        help="uses the compact message envelope (interned node and attribute IDs)")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="writes the published messages together when a callback returns")
+    parser.add_argument("--confirms", action="store_true",
+                        help="uses publisher confirms (pipelined)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="writes the barrier events in FILE (Chrome trace format, see obnl.trace)")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serves the live metrics on http://127.0.0.1:PORT (plain text), "
+                             "the nodes of other processes are not counted (see obnl.launcher)")
+    parser.add_argument("--metrics-file", metavar="FILE",
+                        help="writes a JSON snapshot of the live metrics in FILE periodically")
+    parser.add_argument("--metrics-interval", type=float, default=10., metavar="SECONDS",
+                        help="period of the metrics snapshots (default: 10)")
+    parser.add_argument("--recorder", metavar="NAME",
+                        help="waits for the recorder NAME and sends it the recorded outputs (see obnl.recorder)")
+    parser.add_argument("--record", nargs='+', metavar="NODE[.ATTR]",
+                        help="the outputs recorded by the recorder (all the outputs if not given)")
+    parser.add_argument("--checkpoint-dir", metavar="DIR",
+                        help="writes checkpoints of the simulation (scheduler and node snapshots) in DIR")
+    parser.add_argument("--checkpoint-steps", type=int, metavar="N", help="writes a checkpoint every N steps")
+    parser.add_argument("--checkpoint-interval", type=float, metavar="SECONDS",
+                        help="writes a checkpoint every SECONDS seconds")
+    parser.add_argument("--resume", action="store_true",
+                        help="starts after the latest checkpoint of the checkpoint directory")
+    parser.add_argument("--shared-memory", action="append", nargs='+', metavar="NODE",
+                        help="a group of nodes of the same host exchanging their data through shared memory "
+                             "(their transport has to be a SharedMemoryTransport), can be repeated")
+    parser.add_argument("--peer-to-peer", nargs='*', metavar="NODE",
+                        help="nodes sending their data directly to each other, all the nodes if none is given "
+                             "(their transport has to be a PeerTransport)")
+    parser.add_argument("--analyze", action="store_true",
+                        help="prints the dependency analysis of the simulation (blocks, cycles, critical path, "
+                             "issues of the schedule) instead of starting it")
 
     args = parser.parse_args()
 
-    c = Scheduler(args.host, args.config_file, args.schedule_file)
-    c.start()
+    if args.analyze:
+        print(analyze(args.config_file, args.schedule_file))
+    else:
+        transport = AMQPTransport(args.host, pipelined=args.pipelined, confirms=args.confirms)
+        c = Scheduler(args.host, args.config_file, args.schedule_file, transport=transport,
+                      lookahead=args.lookahead, cache_dir=args.cache, compact=args.compact,
+                      recorders={args.recorder: args.record} if args.recorder else None,
+                      checkpoint_dir=args.checkpoint_dir, checkpoint_steps=args.checkpoint_steps,
+                      checkpoint_interval=args.checkpoint_interval, resume=args.resume,
+                      shared_memory=args.shared_memory,
+                      peer_to_peer=True if args.peer_to_peer == [] else args.peer_to_peer)
+        print('%d exchanges, %d queues and %d bindings declared in %.3fs'
+              % (len(c.topology.exchanges), len(c.topology.queues), len(c.topology.bindings), c.setup_time))
+        if args.trace:
+            c.tracer = Tracer()
+        writer = None
+        if args.metrics_port is not None or args.metrics_file:
+            c.metrics = MetricsRegistry()
+            if args.metrics_port is not None:
+                c.metrics.serve(args.metrics_port)
+            if args.metrics_file:
+                writer = c.metrics.write_snapshots(args.metrics_file, args.metrics_interval)
+        try:
+            c.start()
+        finally:
+            if args.trace:
+                c.tracer.export(args.trace)
+            if writer is not None:
+                writer.stop()
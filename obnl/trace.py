@@ -0,0 +1,12 @@
+import argparse
+from obnl.impl.tracing import load_trace, analyze_trace
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="analyzes the Chrome trace files written by obnl Tracers")
+    parser.add_argument("trace_files", nargs='+', help="the trace files (e.g. one per process)")
+    parser.add_argument("--top", type=int, default=5, help="number of slowest nodes listed per block")
+
+    args = parser.parse_args()
+
+    print(analyze_trace(load_trace(args.trace_files), args.top))
@@ -11,7 +11,7 @@ setup(name=conf_dict['name'],
       version=conf_dict['release'],
       platforms=[platform.platform()],  # TODO indicate really tested platforms
 
-      packages=find_packages(),
+      packages=find_packages(exclude=['benchmarks']),
       install_requires=conf_dict['required'],
 
       # metadata
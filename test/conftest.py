@@ -0,0 +1,54 @@
+import json
+import time
+
+import pytest
+
+from obnl.impl.transports import LocalBroker
+
+
+@pytest.fixture
+def scenario(tmp_path):
+    """
+    Writes the config and schedule files of a simulation.
+
+    The returned function takes a map of node names to {"inputs": [...], "outputs": [...]},
+    a list of links (node_out, attr_out, node_in, attr_in), the schedule blocks and the time steps,
+    and returns the config file and the schedule file.
+    """
+    def write(nodes, links, blocks, steps):
+        config_file = str(tmp_path / 'config.json')
+        schedule_file = str(tmp_path / 'schedule.json')
+        config = {
+            'nodes': nodes,
+            'links': {'l' + str(i): {'out': {'node': no, 'attr': ao}, 'in': {'node': ni, 'attr': ai}}
+                      for i, (no, ao, ni, ai) in enumerate(links)}
+        }
+        with open(config_file, 'w') as f:
+            json.dump(config, f)
+        with open(schedule_file, 'w') as f:
+            json.dump({'schedule': blocks, 'steps': steps}, f)
+        return config_file, schedule_file
+    return write
+
+
+@pytest.fixture
+def broker():
+    return LocalBroker()
+
+
+def run_until_quit(broker, timeout=None):
+    """
+    Delivers the messages of a LocalBroker until the Scheduler quits.
+
+    :param timeout: the time (in seconds) to wait for messages coming from other threads
+                    (data links outside the broker), None if they all go through the broker
+    """
+    deadline = time.time() + (timeout or 0.)
+    while True:
+        try:
+            broker.run_until_idle()
+        except SystemExit:
+            return
+        if time.time() >= deadline:
+            raise AssertionError('The simulation did not end')
+        time.sleep(0.001)
@@ -0,0 +1,147 @@
+import queue
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+import pika
+import pytest
+
+from obnl.client import ClientNode
+from obnl.impl.topology import Topology
+from obnl.impl.transports import AMQPConnectionPool, AMQPTransport, PublishError, SharedAMQPTransport
+
+
+class MockedTransport(AMQPTransport):
+    """
+    An AMQPTransport on a mocked pika connection and channel.
+    """
+
+    def _open(self, host):
+        return mock.MagicMock(name='connection'), mock.MagicMock(name='channel')
+
+
+class Connection(object):
+    """
+    A blocking connection whose I/O loop runs the callbacks added from any thread.
+    """
+
+    def __init__(self, parameters):
+        self.channels = []
+        self._callbacks = queue.Queue()
+
+    def channel(self):
+        self.channels.append(mock.MagicMock(name='channel'))
+        return self.channels[-1]
+
+    def add_callback_threadsafe(self, callback):
+        self._callbacks.put(callback)
+
+    def process_data_events(self, time_limit=0):
+        assert time_limit is None
+        self._callbacks.get()()
+
+
+def _confirm(transport, method):
+    callback = transport._channel._impl.confirm_delivery.call_args[0][0]
+    callback(SimpleNamespace(method=method))
+
+
+def test_publish():
+    transport = MockedTransport('host')
+    transport.publish('e', 'k', b'body', reply_to='q')
+    transport._channel.publish.assert_called_once()
+    assert transport._channel.publish.call_args[1]['properties'].reply_to == 'q'
+    transport.flush()
+    transport._connection._flush_output.assert_not_called()
+
+
+def test_pipelined():
+    transport = MockedTransport('host', pipelined=True)
+    for i in range(3):
+        transport.publish('e', 'k', b'%d' % i)
+    # buffered on the channel under the blocking one, written at once by flush
+    transport._channel.publish.assert_not_called()
+    assert [c[0][2] for c in transport._channel._impl.basic_publish.call_args_list] == [b'0', b'1', b'2']
+    transport._connection._flush_output.assert_not_called()
+    transport.flush()
+    transport._connection._flush_output.assert_called_once_with()
+
+
+def test_confirms():
+    transport = MockedTransport('host', confirms=True)
+    for i in range(4):
+        transport.publish('e', 'k', b'%d' % i)
+
+    def flush_output(*conditions):
+        # the broker acknowledges the first messages together, then the last one
+        condition, = conditions
+        assert not condition()
+        _confirm(transport, pika.spec.Basic.Ack(delivery_tag=3, multiple=True))
+        assert not condition()
+        _confirm(transport, pika.spec.Basic.Ack(delivery_tag=4))
+        assert condition()
+    transport._connection._flush_output.side_effect = flush_output
+    transport.flush()
+    assert transport._connection._flush_output.call_count == 1
+
+    transport.publish('e', 'k', b'4')
+    transport.publish('e', 'k', b'5')
+
+    def reject(condition):
+        _confirm(transport, pika.spec.Basic.Nack(delivery_tag=6, multiple=True))
+        assert condition()
+    transport._connection._flush_output.side_effect = reject
+    with pytest.raises(PublishError, match='2 messages rejected'):
+        transport.flush()
+    # the rejections are reported once
+    transport._connection._flush_output.side_effect = lambda condition: None
+    transport.flush()
+
+
+def test_provision():
+    transport = MockedTransport('host')
+    topology = Topology()
+    topology.add_binding('e', 'q', 'k')
+    topology.add_queue('r')
+    transport.provision(topology)
+
+    channel = transport._channel._impl
+    channel.exchange_declare.assert_called_once_with(exchange='e', nowait=True)
+    assert [c[1]['queue'] for c in channel.queue_declare.call_args_list] == ['q', 'r']
+    channel.queue_bind.assert_called_once_with(None, 'q', 'e', routing_key='k', nowait=True)
+    # one answer waited for, after the others
+    transport._channel.queue_declare.assert_called_once_with(queue='r', passive=True)
+
+
+def test_pool(monkeypatch):
+    monkeypatch.setattr(pika, 'BlockingConnection', Connection)
+    pool = AMQPConnectionPool('host')
+    nodes = [ClientNode('host', name, ['x'], transport=SharedAMQPTransport(pool)) for name in 'ABC']
+    connection = pool.channel()[0]
+    # one channel per Node on the connection (and the one just opened)
+    assert len(connection.channels) == 4
+
+    threads = threading.active_count()
+    started = [node.start() for node in nodes]
+    # one thread runs the loop of all the Nodes
+    thread, = set(started)
+    assert threading.active_count() == threads + 1
+
+    # a Node quitting from its callback only stops its transport
+    def on_message(ch, method, props, body):
+        assert threading.current_thread() is thread
+        raise SystemExit(0)
+    transport = nodes[0]._node_impl.transport
+    transport.consume('q', on_message)
+    callback = connection.channels[0].basic_consume.call_args[0][0]
+    connection.add_callback_threadsafe(lambda: callback(None, None, None, b''))
+    assert transport.stopped.wait(1)
+    assert thread.is_alive()
+
+    nodes[1]._node_impl.transport.stop()
+    thread.join(0.1)
+    assert thread.is_alive()
+    # stopped from this thread: the loop is woken up and ends
+    nodes[2]._node_impl.transport.stop()
+    thread.join(1)
+    assert not thread.is_alive()
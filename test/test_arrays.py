@@ -0,0 +1,29 @@
+import numpy
+import pytest
+
+from obnl.impl import arrays
+from obnl.impl.arrays import is_array, copy_value, require_numpy
+from obnl.impl.recorder import ColumnStore
+
+
+def test_arrays():
+    value = numpy.arange(3.)
+    assert is_array(value)
+    assert not is_array(1.) and not is_array([1., 2.])
+
+    copy = copy_value(value)
+    value[0] = 10.
+    assert copy.tolist() == [0., 1., 2.]
+    assert copy_value(1.) == 1.
+    require_numpy('Arrays')
+
+
+def test_without_numpy(tmp_path, monkeypatch):
+    monkeypatch.setattr(arrays, 'numpy', None)
+    assert not is_array(numpy.arange(3.))
+    value = numpy.arange(3.)
+    assert copy_value(value) is value
+    with pytest.raises(ImportError, match='Arrays requires NumPy'):
+        require_numpy('Arrays')
+    with pytest.raises(ImportError, match='The ColumnStore requires NumPy'):
+        ColumnStore(str(tmp_path / 'store'), writable=True)
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from obnl.aioclient import AsyncClientNode
+from obnl.impl.node import Node
+from obnl.impl.replay import Replay, StepRecording
+from obnl.impl.aioserver import AsyncScheduler
+from obnl.impl.transports import LocalBroker, LocalTransport
+from obnl.impl.aiotransports import AsyncLocalTransport
+
+
+class Source(AsyncClientNode):
+
+    def __init__(self, name, transport, fail_at=None):
+        super(Source, self).__init__(None, name, output_attributes=['x'], is_first=True, transport=transport)
+        self._fail_at = fail_at
+
+    async def step(self, current_time, time_step):
+        await asyncio.sleep(0)
+        if current_time == self._fail_at:
+            raise ValueError('Step failed')
+        self.update_attribute('x', current_time * 2)
+
+
+class Sink(AsyncClientNode):
+
+    def __init__(self, name, transport):
+        super(Sink, self).__init__(None, name, input_attributes=['x'], transport=transport)
+        self.received = []
+
+    async def step(self, current_time, time_step):
+        self.received.append(self.input_values['x'])
+
+
+async def simulate(scenario, node_factory):
+    config_file, schedule_file = scenario({'S': {'inputs': [], 'outputs': ['x']},
+                                           'R': {'inputs': ['x'], 'outputs': []}},
+                                          [('S', 'x', 'R', 'x')], [['S'], ['R']], [1., 1., 1.])
+    broker = LocalBroker()
+    scheduler = AsyncScheduler(None, config_file, schedule_file, transport=AsyncLocalTransport(broker))
+    node = node_factory(AsyncLocalTransport(broker))
+    sink = Sink('R', AsyncLocalTransport(broker))
+    await asyncio.wait_for(asyncio.gather(scheduler.start(), node.start(), sink.start()), 10)
+    return node, sink
+
+
+def test_step_failure(scenario):
+    # start raises the error of the step instead of waiting forever
+    with pytest.raises(ValueError, match='Step failed'):
+        asyncio.run(simulate(scenario, lambda transport: Source('S', transport, fail_at=2.)))
+
+
+def test_replay(scenario, tmp_path):
+    path = str(tmp_path / 'S.rec')
+
+    def recorded(transport):
+        node = Source('S', transport)
+        node._node_impl.recording = StepRecording(path)
+        return node
+    node, sink = asyncio.run(simulate(scenario, recorded))
+    node._node_impl.recording.close()
+    assert sink.received == [2., 4., 6.]
+
+    replay = Replay(path)
+    broker = LocalBroker()
+    broker.declare_exchange(Node.DATA_NODE_EXCHANGE + replay.name)
+    result = replay.run(Source(replay.name, LocalTransport(broker)))
+    assert result.ok
+    assert result.steps == 3
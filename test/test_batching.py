@@ -0,0 +1,55 @@
+import pytest
+
+from conftest import run_until_quit
+
+from obnl.client import ClientNode
+from obnl.impl.server import Scheduler
+from obnl.impl.transports import LocalBroker, LocalTransport
+
+OUTPUTS = ['x', 'y', 'z']
+
+
+class Source(ClientNode):
+
+    def step(self, current_time, time_step):
+        for i, attr in enumerate(self.output_attributes):
+            self.update_attribute(attr, current_time + i)
+
+
+class Sink(ClientNode):
+
+    def __init__(self, name, input_attributes, transport, batch):
+        super(Sink, self).__init__(None, name, input_attributes, transport=transport, batch=batch)
+        self.received = []
+
+    def step(self, current_time, time_step):
+        self.received.append(dict(self.input_values))
+
+
+def _run(scenario, broker, batch, compact, inputs=OUTPUTS):
+    nodes = {'S': {'inputs': [], 'outputs': OUTPUTS}, 'R': {'inputs': inputs, 'outputs': []}}
+    links = [('S', attr, 'R', attr) for attr in inputs]
+    config_file, schedule_file = scenario(nodes, links, [['S'], ['R']], [1., 1., 1.])
+    Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker), compact=compact)
+    sink = Sink('R', inputs, LocalTransport(broker), batch)
+    Source(None, 'S', [], OUTPUTS, transport=LocalTransport(broker), batch=batch)
+    run_until_quit(broker)
+    return sink
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_batching(scenario, broker, compact):
+    expected = [{'x': t, 'y': t + 1, 'z': t + 2} for t in (1., 2., 3.)]
+    assert _run(scenario, broker, True, compact).received == expected
+    unbatched = LocalBroker()
+    assert _run(scenario, unbatched, False, compact).received == expected
+    # one message per step instead of one per attribute
+    assert unbatched.published - broker.published == 2 * 3
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_unlinked_attributes(scenario, broker, compact):
+    sink = _run(scenario, broker, True, compact, inputs=['y'])
+    assert sink.received == [{'y': t + 1} for t in (1., 2., 3.)]
+    # the batch holds x and z too, they are not recorded as received
+    assert set(sink._node_impl._received_times) == {'y'}
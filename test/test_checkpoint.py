@@ -0,0 +1,72 @@
+import pytest
+
+from conftest import run_until_quit
+
+from obnl.client import ClientNode
+from obnl.impl.server import Scheduler
+from obnl.impl.transports import LocalBroker, LocalTransport
+
+STEPS = 6
+
+LINKS = [('A', 'a', 'B', 'a'), ('B', 'b', 'C', 'b'), ('C', 'c', 'A', 'c')]
+
+
+class Counter(ClientNode):
+    """
+    Logs its inputs at each step and sends a value computed from them and from its state.
+    """
+
+    def __init__(self, name, input_attributes, output_attributes, transport, log, is_first, batch):
+        super(Counter, self).__init__(None, name, input_attributes, output_attributes, is_first=is_first,
+                                      transport=transport, batch=batch)
+        self._log = log
+        self.count = 0
+
+    def step(self, current_time, time_step):
+        self.count += 1
+        inputs = sorted(self.input_values.items())
+        self._log.append((current_time, self.name, inputs))
+        total = sum(value for _, value in inputs)
+        for attr in self.output_attributes:
+            self.update_attribute(attr, total / 2. + current_time + self.count)
+
+    def save(self):
+        return self.count
+
+    def restore(self, state):
+        self.count = state
+
+
+def _simulate(scenario, directory, compact, batch, resume=False):
+    nodes = {}
+    for node_out, attr_out, node_in, attr_in in LINKS:
+        nodes.setdefault(node_out, {'inputs': [], 'outputs': []})['outputs'].append(attr_out)
+        nodes.setdefault(node_in, {'inputs': [], 'outputs': []})['inputs'].append(attr_in)
+    config_file, schedule_file = scenario(nodes, LINKS, [['A'], ['B'], ['C']], [1.] * STEPS)
+
+    broker = LocalBroker()
+    log = []
+    Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker), compact=compact,
+              checkpoint_dir=directory, checkpoint_steps=2, resume=resume)
+    counters = []
+    for name in sorted(nodes, reverse=True):
+        counters.append(Counter(name, nodes[name]['inputs'], nodes[name]['outputs'], LocalTransport(broker), log,
+                                name == 'A', batch))
+        if name == 'B':
+            # A starts late: the restored Nodes send it their last values before its SchedulerConnection
+            broker.run_until_idle()
+    run_until_quit(broker)
+    return sorted(log), sorted(counter.count for counter in counters)
+
+
+@pytest.mark.parametrize('batch', [False, True])
+@pytest.mark.parametrize('compact', [False, True])
+def test_resume(scenario, tmp_path, compact, batch):
+    directory = str(tmp_path / 'checkpoints')
+    log, counts = _simulate(scenario, directory, compact, batch)
+    assert counts == [STEPS] * 3
+
+    # the simulation resumes after the latest checkpoint, written at the end of the 5th step
+    resumed, counts = _simulate(scenario, directory, compact, batch, resume=True)
+    assert counts == [STEPS] * 3
+    assert resumed == [entry for entry in log if entry[0] > 5.]
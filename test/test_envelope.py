@@ -0,0 +1,23 @@
+import pytest
+
+from obnl.impl.envelope import COMPACT_PREFIX, encode, decode
+from obnl.impl.message import MetaMessage, NextStep, AttributeMessage
+
+
+@pytest.mark.parametrize('sender_id', [0, 7])
+def test_round_trip(sender_id):
+    next_step = NextStep()
+    next_step.current_time = 2.
+    next_step.time_step = .5
+    next_step.updates['A'] = 1.5
+    attribute = AttributeMessage()
+    attribute.simulation_time = 2.
+    attribute.attribute_name = 'x'
+    attribute.attribute_value = 3.
+
+    for message in (next_step, attribute):
+        body = encode(message, 'A', sender_id, MetaMessage.STEP)
+        assert (body[:1] == COMPACT_PREFIX) == bool(sender_id)
+        assert decode(body, {7: 'A'}) == ('A', message)
+    # the compact envelope does not carry the sender name nor the type URL
+    assert len(encode(attribute, 'A', 7)) < len(encode(attribute, 'A'))
@@ -0,0 +1,53 @@
+from obnl.impl.graph import DependencyGraph
+
+
+def _graph(nodes, edges):
+    return DependencyGraph(nodes, [(node_out, 'o', node_in, 'i') for node_out, node_in in edges])
+
+
+def test_chain():
+    graph = _graph(['D', 'C', 'B', 'A'], [('A', 'B'), ('B', 'C'), ('A', 'D')])
+    # reverse topological order
+    components = graph.strongly_connected_components()
+    assert all(len(c) == 1 for c in components)
+    order = [c[0] for c in components]
+    assert order.index('C') < order.index('B') < order.index('A')
+    assert graph.cycles() == []
+    assert graph.delayed_edges() == set()
+    assert graph.blocks() == [['A'], ['D', 'B'], ['C']]
+    assert graph.critical_path() == (['A', 'B', 'C'], 3)
+    assert graph.critical_path({'D': 5}) == (['A', 'D'], 6)
+
+
+def test_delayed_cycle():
+    graph = _graph(['A', 'B', 'C', 'E'], [('A', 'B'), ('B', 'C'), ('C', 'A'), ('C', 'E'), ('E', 'E')])
+    assert sorted(map(sorted, graph.cycles())) == [['A', 'B', 'C'], ['E']]
+    # the back edges of the search from A are delayed: A uses the value C sent at the previous step
+    assert graph.delayed_edges() == {('C', 'A'), ('E', 'E')}
+    assert graph.blocks() == [['A'], ['B'], ['C'], ['E']]
+    assert graph.validate(graph.blocks()) == []
+    assert 'delayed link: C -> A (A uses the previous step value)' in graph.report()
+
+
+def test_broken_schedules():
+    graph = _graph(['A', 'B', 'C'], [('A', 'B'), ('B', 'C'), ('C', 'A')])
+    # a cycle inside a block is not broken: its Nodes wait for each other
+    issues = graph.validate([['A', 'B', 'C']])
+    assert len(issues) == 3
+    assert issues[0].startswith('Link A.o -> B.i is inside block 0: B waits for the value A sends')
+
+    graph = _graph(['A', 'B', 'F'], [('A', 'B')])
+    assert graph.validate([['B'], ['A', 'F']]) == [
+        'Link A.o -> B.i goes backward (block 1 to 0) but is not in a cycle: B uses the value of the previous step']
+    assert graph.validate([['A', 'B']]) == ['Node F is not scheduled',
+                                            'Link A.o -> B.i is inside block 0: B waits for the value A sends '
+                                            'at the same step (they do not step in parallel)']
+    assert graph.validate([['A'], ['B', 'F', 'G']]) == ['Node G is scheduled but not defined']
+
+
+def test_minimal_blocks():
+    graph = _graph(['A', 'B', 'C', 'D'], [('A', 'B'), ('A', 'C'), ('B', 'D'), ('C', 'D')])
+    assert len(graph.blocks()) == 3
+    assert graph.validate(graph.blocks()) == []
+    assert graph.validate([['A'], ['B'], ['C'], ['D']]) == ['The schedule has 4 blocks, 3 are enough']
+    assert graph.report([['A'], ['B'], ['C'], ['D']]).endswith('issue: The schedule has 4 blocks, 3 are enough')
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from obnl.impl.launcher import Launcher
+
+NODES = {'C': {'inputs': ['t1', 't2'], 'outputs': []},
+         'A': {'inputs': [], 'outputs': ['ta']},
+         'B': {'inputs': [], 'outputs': ['tb']}}
+LINKS = [('A', 'ta', 'C', 't1'), ('B', 'tb', 'C', 't2')]
+
+
+class Broken(object):
+
+    def __init__(self, host, name, input_attributes, output_attributes, is_first):
+        raise ValueError('Cannot create ' + name)
+
+
+@pytest.mark.parametrize('blocks', [None, 'auto', [['A', 'B'], ['C']]])
+def test_blocks(scenario, blocks):
+    config_file, schedule_file = scenario(NODES, LINKS, blocks, [1.])
+    if blocks is None:
+        with open(schedule_file, 'w') as f:
+            json.dump({'steps': [1.]}, f)
+
+    launcher = Launcher(None, config_file, schedule_file, workers=2, default_class='test_launcher:Broken')
+    # A and B step in parallel
+    assert sorted(map(sorted, launcher.assignment)) == [['A', 'C'], ['B']]
+
+
+def test_worker_failure(scenario, monkeypatch):
+    monkeypatch.setattr(Launcher, 'POLL_INTERVAL', 0.05)
+    config_file, schedule_file = scenario(NODES, LINKS, [['A', 'B'], ['C']], [1.])
+
+    launcher = Launcher(None, config_file, schedule_file, workers=2, default_class='test_launcher:Broken')
+    with pytest.raises(ValueError, match='obnl-worker-'):
+        launcher.run()
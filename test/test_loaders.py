@@ -0,0 +1,99 @@
+import os
+import json
+
+import pytest
+
+from obnl.impl import loaders
+from obnl.impl.loaders import JSONLoader
+from obnl.impl.cache import TopologyCache
+from obnl.impl.server import Scheduler
+from obnl.impl.transports import LocalTransport
+
+CONFIG = {
+    # the links come first: the streaming loader reads the nodes before
+    'links': {
+        'l1': {'out': {'node': 'A', 'attr': 'x'}, 'in': {'node': 'P', 'attr': 't[2]'}},
+        'l0': {'out': {'node': 'P', 'attr': 'T[0:3]'}, 'in': {'node': 'B', 'attr': 'y'}},
+    },
+    'nodes': {
+        'P': {'inputs': ['t'], 'outputs': ['T']},
+        'A': {'outputs': ['x']},
+        'B': {'inputs': ['y'], 'outputs': []},
+    },
+}
+
+
+def _load(path):
+    loader = JSONLoader(None, path)
+    return loader.get_nodes(), loader.get_links(), loader.get_attributes()
+
+
+def test_streaming(tmp_path, monkeypatch):
+    pytest.importorskip('ijson')
+    path = str(tmp_path / 'config.json')
+    with open(path, 'w') as f:
+        json.dump(CONFIG, f)
+
+    streamed = _load(path)
+    monkeypatch.setattr(loaders, 'ijson', None)
+    assert _load(path) == streamed
+    assert streamed == (['P', 'A', 'B'], [('A', 'x', 'P', 't[2]'), ('P', 'T[0:3]', 'B', 'y')],
+                        {'P': (['t'], ['T']), 'A': ([], ['x']), 'B': (['y'], [])})
+
+
+@pytest.fixture
+def files(scenario):
+    nodes = {'A': {'inputs': [], 'outputs': ['x']}, 'B': {'inputs': ['x'], 'outputs': []}}
+    return scenario(nodes, [('A', 'x', 'B', 'x')], 'auto', [1., 1.])
+
+
+def _scheduler(files, broker, cache_dir):
+    return Scheduler(None, *files, transport=LocalTransport(broker), cache_dir=cache_dir)
+
+
+def test_cache(files, broker, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    cache = TopologyCache(cache_dir)
+    assert cache.load(*files) is None
+    compiled = _scheduler(files, broker, cache_dir)
+    assert cache.load(*files).blocks == [['A'], ['B']]
+
+    # an unchanged simulation is not loaded again
+    def compile(self, config_file, schedule_file):
+        raise AssertionError('Compiled again')
+    with monkeypatch.context() as patch:
+        patch.setattr(Scheduler, '_compile', compile)
+        cached = _scheduler(files, broker, cache_dir)
+    assert cached.topology.bindings == compiled.topology.bindings
+    assert cached.graph.links == compiled.graph.links
+
+    # the key is the content of the files, not their size or date
+    config_file, schedule_file = files
+    with open(config_file) as f:
+        config = f.read()
+    key = cache.key(*files)
+    with open(config_file, 'w') as f:
+        f.write(config.replace('"x"', '"z"'))
+    assert len(config.replace('"x"', '"z"')) == len(config)
+    assert cache.key(*files) != key
+    assert cache.load(*files) is None
+    assert _scheduler(files, broker, cache_dir).graph.links == [('A', 'z', 'B', 'z')]
+    assert cache.load(*files) is not None
+
+
+@pytest.mark.parametrize('damage', ['truncate', 'garbage', 'empty'])
+def test_corrupt_cache(files, broker, tmp_path, damage):
+    cache_dir = str(tmp_path / 'cache')
+    cache = TopologyCache(cache_dir)
+    _scheduler(files, broker, cache_dir)
+    path = os.path.join(cache_dir, cache.key(*files) + '.topology')
+    with open(path, 'rb') as f:
+        data = f.read()
+    data = {'truncate': data[:len(data) // 2], 'garbage': data[:20] + b'\xff' * 20 + data[40:], 'empty': b''}[damage]
+    with open(path, 'wb') as f:
+        f.write(data)
+
+    assert cache.load(*files) is None
+    # rebuilt and cached again
+    assert _scheduler(files, broker, cache_dir).graph.links == [('A', 'x', 'B', 'x')]
+    assert cache.load(*files) is not None
@@ -0,0 +1,67 @@
+import pytest
+
+from conftest import run_until_quit
+
+from obnl.client import ClientNode
+from obnl.impl.server import Scheduler
+from obnl.impl.transports import LocalBroker, LocalTransport
+
+
+class Model(ClientNode):
+    """
+    Logs its inputs at each step and sends a value computed from them.
+    """
+
+    def __init__(self, name, input_attributes, output_attributes, transport, log, is_first):
+        super(Model, self).__init__(None, name, input_attributes, output_attributes, is_first=is_first,
+                                    transport=transport)
+        self._log = log
+
+    def step(self, current_time, time_step):
+        inputs = sorted(self.input_values.items())
+        self._log.append((current_time, self.name, inputs))
+        total = sum(value for _, value in inputs)
+        for i, attr in enumerate(self.output_attributes):
+            self.update_attribute(attr, total / 2. + current_time + i)
+
+
+def _simulate(scenario, links, blocks, lookahead, first=()):
+    nodes = {}
+    for node_out, attr_out, node_in, attr_in in links:
+        nodes.setdefault(node_out, {'inputs': [], 'outputs': []})['outputs'].append(attr_out)
+        nodes.setdefault(node_in, {'inputs': [], 'outputs': []})['inputs'].append(attr_in)
+    config_file, schedule_file = scenario(nodes, links, blocks, [1.] * 5)
+
+    broker = LocalBroker()
+    log = []
+    Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker), lookahead=lookahead)
+    # the consumers are created first so that they get their steps before their producers
+    for name in reversed(sorted(nodes)):
+        Model(name, nodes[name]['inputs'], nodes[name]['outputs'], LocalTransport(broker), log, name in first)
+    run_until_quit(broker)
+    return sorted(log)
+
+
+SCENARIOS = {
+    'chain': ([('A', 'a', 'B', 'a'), ('B', 'b', 'C', 'b')], [['A'], ['B'], ['C']], ()),
+    # the receiver of a link going backward has no value at the first step: it is first
+    'backward': ([('C', 'c', 'A', 'c'), ('A', 'a', 'B', 'a')], [['A'], ['B'], ['C']], ('A',)),
+    'cycle': ([('A', 'a', 'B', 'a'), ('B', 'b', 'A', 'b'), ('B', 'b2', 'C', 'b2')], [['A'], ['B'], ['C']], ('A',)),
+    'same_block': ([('A', 'a', 'B', 'a'), ('B', 'b', 'C', 'b'), ('D', 'd', 'C', 'd')], [['A'], ['B', 'C', 'D']], ()),
+    'same_block_cycle': ([('A', 'a', 'B', 'a'), ('B', 'b', 'A', 'b'), ('B', 'b2', 'C', 'b2')],
+                         [['A', 'B'], ['C']], ('A',)),
+}
+
+
+@pytest.mark.parametrize('name', sorted(SCENARIOS))
+def test_same_results(scenario, name):
+    links, blocks, first = SCENARIOS[name]
+    barrier = _simulate(scenario, links, blocks, False, first)
+    assert len(barrier) == 5 * len({node for link in links for node in link[::2]})
+    assert _simulate(scenario, links, blocks, True, first) == barrier
+
+
+def test_same_block_value(scenario):
+    # inside a block, the receiver gets the value of the same step
+    log = _simulate(scenario, [('A', 'a', 'B', 'a')], [['A', 'B']], True)
+    assert [inputs for _, name, inputs in log if name == 'B'] == [[('a', t)] for t in (1., 2., 3., 4., 5.)]
@@ -0,0 +1,116 @@
+import json
+import queue
+import threading
+from urllib.request import urlopen
+
+import pytest
+
+from conftest import run_until_quit
+
+from obnl.client import ClientNode
+from obnl.impl.launcher import run_worker, worker_file
+from obnl.impl.metrics import MetricsRegistry
+from obnl.impl.server import Scheduler
+from obnl.impl.transports import LocalBroker, LocalTransport
+
+NODES = {'S': {'inputs': [], 'outputs': ['x']}, 'R': {'inputs': ['x'], 'outputs': []}}
+LINKS = [('S', 'x', 'R', 'x')]
+
+
+class Source(ClientNode):
+
+    def step(self, current_time, time_step):
+        self.update_attribute('x', current_time)
+
+
+class Sink(ClientNode):
+
+    def step(self, current_time, time_step):
+        pass
+
+
+class LocalSource(Source):
+    """
+    A Source on the default LocalBroker, as created by a worker.
+    """
+
+    def __init__(self, host, name, input_attributes, output_attributes, is_first):
+        super(LocalSource, self).__init__(host, name, input_attributes, output_attributes, is_first,
+                                          transport=LocalTransport())
+
+
+class LocalSink(Sink):
+
+    def __init__(self, host, name, input_attributes, output_attributes, is_first):
+        super(LocalSink, self).__init__(host, name, input_attributes, output_attributes, is_first,
+                                        transport=LocalTransport())
+
+
+@pytest.fixture
+def registry(scenario, broker):
+    config_file, schedule_file = scenario(NODES, LINKS, [['S'], ['R']], [1.] * 3)
+    registry = MetricsRegistry()
+    scheduler = Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker))
+    scheduler.metrics = registry
+    Sink(None, 'R', ['x'], transport=LocalTransport(broker)).metrics = registry
+    Source(None, 'S', [], ['x'], transport=LocalTransport(broker)).metrics = registry
+    run_until_quit(broker)
+    return registry
+
+
+def test_snapshot(registry, tmp_path):
+    path = str(tmp_path / 'metrics.json')
+    registry.write_snapshots(path, 60.).stop()
+    with open(path) as f:
+        snapshot = json.load(f)
+    assert snapshot['steps'] == 3 and snapshot['simulation_time'] == 3.
+    assert {name: values['steps'] for name, values in snapshot['nodes'].items()} == {'scheduler': 0, 'S': 3, 'R': 3}
+    assert snapshot['nodes']['S']['messages_out'] > 3
+    assert snapshot['nodes']['R']['messages_in'] > 3
+    assert {block: barrier['count'] for block, barrier in snapshot['barriers'].items()} == {'0': 3, '1': 3}
+    assert snapshot['barriers']['0']['buckets'][-1] == [None, 3]
+
+
+def test_endpoint(registry):
+    server = registry.serve()
+    try:
+        with urlopen('http://127.0.0.1:%d/metrics' % server.server_address[1], timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain')
+            lines = response.read().decode('utf-8').splitlines()
+    finally:
+        server.shutdown()
+    assert 'obnl_steps_total 3' in lines
+    assert 'obnl_node_steps_total{node="R"} 3' in lines
+    assert 'obnl_barrier_seconds_count{block="1"} 3' in lines
+    assert 'obnl_barrier_seconds_bucket{block="1",le="+Inf"} 3' in lines
+
+
+# the Nodes quit their thread with SystemExit
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_worker(scenario, tmp_path, monkeypatch):
+    # the nodes of a worker have the registry of the worker
+    monkeypatch.setattr(LocalBroker, '_default', LocalBroker())
+    config_file, schedule_file = scenario(NODES, LINKS, [['S'], ['R']], [1.] * 3)
+    scheduler = Scheduler(None, config_file, schedule_file, transport=LocalTransport())
+
+    def start():
+        try:
+            scheduler.start()
+        except SystemExit:
+            pass
+    thread = threading.Thread(target=start)
+    thread.start()
+    reports = queue.Queue()
+    path = str(tmp_path / 'metrics.json')
+    run_worker(1, None, [('test_metrics:LocalSource', 'S', [], ['x'], False),
+                         ('test_metrics:LocalSink', 'R', ['x'], [], False)], None, reports, (None, path, 60.))
+    thread.join(5)
+    assert not thread.is_alive()
+
+    assert reports.get_nowait()['nodes'] == ['S', 'R']
+    assert worker_file(path, 1) == str(tmp_path / 'metrics.1.json')
+    with open(worker_file(path, 1)) as f:
+        snapshot = json.load(f)
+    # the steps are counted by the registry of the Scheduler
+    assert snapshot['steps'] == 0
+    assert {name: values['steps'] for name, values in snapshot['nodes'].items()} == {'S': 3, 'R': 3}
@@ -0,0 +1,157 @@
+import time
+import socket
+
+import pytest
+
+from conftest import run_until_quit
+
+from obnl.client import ClientNode
+from obnl.impl.node import Node
+from obnl.impl.peer import PeerTransport, parse_endpoint
+from obnl.impl.server import Scheduler
+from obnl.impl.message import DataLink
+from obnl.impl.transports import LocalBroker, LocalTransport, PublishError
+
+
+def _frame(body):
+    return len(body).to_bytes(4, 'little') + body
+
+
+def _wait(broker, condition, timeout=10.):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'Timed out'
+        broker.run_until_idle()
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def receiver(broker, tmp_path):
+    """
+    A PeerTransport listening for the data of the Node R: the received messages are kept
+    as (sender exchange, body).
+    """
+    transport = PeerTransport(LocalTransport(broker), listen='unix://' + str(tmp_path / 'R.sock'))
+    transport.declare_queue(Node.DATA_NODE_QUEUE + 'R')
+    transport.received = []
+    transport.consume(Node.DATA_NODE_QUEUE + 'R',
+                      lambda ch, method, props, body: transport.received.append((method.exchange, body)))
+    transport.data_endpoint('R')
+    yield transport
+    transport.close()
+
+
+def test_endpoints():
+    assert parse_endpoint('tcp://localhost:5000') == (socket.AF_INET, ('localhost', 5000))
+    assert parse_endpoint('tcp://[::1]:5000') == (socket.AF_INET, ('::1', 5000))
+    assert parse_endpoint('unix:///tmp/n.sock') == (socket.AF_UNIX, '/tmp/n.sock')
+    for endpoint in ('tcp://localhost', 'udp://localhost:5000', 'unix://'):
+        with pytest.raises(ValueError):
+            parse_endpoint(endpoint)
+
+
+def test_partial_frames(broker, receiver):
+    sender = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sender.connect(parse_endpoint(receiver.endpoint)[1])
+    data = _frame(b'S') + _frame(b'first') + _frame(b'') + _frame(b'x' * 100000)
+    # one byte at a time for the headers, so that the reader gets them in pieces
+    for i in range(0, 20):
+        sender.sendall(data[i:i + 1])
+        time.sleep(0.001)
+    sender.sendall(data[20:])
+    _wait(broker, lambda: len(receiver.received) == 3)
+    # the first frame names the sender, it is not delivered
+    exchange = Node.DATA_NODE_EXCHANGE + 'S'
+    assert receiver.received == [(exchange, b'first'), (exchange, b''), (exchange, b'x' * 100000)]
+    sender.close()
+
+
+def _sender(broker, receiver, name):
+    transport = PeerTransport(LocalTransport(broker))
+    transport.declare_exchange(Node.DATA_NODE_EXCHANGE + name)
+    transport.open_data_links(name, '', [DataLink(node='R', attributes=['x'], endpoint=receiver.endpoint)], [], [])
+    return transport
+
+
+def test_reconnect(broker, receiver):
+    exchange = Node.DATA_NODE_EXCHANGE + 'S'
+    sender = _sender(broker, receiver, 'S')
+    sender.publish(exchange, Node.DATA_NODE_EXCHANGE + 'x', b'1')
+    _wait(broker, lambda: len(receiver.received) == 1)
+    sender.close()
+
+    # a sender started again connects again, another one has its own connection
+    sender = _sender(broker, receiver, 'S')
+    other = _sender(broker, receiver, 'T')
+    sender.publish(exchange, Node.DATA_NODE_EXCHANGE + 'x', b'2')
+    other.publish(Node.DATA_NODE_EXCHANGE + 'T', Node.DATA_NODE_EXCHANGE + 'x', b'3')
+    # not linked: goes to the wrapped transport
+    sender.publish(exchange, Node.DATA_NODE_EXCHANGE + 'y', b'4')
+    _wait(broker, lambda: len(receiver.received) == 3)
+    assert sorted(receiver.received) == [(exchange, b'1'), (exchange, b'2'), (Node.DATA_NODE_EXCHANGE + 'T', b'3')]
+    sender.close()
+    other.close()
+
+
+def test_close(broker, receiver):
+    path = parse_endpoint(receiver.endpoint)[1]
+    sender = _sender(broker, receiver, 'S')
+    receiver.close()
+    # the listener is removed, the data links to it are broken
+    with pytest.raises(OSError):
+        socket.socket(socket.AF_UNIX, socket.SOCK_STREAM).connect(path)
+    with pytest.raises(PublishError):
+        for _ in range(100):
+            sender.publish(Node.DATA_NODE_EXCHANGE + 'S', Node.DATA_NODE_EXCHANGE + 'x', b'x' * 1000)
+            time.sleep(0.001)
+    sender.close()
+
+
+class Source(ClientNode):
+
+    def step(self, current_time, time_step):
+        self.update_attribute('x', current_time * 2)
+        self.update_attribute('y', current_time * 3)
+
+
+class Sink(ClientNode):
+
+    def __init__(self, name, transport, batch):
+        super(Sink, self).__init__(None, name, ['x', 'y'], transport=transport, batch=batch)
+        self.received = []
+
+    def step(self, current_time, time_step):
+        self.received.append(dict(self.input_values))
+
+
+def _simulate(scenario, broker, peer_to_peer, compact, batch):
+    nodes = {'S': {'inputs': [], 'outputs': ['x', 'y']}, 'R': {'inputs': ['x', 'y'], 'outputs': []}}
+    config_file, schedule_file = scenario(nodes, [('S', 'x', 'R', 'x'), ('S', 'y', 'R', 'y')],
+                                          [['S'], ['R']], [1.] * 5)
+    Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker), compact=compact,
+              peer_to_peer=peer_to_peer)
+
+    def transport():
+        if peer_to_peer:
+            return PeerTransport(LocalTransport(broker))
+        return LocalTransport(broker)
+    sink = Sink('R', transport(), batch)
+    source = Source(None, 'S', [], ['x', 'y'], transport=transport(), batch=batch)
+    try:
+        run_until_quit(broker, timeout=10.)
+    finally:
+        for node in (source, sink):
+            if peer_to_peer:
+                node._node_impl.transport.close()
+    return sink.received
+
+
+@pytest.mark.parametrize('compact', [False, True])
+@pytest.mark.parametrize('batch', [False, True])
+def test_simulation(scenario, broker, compact, batch):
+    plain = LocalBroker()
+    expected = _simulate(scenario, plain, None, compact, batch)
+    assert expected == [{'x': t * 2, 'y': t * 3} for t in (1., 2., 3., 4., 5.)]
+    assert _simulate(scenario, broker, True, compact, batch) == expected
+    # the data went through the direct connection
+    assert plain.published - broker.published == (5 if batch else 10)
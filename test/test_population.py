@@ -0,0 +1,88 @@
+import numpy
+import pytest
+
+from conftest import run_until_quit
+
+from obnl.client import ClientNode
+from obnl.population import PopulationNode
+from obnl.impl.server import Scheduler
+from obnl.impl.message import SchedulerConnection
+from obnl.impl.transports import LocalTransport
+
+
+class Weather(ClientNode):
+
+    def step(self, current_time, time_step):
+        self.update_attribute('t_out', numpy.array([current_time, current_time + .5]))
+        self.update_attribute('wind', current_time * 10)
+
+
+class Buildings(PopulationNode):
+
+    def __init__(self, name, size, input_attributes, transport, batch):
+        super(Buildings, self).__init__(None, name, size, input_attributes, transport=transport, batch=batch)
+        self.received = []
+
+    def step(self, current_time, time_step):
+        self.received.append(self.input_values['t_ext'].tolist())
+
+
+class Probe(ClientNode):
+
+    def __init__(self, name, input_attributes, transport, batch):
+        super(Probe, self).__init__(None, name, input_attributes, transport=transport, batch=batch)
+        self.received = []
+
+    def step(self, current_time, time_step):
+        self.received.append(dict(self.input_values))
+
+
+@pytest.mark.parametrize('batch', [False, True])
+@pytest.mark.parametrize('compact', [False, True])
+def test_fan_out(scenario, broker, batch, compact):
+    # one output of the weather feeds two slices of the population and two inputs of the probe
+    nodes = {'W': {'inputs': [], 'outputs': ['t_out', 'wind']},
+             'P': {'inputs': ['t_ext'], 'outputs': []},
+             'R': {'inputs': ['w1', 'w2'], 'outputs': []}}
+    links = [('W', 't_out', 'P', 't_ext[0:2]'), ('W', 't_out', 'P', 't_ext[2:4]'),
+             ('W', 'wind', 'R', 'w1'), ('W', 'wind', 'R', 'w2')]
+    config_file, schedule_file = scenario(nodes, links, [['W'], ['P', 'R']], [1., 1.])
+
+    Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker), compact=compact)
+    Weather(None, 'W', [], ['t_out', 'wind'], transport=LocalTransport(broker), batch=batch)
+    population = Buildings('P', 4, ['t_ext'], LocalTransport(broker), batch)
+    probe = Probe('R', ['w1', 'w2'], LocalTransport(broker), batch)
+    run_until_quit(broker)
+
+    assert population.received == [[1., 1.5, 1., 1.5], [2., 2.5, 2., 2.5]]
+    assert probe.received == [{'w1': 10., 'w2': 10.}, {'w1': 20., 'w2': 20.}]
+
+
+def test_older_connection(scenario, broker):
+    nodes = {'W': {'inputs': [], 'outputs': ['t_out', 'wind']},
+             'P': {'inputs': ['t_ext'], 'outputs': []},
+             'R': {'inputs': ['w1', 'w2'], 'outputs': []}}
+    links = [('W', 't_out', 'P', 't_ext[0:2]'), ('W', 'wind', 'R', 'w1'), ('W', 'wind', 'R', 'w2')]
+    config_file, schedule_file = scenario(nodes, links, [['W'], ['P', 'R']], [1.])
+    scheduler = Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker))
+    sent = []
+    scheduler.reply_to = lambda reply_to, message: sent.append(message)
+    scheduler._send_scheduler_connection('R', 'q')
+    sc, = sent
+    assert {attr: list(targets.attributes) for attr, targets in sc.attribute_targets.items()} == {'wind': ['w1', 'w2']}
+    # a Node older than attribute_targets keeps one input per sender attribute
+    assert dict(sc.attribute_links) == {'wind': 'w2'}
+
+    # a Node connected by a scheduler older than attribute_targets
+    probe = Probe('R', ['w1', 'w2'], LocalTransport(broker), False)
+    sc = SchedulerConnection()
+    sc.attribute_links['wind'] = 'w1'
+    probe._node_impl._on_scheduler_connection('scheduler', sc, None)
+    assert probe._node_impl._links == {'wind': ('w1',)}
+
+    population = Buildings('P', 4, ['t_ext'], LocalTransport(broker), False)
+    sc = SchedulerConnection()
+    sc.attribute_links['t_out'] = 't_ext[0:2]'
+    population._node_impl._on_scheduler_connection('scheduler', sc, None)
+    assert population._node_impl._links == {'t_out': ('t_ext[0:2]',)}
+    assert population._node_impl._required_inputs == {'t_ext[0:2]'}
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from conftest import run_until_quit
+
+from obnl.client import ClientNode
+from obnl.impl.server import Scheduler
+from obnl.impl.transports import LocalTransport
+
+
+class Model(ClientNode):
+    """
+    Logs its time steps and inputs, and sends its current time.
+    """
+
+    def __init__(self, name, input_attributes, output_attributes, transport, log):
+        super(Model, self).__init__(None, name, input_attributes, output_attributes, transport=transport)
+        self._log = log
+
+    def step(self, current_time, time_step):
+        self._log.append((current_time, self.name, time_step, dict(self.input_values)))
+        for attr in self.output_attributes:
+            self.update_attribute(attr, current_time)
+
+
+def _scenario(scenario, blocks, periods, offsets):
+    nodes = {'A': {'inputs': [], 'outputs': ['a']}, 'B': {'inputs': ['a'], 'outputs': []}}
+    config_file, schedule_file = scenario(nodes, [('A', 'a', 'B', 'a')], blocks, [1.] * 6)
+    with open(schedule_file) as f:
+        schedule = json.load(f)
+    schedule.update(periods=periods, offsets=offsets)
+    with open(schedule_file, 'w') as f:
+        json.dump(schedule, f)
+    return config_file, schedule_file
+
+
+def test_rates(scenario, broker):
+    config_file, schedule_file = _scenario(scenario, [['A'], ['B']], {'A': 2., 'B': 3.}, {'B': 1.})
+    Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker))
+    log = []
+    Model('B', ['a'], [], LocalTransport(broker), log)
+    Model('A', [], ['a'], LocalTransport(broker), log)
+    run_until_quit(broker)
+
+    # A is due at 0, 2, 4, 6 (from time 1), B at 1 and 4: B samples the latest value of A
+    assert log == [(1., 'A', 1., {}), (1., 'B', 1., {'a': 1.}), (2., 'A', 1., {}),
+                   (4., 'A', 2., {}), (4., 'B', 3., {'a': 4.}), (6., 'A', 2., {})]
+
+
+@pytest.mark.parametrize('blocks', [[['A'], ['B']], [['B'], ['A']]])
+def test_missing_first_value(scenario, broker, blocks):
+    config_file, schedule_file = _scenario(scenario, blocks, {'A': 2.}, {'A': 2.})
+    # A first steps at time 2, B steps at time 1 and would wait for its value forever
+    with pytest.raises(ValueError, match=r'Link A\.a -> B\.a: B has no value at its first step \(time 1\.0\), '
+                                         r'A first steps at time 2\.0'):
+        Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker))
@@ -0,0 +1,75 @@
+import pytest
+
+from conftest import run_until_quit
+
+from obnl.client import ClientNode
+from obnl.impl.policies import OnChange
+from obnl.impl.server import Scheduler
+from obnl.impl.transports import LocalBroker, LocalTransport
+
+
+class Source(ClientNode):
+    """
+    Sends the values of a list, one per step.
+    """
+
+    def __init__(self, name, values, transport, batch, policies=None):
+        super(Source, self).__init__(None, name, [], ['x'], transport=transport, batch=batch,
+                                     publish_policies=policies)
+        self._values = list(values)
+
+    def step(self, current_time, time_step):
+        self.update_attribute('x', self._values.pop(0))
+
+
+class Sink(ClientNode):
+
+    def __init__(self, name, transport, batch):
+        super(Sink, self).__init__(None, name, ['x'], transport=transport, batch=batch)
+        self.received = []
+
+    def step(self, current_time, time_step):
+        self.received.append(self.input_values['x'])
+
+
+def _run(scenario, broker, blocks, values, batch, lookahead, policies=None):
+    nodes = {'S': {'inputs': [], 'outputs': ['x']}, 'R': {'inputs': ['x'], 'outputs': []}}
+    config_file, schedule_file = scenario(nodes, [('S', 'x', 'R', 'x')], blocks, [1.] * len(values))
+    Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker), lookahead=lookahead)
+    # the receiver is created first so that it gets its steps before the source
+    sink = Sink('R', LocalTransport(broker), batch)
+    Source('S', values, LocalTransport(broker), batch, policies)
+    run_until_quit(broker)
+    return sink.received
+
+
+@pytest.mark.parametrize('lookahead', [False, True])
+@pytest.mark.parametrize('batch', [False, True])
+def test_previous_block(scenario, broker, batch, lookahead):
+    assert _run(scenario, broker, [['S'], ['R']], [1., 2., 3.], batch, lookahead) == [1., 2., 3.]
+
+
+@pytest.mark.parametrize('lookahead', [False, True])
+@pytest.mark.parametrize('batch', [False, True])
+def test_last_value_hold(scenario, broker, batch, lookahead):
+    # the unchanged values are not sent, the receiver keeps the last one
+    values = [1., 1., 2., 2.]
+    assert _run(scenario, broker, [['S'], ['R']], values, batch, lookahead, {'x': OnChange()}) == values
+    always = LocalBroker()
+    assert _run(scenario, always, [['S'], ['R']], values, batch, lookahead) == values
+    assert always.delivered - broker.delivered == 2
+
+
+@pytest.mark.parametrize('lookahead', [False, True])
+@pytest.mark.parametrize('batch', [False, True])
+def test_same_block(scenario, broker, batch, lookahead):
+    # the receiver waits for the value sent at the same step
+    assert _run(scenario, broker, [['R', 'S']], [1., 2., 3.], batch, lookahead) == [1., 2., 3.]
+
+
+@pytest.mark.parametrize('lookahead', [False, True])
+@pytest.mark.parametrize('batch', [False, True])
+def test_same_block_unchanged(scenario, broker, batch, lookahead):
+    # the values not sent by the policy are sent again for the receivers of the block
+    received = _run(scenario, broker, [['R', 'S']], [1., 1., 2., 2.], batch, lookahead, {'x': OnChange()})
+    assert received == [1., 1., 2., 2.]
@@ -0,0 +1,109 @@
+import numpy
+import pytest
+
+from conftest import run_until_quit
+
+from obnl.client import ClientNode
+from obnl.impl.server import Scheduler
+from obnl.impl.recorder import ColumnStore, RecorderNode
+from obnl.impl.transports import LocalTransport
+
+
+def test_growth(tmp_path, monkeypatch):
+    monkeypatch.setattr(ColumnStore, 'INITIAL_CAPACITY', 4)
+    directory = str(tmp_path / 'store')
+    store = ColumnStore(directory, writable=True)
+    for i in range(10):
+        assert store.append('A.x', float(i), i * 2.)
+        assert store.append('A.v', float(i), numpy.full(3, i, dtype='<i4'))
+    store.flush()
+
+    times, values = store.read('A.x')
+    assert times.tolist() == [float(i) for i in range(10)]
+    assert values.tolist() == [i * 2. for i in range(10)]
+    times, values = store.read('A.v')
+    assert values.dtype == numpy.dtype('<i4') and values.shape == (10, 3)
+    assert store.info('A.v') == {'length': 10, 'start': 0., 'end': 9., 'dtype': '<i4', 'shape': [3]}
+
+
+def test_read(tmp_path):
+    store = ColumnStore(str(tmp_path / 'store'), writable=True)
+    for t in (1., 1.5, 2., 3., 5.):
+        store.append('A.x', t, t * 10)
+    assert store.read('A.x', 1.5, 3.)[1].tolist() == [15., 20.]
+    assert store.read('A.x', start=2.5)[0].tolist() == [3., 5.]
+    assert store.read('A.x', end=1.5)[0].tolist() == [1.]
+    assert store.read('A.x', 6.)[0].tolist() == []
+
+
+def test_time_order(tmp_path):
+    store = ColumnStore(str(tmp_path / 'store'), writable=True)
+    for t in (1., 2., 3.):
+        store.append('A.x', t, t)
+    # sent again by a resumed simulation: the older values are dropped, the last one is replaced
+    assert not store.append('A.x', 2., 20.)
+    assert store.append('A.x', 3., 30.)
+    assert store.append('A.x', 4., 4.)
+    times, values = store.read('A.x')
+    assert times.tolist() == [1., 2., 3., 4.]
+    assert values.tolist() == [1., 2., 30., 4.]
+
+
+def test_reopen(tmp_path):
+    directory = str(tmp_path / 'store')
+    store = ColumnStore(directory, writable=True)
+    for t in (1., 2.):
+        store.append('A.x', t, t)
+    store.flush()
+    # not flushed: not seen by a reader
+    store.append('A.x', 3., 3.)
+
+    reader = ColumnStore(directory)
+    assert reader.columns == ['A.x']
+    assert reader.read('A.x')[0].tolist() == [1., 2.]
+    store.flush()
+
+    # the values are appended after the existing ones
+    store = ColumnStore(directory, writable=True)
+    assert not store.append('A.x', 2.5, 0.)
+    store.append('A.x', 4., 4.)
+    store.append('B.y', 4., 5.)
+    store.flush()
+    reader = ColumnStore(directory)
+    assert reader.columns == ['A.x', 'B.y']
+    assert reader.read('A.x')[0].tolist() == [1., 2., 3., 4.]
+
+    with pytest.raises(ValueError, match='No column store'):
+        ColumnStore(str(tmp_path / 'missing'))
+
+
+class Source(ClientNode):
+
+    def step(self, current_time, time_step):
+        self.update_attribute('x', current_time * 2)
+        self.update_attribute('y', current_time * 3)
+
+
+class Sink(ClientNode):
+
+    def step(self, current_time, time_step):
+        pass
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_recorder(scenario, broker, tmp_path, compact):
+    nodes = {'S': {'inputs': [], 'outputs': ['x', 'y']}, 'R': {'inputs': ['x'], 'outputs': []}}
+    config_file, schedule_file = scenario(nodes, [('S', 'x', 'R', 'x')], [['S'], ['R']], [1.] * 3)
+    Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker), compact=compact,
+              recorders={'rec': ['S.y']})
+    recorder = RecorderNode(None, 'rec', str(tmp_path / 'store'), transport=LocalTransport(broker))
+    Sink(None, 'R', ['x'], transport=LocalTransport(broker))
+    Source(None, 'S', [], ['x', 'y'], transport=LocalTransport(broker))
+    run_until_quit(broker)
+    recorder.store.flush()
+
+    store = ColumnStore(str(tmp_path / 'store'))
+    assert store.columns == ['S.y']
+    times, values = store.read('S.y')
+    assert times.tolist() == [1., 2., 3.]
+    assert values.tolist() == [3., 6., 9.]
@@ -0,0 +1,71 @@
+import pytest
+
+from conftest import run_until_quit
+
+from obnl.client import ClientNode
+from obnl.impl.node import Node
+from obnl.impl.server import Scheduler
+from obnl.impl.replay import Replay, StepRecording
+from obnl.impl.transports import LocalBroker, LocalTransport
+
+
+class Source(ClientNode):
+
+    def step(self, current_time, time_step):
+        self.update_attribute('x', current_time * 3)
+
+
+class Model(ClientNode):
+    """
+    Integrates its input: replayed, it has to get the recorded inputs in the recorded order.
+    """
+
+    GAIN = 1.
+
+    def __init__(self, host, name, input_attributes, output_attributes, transport, batch=False):
+        super(Model, self).__init__(host, name, input_attributes, output_attributes, transport=transport,
+                                    batch=batch)
+        self._total = 0.
+
+    def step(self, current_time, time_step):
+        self._total += self.GAIN * self.input_values['x'] * time_step
+        self.update_attribute('y', self._total)
+
+
+class Sink(ClientNode):
+
+    def step(self, current_time, time_step):
+        pass
+
+
+class Changed(Model):
+
+    GAIN = 2.
+
+
+@pytest.mark.parametrize('batch', [False, True])
+def test_round_trip(scenario, broker, tmp_path, batch):
+    path = str(tmp_path / 'M.rec')
+    nodes = {'S': {'inputs': [], 'outputs': ['x']}, 'M': {'inputs': ['x'], 'outputs': ['y']},
+             'R': {'inputs': ['y'], 'outputs': []}}
+    links = [('S', 'x', 'M', 'x'), ('M', 'y', 'R', 'y')]
+    config_file, schedule_file = scenario(nodes, links, [['S'], ['M'], ['R']], [1., 2., .5])
+    Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker))
+    model = Model(None, 'M', ['x'], ['y'], LocalTransport(broker), batch)
+    model.recording = StepRecording(path)
+    Source(None, 'S', [], ['x'], transport=LocalTransport(broker), batch=batch)
+    Sink(None, 'R', ['y'], transport=LocalTransport(broker), batch=batch)
+    run_until_quit(broker)
+    model.recording.close()
+
+    replay = Replay(path)
+    assert (replay.name, replay.input_attributes, replay.output_attributes) == ('M', ['x'], ['y'])
+    for node_class, ok in ((Model, True), (Changed, False)):
+        replay_broker = LocalBroker()
+        replay_broker.declare_exchange(Node.DATA_NODE_EXCHANGE + replay.name)
+        result = replay.run(node_class(None, replay.name, replay.input_attributes, replay.output_attributes,
+                                       LocalTransport(replay_broker), batch))
+        assert result.steps == 3
+        assert result.ok == ok
+    # the differences are given per step
+    assert [t for t, _ in result.mismatches] == [1., 3., 3.5]
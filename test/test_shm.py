@@ -0,0 +1,153 @@
+import uuid
+import platform
+import multiprocessing
+from multiprocessing import shared_memory
+
+import pytest
+
+from conftest import run_until_quit
+
+from obnl.client import ClientNode
+from obnl.impl.server import Scheduler
+from obnl.impl.shm import RingBuffer, SharedMemoryTransport
+from obnl.impl.transports import LocalBroker, LocalTransport
+
+COUNT = 10000
+
+
+def _name():
+    return 'obnltest' + uuid.uuid4().hex[:16]
+
+
+@pytest.fixture
+def ring():
+    ring = RingBuffer(_name(), 256)
+    yield ring
+    ring.close()
+
+
+def _produce(name, count):
+    ring = RingBuffer(name)
+    for i in range(count):
+        body = i.to_bytes(4, 'little') * (i % 7 + 1)
+        while not ring.put(body):
+            pass
+    ring.close()
+
+
+def test_wrap_around(ring):
+    reader = RingBuffer(ring.name)
+    try:
+        # sizes not dividing the capacity: the records wrap at every position
+        for i in range(200):
+            body = bytes([i % 256]) * (i % 50)
+            assert ring.put(body)
+            assert reader.ready()
+            assert reader.get() == body
+            assert reader.get() is None
+    finally:
+        reader.close()
+
+
+def test_full(ring):
+    reader = RingBuffer(ring.name)
+    try:
+        # 16 bytes of header per record, rounded up to 16
+        body = b'x' * 48
+        for _ in range(ring.capacity // 64):
+            assert ring.put(body)
+        assert not ring.put(body)
+        # larger than the free room but not than the ring: back-pressure, not an error
+        assert reader.get() == body
+        assert not ring.put(b'y' * 100)
+        assert ring.put(body)
+        with pytest.raises(ValueError, match='larger than the ring'):
+            ring.put(b'z' * ring.capacity)
+        for _ in range(ring.capacity // 64):
+            assert reader.get() == body
+        assert reader.get() is None
+        assert ring.put(b'y' * 100)
+        assert reader.get() == b'y' * 100
+    finally:
+        reader.close()
+
+
+def test_processes():
+    name = _name()
+    reader = RingBuffer(name, 4096)
+    producer = multiprocessing.Process(target=_produce, args=(name, COUNT))
+    producer.start()
+    try:
+        i = 0
+        while i < COUNT:
+            body = reader.get()
+            if body is None:
+                assert producer.is_alive() or reader.ready()
+                continue
+            assert body == i.to_bytes(4, 'little') * (i % 7 + 1)
+            i += 1
+        assert reader.get() is None
+    finally:
+        producer.join(10)
+        reader.close()
+    assert producer.exitcode == 0
+
+
+def test_close():
+    name = _name()
+    ring = RingBuffer(name, 256)
+    other = RingBuffer(name)
+    other.put(b'x')
+    # the end which has not created the block keeps it
+    other.close()
+    shared_memory.SharedMemory(name).close()
+    assert ring.get() == b'x'
+    ring.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name)
+
+
+class Source(ClientNode):
+
+    def step(self, current_time, time_step):
+        self.update_attribute('x', current_time * 2)
+
+
+class Sink(ClientNode):
+
+    def __init__(self, name, transport):
+        super(Sink, self).__init__(None, name, ['x'], transport=transport)
+        self.received = []
+
+    def step(self, current_time, time_step):
+        self.received.append(self.input_values['x'])
+
+
+def _simulate(scenario, broker, shared_memory):
+    nodes = {'S': {'inputs': [], 'outputs': ['x']}, 'R': {'inputs': ['x'], 'outputs': []}}
+    config_file, schedule_file = scenario(nodes, [('S', 'x', 'R', 'x')], [['S'], ['R']], [1.] * 5)
+    Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker), shared_memory=shared_memory)
+
+    def transport():
+        if shared_memory:
+            return SharedMemoryTransport(LocalTransport(broker))
+        return LocalTransport(broker)
+    sink = Sink('R', transport())
+    source = Source(None, 'S', [], ['x'], transport=transport())
+    try:
+        run_until_quit(broker, timeout=10.)
+    finally:
+        for node in (source, sink):
+            if shared_memory:
+                node._node_impl.transport.close()
+    return sink.received
+
+
+@pytest.mark.skipif(platform.machine().lower() not in ('x86_64', 'amd64'), reason='x86 only')
+def test_simulation(scenario, broker):
+    plain = LocalBroker()
+    expected = _simulate(scenario, plain, None)
+    assert expected == [2., 4., 6., 8., 10.]
+    assert _simulate(scenario, broker, [['S', 'R']]) == expected
+    # the data went through the ring, one message per step
+    assert plain.published - broker.published == 5
@@ -0,0 +1,118 @@
+import pytest
+
+from obnl.client import ClientNode
+from obnl.impl.node import Node
+from obnl.impl.server import Scheduler
+from obnl.impl.topology import Topology
+from obnl.impl.transports import Transport
+
+NODES = {'A': {'inputs': ['c'], 'outputs': ['a']},
+         'B': {'inputs': ['a1', 'a2'], 'outputs': ['b']},
+         'C': {'inputs': ['a', 'b'], 'outputs': ['c']}}
+LINKS = [('A', 'a', 'B', 'a1'), ('A', 'a', 'B', 'a2'), ('A', 'a', 'C', 'a'), ('B', 'b', 'C', 'b'),
+         ('C', 'c', 'A', 'c')]
+BLOCKS = [['A'], ['B'], ['C']]
+
+
+class Declarations(Transport):
+    """
+    Records the declarations, one call at a time.
+    """
+
+    def __init__(self):
+        self.exchanges = []
+        self.queues = []
+        self.bindings = []
+
+    def declare_exchange(self, exchange):
+        self.exchanges.append(exchange)
+
+    def declare_queue(self, queue):
+        self.queues.append(queue)
+        return queue
+
+    def bind(self, exchange, queue, routing_key=None):
+        self.bindings.append((exchange, queue, routing_key if routing_key is not None else queue))
+
+    def consume(self, queue, callback, consumer_tag=None):
+        pass
+
+    def publish(self, exchange, routing_key, body, reply_to=None):
+        pass
+
+
+def _baseline():
+    """
+    :return: the declarations of the Scheduler and of the Nodes before the topology was planned
+    """
+    declared = Declarations()
+    scheduler = Node.SCHEDULER_NAME
+    # Scheduler
+    declared.declare_queue(Node.SIMULATION_NODE_QUEUE + scheduler)
+    declared.declare_exchange(Node.SIMULATION_NODE_EXCHANGE + scheduler)
+    declared.declare_exchange(Node.SIMULATION_NODE_EXCHANGE + scheduler)
+    for node_out, attr_out, node_in, _ in LINKS:
+        declared.declare_exchange(Node.DATA_NODE_EXCHANGE + node_out)
+        declared.declare_queue(Node.DATA_NODE_QUEUE + node_in)
+        declared.bind(Node.DATA_NODE_EXCHANGE + node_out, Node.DATA_NODE_QUEUE + node_in,
+                      Node.DATA_NODE_EXCHANGE + attr_out)
+    for i, block in enumerate(BLOCKS):
+        for node in block:
+            declared.declare_exchange(Node.SIMULATION_NODE_EXCHANGE + scheduler)
+            declared.declare_queue(Node.SIMULATION_NODE_QUEUE + node)
+            declared.bind(Node.SIMULATION_NODE_EXCHANGE + scheduler, Node.SIMULATION_NODE_QUEUE + node,
+                          Node.UPDATE_ROUTING + str(i))
+            declared.declare_exchange(Node.SIMULATION_NODE_EXCHANGE + node)
+            declared.declare_queue(Node.SIMULATION_NODE_QUEUE + scheduler)
+            declared.bind(Node.SIMULATION_NODE_EXCHANGE + node, Node.SIMULATION_NODE_QUEUE + scheduler,
+                          Node.SIMULATION_NODE_EXCHANGE + scheduler)
+    # Nodes
+    for node in NODES:
+        declared.declare_queue(Node.SIMULATION_NODE_QUEUE + node)
+        declared.declare_exchange(Node.SIMULATION_NODE_EXCHANGE + node)
+        declared.declare_queue(Node.LOCAL_NODE_QUEUE + node)
+        declared.declare_exchange(Node.LOCAL_NODE_EXCHANGE + node)
+        declared.bind(Node.LOCAL_NODE_EXCHANGE + node, Node.LOCAL_NODE_QUEUE + node)
+        declared.declare_queue(Node.DATA_NODE_QUEUE + node)
+    return declared
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_planned(scenario, compact):
+    config_file, schedule_file = scenario(NODES, LINKS, BLOCKS, [1.])
+    declarations = [Declarations()]
+    scheduler = Scheduler(None, config_file, schedule_file, transport=declarations[0], compact=compact)
+    for name, attributes in NODES.items():
+        declarations.append(Declarations())
+        ClientNode(None, name, attributes['inputs'], attributes['outputs'], transport=declarations[-1],
+                   local_queue=True)
+    baseline = _baseline()
+
+    # each participant declares its topology at once, without duplicates
+    for declared in declarations[1:]:
+        for planned in (declared.exchanges, declared.queues, declared.bindings):
+            assert len(planned) == len(set(planned))
+    topology = scheduler.topology
+    for planned in (topology.exchanges, topology.queues, topology.bindings):
+        assert len(planned) == len(set(planned))
+
+    assert set().union(*(d.exchanges for d in declarations)) == set(baseline.exchanges)
+    assert set().union(*(d.queues for d in declarations)) == set(baseline.queues)
+    # the batches and the messages to one Node (periods) have their own bindings
+    added = {(Node.DATA_NODE_EXCHANGE + node_out, Node.DATA_NODE_QUEUE + node_in, Node.DATA_BATCH_ROUTING)
+             for node_out, _, node_in, _ in LINKS}
+    added.update((Node.SIMULATION_NODE_EXCHANGE + Node.SCHEDULER_NAME, Node.SIMULATION_NODE_QUEUE + node,
+                  Node.UPDATE_NODE_ROUTING + node) for node in NODES)
+    assert set().union(*(d.bindings for d in declarations)) == set(baseline.bindings) | added
+
+
+def test_discard():
+    topology = Topology()
+    topology.add_binding('e', 'q', 'k')
+    topology.add_binding('e', 'q', 'k')
+    topology.add_binding('e', 'q')
+    assert topology.bindings == [('e', 'q', 'k'), ('e', 'q', 'q')]
+    topology.discard_binding('e', 'q', 'k')
+    topology.discard_binding('e', 'q', 'missing')
+    assert topology.bindings == [('e', 'q', 'q')]
+    assert (topology.exchanges, topology.queues) == (['e'], ['q'])
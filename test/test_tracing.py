@@ -0,0 +1,41 @@
+import re
+
+import pytest
+
+from conftest import run_until_quit
+
+from obnl.client import ClientNode
+from obnl.impl.server import Scheduler
+from obnl.impl.tracing import Tracer, analyze_trace
+from obnl.impl.transports import LocalTransport
+
+
+class Source(ClientNode):
+
+    def step(self, current_time, time_step):
+        self.update_attribute('x', current_time)
+
+
+class Sink(ClientNode):
+
+    def step(self, current_time, time_step):
+        pass
+
+
+@pytest.mark.parametrize('time_step', [1., .1])
+def test_barriers(scenario, broker, time_step):
+    nodes = {'S': {'inputs': [], 'outputs': ['x']}, 'R': {'inputs': ['x'], 'outputs': []}}
+    config_file, schedule_file = scenario(nodes, [('S', 'x', 'R', 'x')], [['S'], ['R']], [time_step] * 5)
+    tracer = Tracer()
+    scheduler = Scheduler(None, config_file, schedule_file, transport=LocalTransport(broker))
+    scheduler.tracer = tracer
+    for node in (Sink(None, 'R', ['x'], transport=LocalTransport(broker)),
+                 Source(None, 'S', [], ['x'], transport=LocalTransport(broker))):
+        node.tracer = tracer
+    run_until_quit(broker)
+
+    report = analyze_trace(tracer.events())
+    assert report.startswith('10 node steps, 10 barriers')
+    # every barrier is closed by the node of its block
+    closers = dict(re.findall(r'(\w) \((\d+)\)', report.split('nodes closing the barriers: ')[1].split('\n')[0]))
+    assert closers == {'S': '5', 'R': '5'}